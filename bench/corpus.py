@@ -0,0 +1,261 @@
+"""
+Generates synthetic Viper programs for benchmarking, from the constructs of grammar.txt: let declarations, if/elif/else,
+while and fun blocks nested a few levels deep, long arithmetic expressions, comparisons, printed strings and comments.
+
+The lexer takes the newline after a comment for an invalid token unless the comment is on the program declaration
+line, so comments go there only; with comments=True (--comments) they are also put on lines of their own and after
+statements, where every one costs a syntax error for now.
+
+The same seed and size always give the same program. Programs run without errors under the parser's inline evaluation
+(Parser.parse()): the generator keeps track of the value of every name, so a name is only read once it holds a value
+the parser can use (positive and of moderate size) and divisions never divide by zero. Every name is let with the
+type of its first let, and ints only with int expressions, so ~static programs pass the type checker.
+
+Run from the repository root: python bench/corpus.py SIZE [-o FILE] [--seed N] [--typing static|dynamic] [--comments]
+SIZE is a number of bytes, optionally with a KB, MB or GB suffix (1 KB = 1024 bytes); up to 1 GB.
+"""
+import argparse
+import random
+import re
+import sys
+import typing as ty
+
+UNITS:ty.Dict[str, int] = {'': 1, 'B': 1, 'KB': 1 << 10, 'MB': 1 << 20, 'GB': 1 << 30}
+MAX_SIZE:int = 1 << 30
+SIZE_RE:re.Pattern = re.compile(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*", re.IGNORECASE)
+# Names read in expressions hold values in this range, so they stay usable by the parser's inline evaluation
+MIN_VALUE, MAX_VALUE = 1e-3, 1e9
+MAX_NAMES:int = 256
+STEMS:ty.Tuple[str, ...] = ("count", "total", "index", "size", "width", "height", "offset", "limit", "step", "rate",
+                            "ratio", "scale", "delta", "score", "level", "depth", "price", "weight", "speed", "value")
+WORDS:ty.Tuple[str, ...] = ("alpha", "beta", "gamma", "delta", "lorem", "ipsum", "dolor", "sit", "amet", "viper",
+                            "parse", "token", "tree", "loop", "branch", "value", "result", "done", "start", "end")
+COMPARISONS:ty.Tuple[str, ...] = ('==', '!=', '<', '<=', '>', '>=')
+CHUNK:int = 1 << 16
+
+
+def parseSize(text:str) -> int:
+    "Bytes in a size like 4096, 64KB or 1.5 MB."
+    match:re.Match|None = SIZE_RE.fullmatch(text)
+    if match == None:
+        raise ValueError(f"Invalid size \"{text}\", expected a number of bytes with an optional KB, MB or GB suffix.")
+    unit:str = match[2].upper()
+    size:int = int(float(match[1]) * UNITS[unit if unit in UNITS else unit + 'B'])
+    if not 0 < size <= MAX_SIZE:
+        raise ValueError(f"Size {text} is out of range (1 byte to 1 GB).")
+    return size
+
+
+def formatSize(size:int) -> str:
+    "Shortest exact spelling of a size: 1KB for 1024, 1536 for 1536."
+    for unit in ("GB", "MB", "KB"):
+        if size % UNITS[unit] == 0:
+            return f"{size // UNITS[unit]}{unit}"
+    return str(size)
+
+
+class Generator:
+    """
+    A seeded source of Viper statements. statements() yields top-level statements forever; program() and write()
+    cut them to about a size. Values of ints are kept as ints and of floats as floats, as the parser computes them.
+    """
+    def __init__(self, seed:int=0, typing:str="static", maxDepth:int=3, comments:bool=False) -> None:
+        self.random:random.Random = random.Random(seed)
+        self.seed:int = seed
+        self.typing:str = typing
+        self.comments:bool = comments
+        self.maxDepth:int = maxDepth
+        self.names:ty.List[str] = []
+        self.values:ty.Dict[str, int|float] = {}
+        self.integers:ty.Dict[str, bool] = {} # whether a name is an int
+        self.functions:int = 0
+    
+    def header(self) -> str:
+        return f"~{self.typing} # generated by bench/corpus.py, seed {self.seed}\n"
+    
+    def program(self, size:int) -> str:
+        "A program of about size bytes: statements are added as long as that brings it closer to size."
+        parts:ty.List[str] = [self.header()]
+        length:int = len(parts[0])
+        for statement in self.statements():
+            if length + len(statement) - size >= size - length:
+                break
+            parts.append(statement)
+            length += len(statement)
+        return ''.join(parts)
+    
+    def write(self, file:ty.TextIO, size:int) -> int:
+        "Write the program of about size bytes to file, a chunk at a time; returns the bytes written."
+        buffer:ty.List[str] = [self.header()]
+        buffered:int = len(buffer[0])
+        written:int = 0
+        for statement in self.statements():
+            if written + buffered + len(statement) - size >= size - written - buffered:
+                break
+            buffer.append(statement)
+            buffered += len(statement)
+            if buffered >= CHUNK:
+                file.write(''.join(buffer))
+                written += buffered
+                buffer, buffered = [], 0
+        file.write(''.join(buffer))
+        return written + buffered
+    
+    def statements(self) -> ty.Iterator[str]:
+        # Start with a few names to read
+        for _ in range(4):
+            yield self.__let(0, self.random.random() < 0.7) + '\n'
+        while True:
+            yield self.__statement(0) + '\n'
+    
+    def __statement(self, depth:int, function:bool=False) -> str:
+        "One statement at depth (nesting level), ending in its semicolon."
+        roll:float = self.random.random()
+        nested:bool = depth < self.maxDepth
+        if roll < 0.38:
+            return self.__let(depth, self.random.random() < 0.6, function)
+        elif roll < 0.52:
+            return self.__print(depth)
+        elif roll < 0.60 and self.comments:
+            return self.__comment(depth) + '\n' + self.__statement(depth, function)
+        elif roll < 0.76 and nested:
+            return self.__if(depth, function)
+        elif roll < 0.86 and nested:
+            return self.__while(depth, function)
+        elif roll < 0.92 and depth == 0:
+            return self.__fun(depth)
+        return self.__let(depth, True, function)
+    
+    def __let(self, depth:int, integer:bool, function:bool=False) -> str:
+        long:bool = self.random.random() < 0.15
+        new:bool = False
+        if function:
+            # A function's own names are not read outside it
+            name:str = f"local{self.random.randrange(8)}"
+        elif self.names and (self.random.random() < 0.5 or len(self.names) >= MAX_NAMES):
+            name = self.random.choice(self.names)
+            integer = self.integers[name]
+        else:
+            name = f"{self.random.choice(STEMS)}{len(self.names)}"
+            new = True
+        text, value = self.__expr(integer, 12 if long else 3, long)
+        if new:
+            self.names.append(name)
+            self.integers[name] = integer
+        if not function:
+            self.values[name] = value
+        typ:str = "int" if integer else "float"
+        return f"{self.__indent(depth)}let {typ} {name} = {text};{self.__trailing()}"
+    
+    def __print(self, depth:int) -> str:
+        if self.random.random() < 0.4:
+            quote:str = self.random.choice(('"', "'"))
+            words:str = ' '.join(self.random.choice(WORDS) for _ in range(self.random.randint(1, 6)))
+            return f"{self.__indent(depth)}print {quote}{words}{quote};"
+        text, _ = self.__expr(self.random.random() < 0.5, 4)
+        return f"{self.__indent(depth)}print {text};"
+    
+    def __if(self, depth:int, function:bool) -> str:
+        indent:str = self.__indent(depth)
+        parts:ty.List[str] = [f"{indent}if ({self.__condition()}) {{\n{self.__block(depth + 1, function)}{indent}}}"]
+        for _ in range(self.random.choice((0, 0, 1, 2))):
+            parts.append(f" elif ({self.__condition()}) {{\n{self.__block(depth + 1, function)}{indent}}}")
+        if self.random.random() < 0.5:
+            parts.append(f" else {{\n{self.__block(depth + 1, function)}{indent}}}")
+        return ''.join(parts) + ';'
+    
+    def __while(self, depth:int, function:bool) -> str:
+        indent:str = self.__indent(depth)
+        return f"{indent}while ({self.__condition()}) {{\n{self.__block(depth + 1, function)}{indent}}};"
+    
+    def __fun(self, depth:int) -> str:
+        indent:str = self.__indent(depth)
+        self.functions += 1
+        parameters:str = ", ".join(f"{self.random.choice(('int', 'float'))} arg{i}" for i in range(self.random.randint(0, 4)))
+        return f"{indent}fun function{self.functions}({parameters}) {{\n{self.__block(depth + 1, True)}{indent}}};"
+    
+    def __block(self, depth:int, function:bool) -> str:
+        return ''.join(self.__statement(depth, function) + '\n' for _ in range(self.random.randint(1, 4)))
+    
+    def __comment(self, depth:int) -> str:
+        return f"{self.__indent(depth)}# {' '.join(self.random.choice(WORDS) for _ in range(self.random.randint(1, 8)))}"
+    
+    def __trailing(self) -> str:
+        return f" # {self.random.choice(WORDS)}" if self.comments and self.random.random() < 0.1 else ''
+    
+    def __condition(self) -> str:
+        left, _ = self.__expr(self.random.random() < 0.6, 2)
+        right, _ = self.__expr(self.random.random() < 0.6, 2)
+        return f"{left} {self.random.choice(COMPARISONS)} {right}"
+    
+    def __expr(self, integer:bool, terms:int, long:bool=False) -> ty.Tuple[str, ty.Any]:
+        "An expression of up to terms operands and its value; ints use + - *, floats also / and int names."
+        for _ in range(8):
+            count:int = terms if long else self.random.randint(1, terms)
+            text, value = self.__operand(integer)
+            for _ in range(count - 1):
+                op:str = self.random.choice("+-*" if integer else "+-*/")
+                operand, operandValue = self.__operand(integer, op)
+                if op == '*' and self.random.random() < 0.3 or op == '/':
+                    # Parenthesize so the value follows the text's order of evaluation
+                    text, value = f"({text}) {op} {operand}", self.__apply(value, op, operandValue)
+                elif op == '*':
+                    text, value = f"{operand} * ({text})", self.__apply(operandValue, op, value)
+                else:
+                    text, value = f"{text} {op} {operand}", self.__apply(value, op, operandValue)
+                if not MIN_VALUE <= value <= MAX_VALUE:
+                    break
+            if MIN_VALUE <= value <= MAX_VALUE:
+                return text, value
+        return self.__literal(integer)
+    
+    def __operand(self, integer:bool, op:str='') -> ty.Tuple[str, ty.Any]:
+        "A literal or a name holding a value (never zero, as a divisor)."
+        if self.names and self.random.random() < 0.55:
+            name:str = self.random.choice(self.names)
+            if not integer or self.integers[name]:
+                return name, self.values[name]
+        return self.__literal(integer)
+    
+    def __literal(self, integer:bool) -> ty.Tuple[str, ty.Any]:
+        if integer:
+            value:int = self.random.choice((self.random.randint(1, 9), self.random.randint(10, 999)))
+            return str(value), value
+        value = self.random.randint(1, 9999) / 10
+        return repr(float(value)), float(value)
+    
+    @staticmethod
+    def __apply(left:ty.Any, op:str, right:ty.Any) -> ty.Any:
+        if op == '+':
+            return left + right
+        elif op == '-':
+            return left - right
+        elif op == '*':
+            return left * right
+        return left / right
+    
+    @staticmethod
+    def __indent(depth:int) -> str:
+        return "    " * depth
+
+
+def main(argv:ty.List[str]|None=None) -> None:
+    arguments:argparse.ArgumentParser = argparse.ArgumentParser(description="Generate a synthetic Viper program.")
+    arguments.add_argument("size", type=parseSize, help="size of the program, like 4096, 64KB or 1GB")
+    arguments.add_argument("-o", "--output", help="file to write (default: stdout)")
+    arguments.add_argument("--seed", type=int, default=0)
+    arguments.add_argument("--typing", choices=("static", "dynamic"), default="static")
+    arguments.add_argument("--comments", action="store_true", help="also put comments between and after statements")
+    options:argparse.Namespace = arguments.parse_args(argv)
+    
+    generator:Generator = Generator(options.seed, options.typing, comments=options.comments)
+    if options.output == None:
+        generator.write(sys.stdout, options.size)
+        return
+    with open(options.output, 'w', encoding="utf-8", newline='\n') as file:
+        written:int = generator.write(file, options.size)
+    sys.stderr.write(f"{options.output}: {written} bytes\n")
+
+
+if __name__ == "__main__":
+    main()
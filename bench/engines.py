@@ -0,0 +1,96 @@
+"""
+Compares the execution engines on loop-heavy programs: the parser's inline evaluation (Parser.parse()), the closure
+engine (closures.ClosureEngine), the bytecode VM (compiler.Compiler + vm.VM) and the Python transpiler
+(transpiler.Transpiler). The closure engine also runs the program as ~dynamic, without (dynamic) and with (cached)
+inline caches at its operator sites; the hits and misses of the caches over the timed runs are listed under it.
+
+The inline evaluation reads every statement once and cannot repeat a while body, so it is given the loop body
+unrolled instead, for fewer iterations; times are compared per loop iteration. Its time includes lexing and parsing,
+which it does as it evaluates; the engines' compile time is listed apart from their run time.
+
+Run from the repository root: python bench/engines.py [iterations]
+"""
+import io
+import os
+import sys
+import time
+import typing as ty
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+import closures
+import compiler
+import lex
+import parse
+import transpiler
+import vm
+
+# Loop bodies over a counter i, starting at 1 (the parser's inline evaluation takes a 0 for an unknown name)
+PROGRAMS:ty.Dict[str, ty.Tuple[str, str]] = {
+    "arithmetic": ("let int s = 1;", "let int s = s + i * 2 - 1; let int i = i + 1;"),
+    "branches": ("let int s = 1; let int h = {half};", "if (i > h) {{ let int s = s + 1; }} else {{ let int s = s - 1; }}; let int i = i + 1;"),
+    "floats": ("let float x = 1.5;", "let float x = x * 0.5 + i / 3.0; let int i = i + 1;"),
+}
+INLINE_MAX:int = 5000
+
+
+def looped(name:str, iterations:int) -> str:
+    setup, body = PROGRAMS[name]
+    setup = setup.format(half=iterations // 2)
+    return f"let int i = 1; {setup} while (i < {iterations}) {{ {body.format()} }};\n"
+
+
+def unrolled(name:str, iterations:int) -> str:
+    setup, body = PROGRAMS[name]
+    setup = setup.format(half=iterations // 2)
+    return f"let int i = 1; {setup}\n" + f"{body.format()}\n" * iterations
+
+
+def best(run:ty.Callable[[], ty.Any], repeat:int=3) -> float:
+    times:ty.List[float] = []
+    for _ in range(repeat):
+        start:float = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv:ty.List[str]) -> None:
+    iterations:int = int(argv[1]) if len(argv) > 1 else 200000
+    inlineIterations:int = min(iterations, INLINE_MAX)
+    print(f"{'program':<12}{'engine':<10}{'iterations':>12}{'compile s':>12}{'run s':>10}{'us/iter':>10}{'speedup':>10}")
+    for name in PROGRAMS:
+        source:str = unrolled(name, inlineIterations)
+        inline:float = best(lambda: parse.Parser(lex.Lexer(source)).parse()) / inlineIterations
+        print(f"{name:<12}{'inline':<10}{inlineIterations:>12}{'':>12}{inline * inlineIterations:>10.3f}{inline * 1e6:>10.2f}{1:>10.1f}")
+
+        tree = parse.Parser(lex.Lexer(looped(name, iterations))).parseTree()
+        engine:closures.ClosureEngine = closures.ClosureEngine(io.StringIO())
+        compileTime:float = best(lambda: engine.compile(tree))
+        root:closures.Closure = engine.compile(tree)
+        runTime:float = best(lambda: engine.run(root))
+        print(f"{'':<12}{'closures':<10}{iterations:>12}{compileTime:>12.4f}{runTime:>10.3f}{runTime / iterations * 1e6:>10.2f}{inline * iterations / runTime:>10.1f}")
+
+        dynamicTree = parse.Parser(lex.Lexer(f"~dynamic\n{looped(name, iterations)}")).parseTree()
+        for label, caches in (("dynamic", False), ("cached", True)):
+            dynamic:closures.ClosureEngine = closures.ClosureEngine(io.StringIO(), caches=caches)
+            compileTime = best(lambda: dynamic.compile(dynamicTree))
+            root = dynamic.compile(dynamicTree)
+            runTime = best(lambda: dynamic.run(root))
+            print(f"{'':<12}{label:<10}{iterations:>12}{compileTime:>12.4f}{runTime:>10.3f}{runTime / iterations * 1e6:>10.2f}{inline * iterations / runTime:>10.1f}")
+        print(f"{'':<22}{dynamic.stats.hits} hits, {dynamic.stats.misses} misses at {len(dynamic.stats.caches)} sites")
+
+        compileTime = best(lambda: compiler.Compiler().compile(tree))
+        code:compiler.Code = compiler.Compiler().compile(tree)
+        machine:vm.VM = vm.VM(io.StringIO())
+        runTime = best(lambda: machine.run(code))
+        print(f"{'':<12}{'vm':<10}{iterations:>12}{compileTime:>12.4f}{runTime:>10.3f}{runTime / iterations * 1e6:>10.2f}{inline * iterations / runTime:>10.1f}")
+
+        compileTime = best(lambda: transpiler.Transpiler().transpile(tree))
+        translation:transpiler.Translation = transpiler.Transpiler().transpile(tree)
+        python:transpiler.Transpiler = transpiler.Transpiler(io.StringIO())
+        runTime = best(lambda: python.run(translation))
+        print(f"{'':<12}{'python':<10}{iterations:>12}{compileTime:>12.4f}{runTime:>10.3f}{runTime / iterations * 1e6:>10.2f}{inline * iterations / runTime:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,179 @@
+"""
+Measures the throughput of the front end on programs from corpus.py: tokens per second of Lexer.tokenize(),
+statements per second of Parser.parse() (which lexes as it goes; nested statements count), the peak memory
+allocated while parsing (tracemalloc) and the startup time of an interpreter importing the lexer and parser.
+
+Results can be saved as a JSON baseline and compared with one: every metric is listed with its change, and the run
+fails (exit status 1) if one got worse by more than the threshold.
+
+Run from the repository root: python bench/throughput.py [--sizes 1KB,16KB,256KB] [--save FILE] [--compare FILE]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import typing as ty
+
+CORE:str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core")
+sys.path.insert(1, CORE)
+import commons as comm
+import corpus
+import flatTree as ft
+import lex
+import parse
+import tok
+
+TT = tok.TokenTypes
+STATEMENTS:ty.FrozenSet[int] = frozenset(kind.value for kind in (ft.NodeKinds.LET, ft.NodeKinds.PRINT, ft.NodeKinds.IF,
+                                                                 ft.NodeKinds.WHILE, ft.NodeKinds.FOR, ft.NodeKinds.FUN))
+DEFAULT_SIZES:str = "1KB,16KB,256KB"
+# Metrics compared between runs and whether more is better
+METRICS:ty.Dict[str, bool] = {"tokensPerSec": True, "statementsPerSec": True, "peakBytes": False}
+STARTUP_METRICS:ty.Dict[str, bool] = {"seconds": False, "importSeconds": False}
+STARTUP_CODE:str = "import time; start = time.perf_counter(); import lex, parse; print(time.perf_counter() - start)"
+
+
+def best(run:ty.Callable[[], ty.Any], repeat:int) -> ty.Tuple[float, ty.Any]:
+    "Shortest time of repeat runs, with what the last run returned."
+    times:ty.List[float] = []
+    result:ty.Any = None
+    for _ in range(repeat):
+        start:float = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def tokenize(source:str) -> int:
+    "Tokens in source, EOF included."
+    lexer:lex.Lexer = lex.Lexer(source)
+    count:int = 1
+    while lexer.tokenize().typ != TT.EOF:
+        count += 1
+    return count
+
+
+def parseAll(source:str) -> int:
+    "Parse (and evaluate) source; returns the errors reported."
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser:parse.Parser = parse.Parser(lex.Lexer(source))
+        parser.parse()
+    return parser.errors
+
+
+def countStatements(source:str) -> int:
+    "Statements in source, nested ones included."
+    with contextlib.redirect_stdout(io.StringIO()):
+        tree:ft.FlatTree = ft.FlatTree.fromTree(parse.Parser(lex.Lexer(source)).parseTree())
+    return sum(1 for kind in tree.kinds if kind in STATEMENTS)
+
+
+def measure(source:str, repeat:int, memory:bool=True) -> ty.Dict[str, ty.Any]:
+    lexTime, tokens = best(lambda: tokenize(source), repeat)
+    parseTime, errors = best(lambda: parseAll(source), repeat)
+    statements:int = countStatements(source)
+    result:ty.Dict[str, ty.Any] = {
+        "bytes": len(source.encode("utf-8")), "lines": source.count('\n'), "tokens": tokens, "statements": statements,
+        "errors": errors, "lexSeconds": lexTime, "parseSeconds": parseTime,
+        "tokensPerSec": tokens / lexTime, "statementsPerSec": statements / parseTime,
+    }
+    if memory:
+        tracemalloc.start()
+        parseAll(source)
+        result["peakBytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def startup(repeat:int) -> ty.Dict[str, float]:
+    "Wall time of a new interpreter importing the lexer and parser, and the time the imports take in it."
+    environment:ty.Dict[str, str] = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(filter(None, (CORE, environment.get("PYTHONPATH"))))
+    times:ty.List[float] = []
+    imports:ty.List[float] = []
+    for _ in range(repeat):
+        start:float = time.perf_counter()
+        output:str = subprocess.run([sys.executable, "-c", STARTUP_CODE], capture_output=True, text=True, check=True, env=environment).stdout
+        times.append(time.perf_counter() - start)
+        imports.append(float(output))
+    return {"seconds": min(times), "importSeconds": min(imports)}
+
+
+def run(sizes:ty.List[int], seed:int, typing:str, repeat:int, memory:bool) -> ty.Dict[str, ty.Any]:
+    results:ty.Dict[str, ty.Any] = {
+        "viper": comm.VERSION, "python": platform.python_version(), "platform": platform.platform(),
+        "seed": seed, "typing": typing, "repeat": repeat, "startup": startup(repeat), "sizes": {},
+    }
+    print(f"{'size':>8}{'bytes':>12}{'tokens':>10}{'statements':>12}{'errors':>8}{'tokens/s':>12}{'statements/s':>14}{'peak MB':>10}")
+    for size in sizes:
+        source:str = corpus.Generator(seed, typing).program(size)
+        result:ty.Dict[str, ty.Any] = measure(source, repeat, memory)
+        results["sizes"][corpus.formatSize(size)] = result
+        peak:str = f"{result['peakBytes'] / (1 << 20):>10.2f}" if memory else f"{'-':>10}"
+        print(f"{corpus.formatSize(size):>8}{result['bytes']:>12}{result['tokens']:>10}{result['statements']:>12}{result['errors']:>8}"
+              f"{result['tokensPerSec']:>12.0f}{result['statementsPerSec']:>14.0f}{peak}")
+    print(f"startup {results['startup']['seconds'] * 1000:.1f} ms, imports {results['startup']['importSeconds'] * 1000:.1f} ms")
+    return results
+
+
+def compare(baseline:ty.Dict[str, ty.Any], current:ty.Dict[str, ty.Any], threshold:float) -> int:
+    "Print the change of every metric found in both runs; returns the number of regressions beyond threshold percent."
+    rows:ty.List[ty.Tuple[str, float, float, bool]] = []
+    for key, higher in STARTUP_METRICS.items():
+        if key in baseline.get("startup", {}) and key in current["startup"]:
+            rows.append((f"startup {key}", baseline["startup"][key], current["startup"][key], higher))
+    for size, result in current["sizes"].items():
+        for key, higher in METRICS.items():
+            if key in baseline.get("sizes", {}).get(size, {}) and key in result:
+                rows.append((f"{size} {key}", baseline["sizes"][size][key], result[key], higher))
+    
+    if baseline.get("seed") != current["seed"] or baseline.get("typing") != current["typing"]:
+        print("warning: the baseline was measured on another corpus (seed or typing differ)")
+    regressions:int = 0
+    print(f"{'metric':<28}{'baseline':>16}{'current':>16}{'change':>10}")
+    for name, old, new, higher in rows:
+        change:float = (new - old) / old * 100 if old else 0.0
+        worse:bool = (change < -threshold) if higher else (change > threshold)
+        regressions += worse
+        print(f"{name:<28}{old:>16.4g}{new:>16.4g}{change:>+9.1f}%{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def main(argv:ty.List[str]|None=None) -> int:
+    arguments:argparse.ArgumentParser = argparse.ArgumentParser(description="Measure lexer and parser throughput.")
+    arguments.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma-separated program sizes, 1KB to 1GB (default: {DEFAULT_SIZES})")
+    arguments.add_argument("--seed", type=int, default=0)
+    arguments.add_argument("--typing", choices=("static", "dynamic"), default="static")
+    arguments.add_argument("--repeat", type=int, default=3, help="runs per measurement, the best one counts")
+    arguments.add_argument("--no-memory", dest="memory", action="store_false", help="skip the peak memory run")
+    arguments.add_argument("--save", metavar="FILE", help="write the results as a JSON baseline")
+    arguments.add_argument("--compare", metavar="FILE", help="compare with a JSON baseline")
+    arguments.add_argument("--threshold", type=float, default=10.0, help="percent a metric may get worse (default: 10)")
+    options:argparse.Namespace = arguments.parse_args(argv)
+    
+    try:
+        sizes:ty.List[int] = [corpus.parseSize(size) for size in options.sizes.split(',')]
+    except ValueError as e:
+        arguments.error(str(e))
+    results:ty.Dict[str, ty.Any] = run(sizes, options.seed, options.typing, options.repeat, options.memory)
+    
+    if options.save != None:
+        with open(options.save, 'w', encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+            file.write('\n')
+    if options.compare != None:
+        with open(options.compare, encoding="utf-8") as file:
+            baseline:ty.Dict[str, ty.Any] = json.load(file)
+        print()
+        return 1 if compare(baseline, results, options.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
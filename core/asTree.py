@@ -1,126 +1,200 @@
-import sys
-import typing as ty
-
-import commons as comm
-import err
-import other as ot
-import parse
-import tok
-
-# Please note TT is defined here!
-TTn = tok.Token
-TT = tok.TokenTypes
-ANSI = comm.ANSI
-
-
-class ASTNode:
-    def __init__(self, parser:parse.Parser) -> None:
-        self.parser = parser
-    
-    def __error(self, errType:ty.Type[err.Error], *args:ty.Any, **kwargs:ty.Any):
-        sys.stdout.write(f"{ot.RED if ANSI else ''}??{ot.RESET if ANSI else ''} " + str(errType(*args, **kwargs)) + '\n')
-        sys.stdout.flush()
-
-
-class StatementNode(ASTNode):
-    def __init__(self, statement, nextStatement=None) -> None:
-        self.statement = statement
-        self.nextStatement = nextStatement
-    
-    def __repr__(self) -> str:
-        return f"StatementNode({self.statement}, {self.nextStatement})"
-
-
-class BinOpNode(ASTNode):
-    def __init__(self, left:ty.Any, op:str, right:ty.Any, leftType:TT, rightTyp:TT) -> None:
-        self.err:bool = False
-        self.leftTyp:TT = leftType
-        self.rightTyp:TT = rightTyp
-
-        if leftType != rightTyp:
-            self.__error(err.typeErr, self.parser.token, self.parser.lexer.line, self.parser.lexer.printPos-self.parser.token.size)
-            self.err = True
-        
-        else:
-            self.left:ty.Any = left
-            self.op:str = op
-            self.right:str = right
-    
-    def __repr__(self) -> str:
-        return f"BinOp({self.left}, {self.op}, {self.right}, type=({self.leftTyp}, {self.rightTyp}))"
-
-
-class UnaryOpNode(ASTNode):
-    def __init__(self, op:str, operand:str) -> None:
-        self.op:str = op
-        self.operand:str = operand
-        self.typ:None = None
-    
-    def __repr__(self) -> str:
-        return f"UnaryNode({self.op}, {self.operand}, type={self.typ})"
-
-class NumNode(ASTNode):
-    def __init__(self, val:int|float, typ:TT) -> None:
-        self.val:int|float = val
-        self.typ:TT = typ
-    
-    def __repr__(self) -> str:
-        return f"NumNode({self.val}, type={self.typ.name})"
-
-
-class IdentNode(ASTNode):
-    def __init__(self, name:str, typ:TT) -> None:
-        self.name:str = name
-        self.typ:TT = typ
-    
-    def __repr__(self) -> str:
-        return f"IdentNode({self.name}, type={self.typ.name})"
-
-
-class LetNode(ASTNode):
-    def __init__(self, ident:IdentNode, val:ty.Any, typ:TT) -> None:
-        self.ident:IdentNode = ident
-        self.val:ty.Any = val
-        self.typ:TT = typ
-    
-    def __repr__(self) -> str:
-        return f"AssignNode({self.ident}, {self.val}, type={self.typ.name})"
-
-
-class IfNode(ASTNode):
-    def __init__(self, condition, thenBranch, elseBranch=None) -> None:
-        self.condition = condition
-        self.thenBranch = thenBranch
-        # self.elifBranches = elifBranches
-        self.elseBranch = elseBranch
-    
-    def __repr__(self) -> str:
-        return f"IfNode({self.condition}, then={self.thenBranch}, else={self.elseBranch})"
-
-
-class WhileNode(ASTNode):
-    def __init__(self, condition, thenBranch) -> None:
-        self.condition = condition
-        self.thenBranch = thenBranch
-    
-    def __repr__(self) -> str:
-        return f"WhileNode({self.condition}, then={self.thenBranch})"
-
-
-class ForNode(ASTNode):
-    def __init__(self, iterable, thenBranch) -> None:
-        self.iterable = iterable
-        self.thenBranch = thenBranch
-    
-    def __repr__(self) -> str:
-        return f"IfNode({self.iterable}, then={self.thenBranch})"
-
-
-class FunNode(ASTNode):
-    def __init__(self, name, parameters, body) -> None:
-        self.name = name
-        self.parameters = parameters
-        self.body = body
-    
-    def __repr__(self) -> str:
-        return f"FunNode({self.name}, {self.parameters}, {self.body})"
+import typing as ty
+
+import tok
+
+# Please note TT is defined here!
+TTn = tok.Token
+TT = tok.TokenTypes
+
+
+class ASTNode:
+    "Base of the syntax tree nodes. token is the token a node starts at, for reporting positions."
+    __slots__ = ("token",)
+
+
+class ProgramNode(ASTNode):
+    "names are the program's names by slot, None until they are resolved (see resolver.Resolver)."
+    __slots__ = ("body", "typing", "names")
+    
+    def __init__(self, body:"StatementNode|None", typing:int, token:TTn|None=None) -> None:
+        self.body:StatementNode|None = body
+        self.typing:int = typing # 0 for static, 1 for dynamic
+        self.names:ty.List[str]|None = None
+        self.token:TTn|None = token
+    
+    def __repr__(self) -> str:
+        return f"ProgramNode({self.body}, typing={self.typing})"
+
+
+class StatementNode(ASTNode):
+    "A chain of statements; iterating over it yields them in order."
+    __slots__ = ("statement", "nextStatement")
+    
+    def __init__(self, statement, nextStatement=None, token:TTn|None=None) -> None:
+        self.statement = statement
+        self.nextStatement = nextStatement
+        self.token:TTn|None = token
+    
+    def __iter__(self) -> ty.Iterator[ASTNode]:
+        node:StatementNode|None = self
+        while node != None:
+            yield node.statement
+            node = node.nextStatement
+    
+    def __repr__(self) -> str:
+        # Built without recursion, chains can be as long as a program
+        statements:ty.List[ASTNode] = list(self)
+        return "".join(f"StatementNode({statement}, " for statement in statements) + "None" + ')' * len(statements)
+
+
+def statements(chain:StatementNode|None) -> ty.Iterator[ASTNode]:
+    "The statements of a chain, which is None for an empty block."
+    return iter(chain) if chain != None else iter(())
+
+
+class BinOpNode(ASTNode):
+    "leftTyp and rightTyp are the operand types where known, None until type checking otherwise."
+    __slots__ = ("left", "op", "right", "leftTyp", "rightTyp")
+    
+    def __init__(self, left:ty.Any, op:str, right:ty.Any, leftType:TT|None=None, rightTyp:TT|None=None, token:TTn|None=None) -> None:
+        self.left:ty.Any = left
+        self.op:str = op
+        self.right:ty.Any = right
+        self.leftTyp:TT|None = leftType
+        self.rightTyp:TT|None = rightTyp
+        self.token:TTn|None = token
+    
+    def __repr__(self) -> str:
+        return f"BinOp({self.left}, {self.op}, {self.right}, type=({self.leftTyp}, {self.rightTyp}))"
+
+
+class UnaryOpNode(ASTNode):
+    __slots__ = ("op", "operand", "typ")
+    
+    def __init__(self, op:str, operand:ty.Any, token:TTn|None=None) -> None:
+        self.op:str = op
+        self.operand:ty.Any = operand
+        self.typ:TT|None = None
+        self.token:TTn|None = token
+    
+    def __repr__(self) -> str:
+        return f"UnaryNode({self.op}, {self.operand}, type={self.typ})"
+
+class NumNode(ASTNode):
+    __slots__ = ("val", "typ")
+    
+    def __init__(self, val:int|float, typ:TT, token:TTn|None=None) -> None:
+        self.val:int|float = val
+        self.typ:TT = typ
+        self.token:TTn|None = token
+    
+    def __repr__(self) -> str:
+        return f"NumNode({self.val}, type={self.typ.name})"
+
+
+class StrNode(ASTNode):
+    __slots__ = ("val",)
+    
+    def __init__(self, val:str, token:TTn|None=None) -> None:
+        self.val:str = val
+        self.token:TTn|None = token
+    
+    def __repr__(self) -> str:
+        return f"StrNode({self.val!r})"
+
+
+class IdentNode(ASTNode):
+    """
+    typ is the declared type in a let, TT.IDENT for a name used in an expression. depth and slot locate the name
+    once resolved (see resolver.Resolver), and checked is whether it may not hold a value yet when it is read.
+    """
+    __slots__ = ("name", "typ", "depth", "slot", "checked")
+    
+    def __init__(self, name:str, typ:TT, token:TTn|None=None) -> None:
+        self.name:str = name
+        self.typ:TT = typ
+        self.depth:int|None = None
+        self.slot:int|None = None
+        self.checked:bool = True
+        self.token:TTn|None = token
+    
+    def __repr__(self) -> str:
+        return f"IdentNode({self.name}, type={self.typ.name})"
+
+
+class LetNode(ASTNode):
+    __slots__ = ("ident", "val", "typ")
+    
+    def __init__(self, ident:IdentNode, val:ty.Any, typ:TT, token:TTn|None=None) -> None:
+        self.ident:IdentNode = ident
+        self.val:ty.Any = val
+        self.typ:TT = typ
+        self.token:TTn|None = token
+    
+    def __repr__(self) -> str:
+        return f"AssignNode({self.ident}, {self.val}, type={self.typ.name})"
+
+
+class PrintNode(ASTNode):
+    __slots__ = ("val",)
+    
+    def __init__(self, val:ty.Any, token:TTn|None=None) -> None:
+        self.val:ty.Any = val
+        self.token:TTn|None = token
+    
+    def __repr__(self) -> str:
+        return f"PrintNode({self.val})"
+
+
+class IfNode(ASTNode):
+    "An elif is an IfNode alone in the elseBranch of the previous one."
+    __slots__ = ("condition", "thenBranch", "elseBranch")
+    
+    def __init__(self, condition, thenBranch, elseBranch=None, token:TTn|None=None) -> None:
+        self.condition = condition
+        self.thenBranch = thenBranch
+        # self.elifBranches = elifBranches
+        self.elseBranch = elseBranch
+        self.token:TTn|None = token
+    
+    def __repr__(self) -> str:
+        return f"IfNode({self.condition}, then={self.thenBranch}, else={self.elseBranch})"
+
+
+class WhileNode(ASTNode):
+    __slots__ = ("condition", "thenBranch")
+    
+    def __init__(self, condition, thenBranch, token:TTn|None=None) -> None:
+        self.condition = condition
+        self.thenBranch = thenBranch
+        self.token:TTn|None = token
+    
+    def __repr__(self) -> str:
+        return f"WhileNode({self.condition}, then={self.thenBranch})"
+
+
+class ForNode(ASTNode):
+    __slots__ = ("iterable", "thenBranch")
+    
+    def __init__(self, iterable, thenBranch, token:TTn|None=None) -> None:
+        self.iterable = iterable
+        self.thenBranch = thenBranch
+        self.token:TTn|None = token
+    
+    def __repr__(self) -> str:
+        return f"IfNode({self.iterable}, then={self.thenBranch})"
+
+
+class FunNode(ASTNode):
+    "names are the names of the body by slot, its parameters first, None until they are resolved."
+    __slots__ = ("name", "parameters", "body", "names")
+    
+    def __init__(self, name, parameters, body, token:TTn|None=None) -> None:
+        self.name = name
+        self.parameters = parameters
+        self.body = body
+        self.names:ty.List[str]|None = None
+        self.token:TTn|None = token
+    
+    def __repr__(self) -> str:
+        return f"FunNode({self.name}, {self.parameters}, {self.body})"
@@ -0,0 +1,454 @@
+import sys
+import typing as ty
+
+import asTree as at
+import diagnostics as dm
+import err
+import parse
+import resolver as rs
+import tok
+import transpiler as tp
+import typeChecker as tc
+
+Closure = ty.Callable[[ty.List[ty.Any]], ty.Any]
+Operator = ty.Callable[[ty.Any, ty.Any], ty.Any]
+CHAIN:int = 16 # operators on the left of one another from which they are run by a loop, not by nested closures
+DEEP:int = 100 # operators nested in a statement from which running it may exceed the recursion limit
+
+
+class Failure(Exception):
+    "Stops a run at a run-time error: the error type, its arguments and the offset of the error in the source."
+    def __init__(self, errType:ty.Type[err.Error], *args:ty.Any, offset:int=-1) -> None:
+        super().__init__(errType, *args)
+        self.offset:int = offset
+
+
+def depth(node:ty.Any) -> int:
+    "How deeply the operators of an expression nest, found without recursion."
+    deepest:int = 0
+    stack:ty.List[ty.Tuple[ty.Any, int]] = [(node, 0)]
+    while stack:
+        node, level = stack.pop()
+        deepest = max(deepest, level)
+        if isinstance(node, at.BinOpNode):
+            stack.append((node.left, level + 1))
+            stack.append((node.right, level + 1))
+        elif isinstance(node, at.UnaryOpNode):
+            stack.append((node.operand, level + 1))
+    return deepest
+
+
+# Operand types of the language's values, and a sample value of each
+SAMPLES:ty.Dict[type, ty.Any] = {bool: True, int: 2, float: 1.5, str: "s"}
+
+
+def handlers(f:ty.Callable[..., ty.Any], unary:bool=False) -> ty.Dict[ty.Tuple[type, type], ty.Callable[..., ty.Any]]:
+    "The operand type pairs f takes, found by trying it on samples, with f as their handler (a unary f's right type is that of None)."
+    table:ty.Dict[ty.Tuple[type, type], ty.Callable[..., ty.Any]] = {}
+    for left, leftSample in SAMPLES.items():
+        for right, rightSample in ({type(None): None} if unary else SAMPLES).items():
+            try:
+                f(leftSample) if unary else f(leftSample, rightSample)
+            except TypeError:
+                continue
+            table[(left, right)] = f
+    return table
+
+
+HANDLERS:ty.Dict[str, ty.Dict[ty.Tuple[type, type], Operator]] = {op: handlers(parse.ops[op]) for op in tp.PY_OPS}
+NEG_HANDLERS:ty.Dict[ty.Tuple[type, type], ty.Callable[[ty.Any], ty.Any]] = handlers(parse.UNARY_OPS['-'], True)
+
+
+class InlineCache:
+    """
+    The inline cache of an operator site of a ~dynamic program: the operand types it saw last and their handler,
+    which the site calls as long as its operands keep those types (hits). On a miss the handler is looked up by
+    the new types in the operator's table of handlers (see handlers()), or is the operator's generic function for
+    types it does not take, which fails. The site holds the types and handler miss() last set in variables of its
+    own, and counts its hits and misses in counts. A unary site's right type is that of None.
+    """
+    __slots__ = ("op", "token", "table", "generic", "left", "right", "counts")
+    
+    def __init__(self, op:str, token:tok.Token, table:ty.Dict[ty.Tuple[type, type], ty.Callable[..., ty.Any]], generic:ty.Callable[..., ty.Any]) -> None:
+        self.op:str = op
+        self.token:tok.Token = token
+        self.table:ty.Dict[ty.Tuple[type, type], ty.Callable[..., ty.Any]] = table
+        self.generic:ty.Callable[..., ty.Any] = generic
+        self.left:type|None = None
+        self.right:type|None = None
+        self.counts:ty.List[int] = [0, 0] # hits, misses
+    
+    @property
+    def hits(self) -> int:
+        return self.counts[0]
+    
+    @property
+    def misses(self) -> int:
+        return self.counts[1]
+    
+    def miss(self, left:ty.Any, right:ty.Any=None) -> ty.Callable[..., ty.Any]:
+        "The handler for operands of the types of left and right, whose types become the site's if there is one."
+        self.counts[1] += 1
+        handler:ty.Callable[..., ty.Any]|None = self.table.get((type(left), type(right)))
+        if handler == None:
+            self.left = self.right = None
+            return self.generic
+        self.left, self.right = type(left), type(right)
+        return handler
+
+
+class CacheStats:
+    "The hits and misses of the inline caches of the program a ClosureEngine compiled last, over all its runs."
+    def __init__(self) -> None:
+        self.caches:ty.List[InlineCache] = []
+    
+    @property
+    def hits(self) -> int:
+        return sum(cache.hits for cache in self.caches)
+    
+    @property
+    def misses(self) -> int:
+        return sum(cache.misses for cache in self.caches)
+    
+    @property
+    def polymorphic(self) -> int:
+        "Sites that missed after their first evaluation, their operands having changed types."
+        return sum(cache.misses > 1 for cache in self.caches)
+    
+    def __repr__(self) -> str:
+        return f"CacheStats(sites={len(self.caches)}, hits={self.hits}, misses={self.misses}, polymorphic={self.polymorphic})"
+    
+    def asDict(self) -> ty.Dict[str, int]:
+        return {"sites": len(self.caches), "hits": self.hits, "misses": self.misses, "polymorphic": self.polymorphic}
+
+
+class ClosureEngine:
+    """
+    Runs a syntax tree from Parser.parseTree() by turning every statement and expression into a Python closure once,
+    then calling the closure of the program. Operators are bound to their function of the parser's ops table when
+    compiling, and names to slots of a list (env), so running does no dispatch on node types and no name lookups.
+    
+    Names take the slots resolver.Resolver gave them, as in compiler.Compiler: one per name of the program, and slots
+    of its own in a function body for its parameters and lets. A read the resolver found always let before it does
+    not check its slot, and an operation typeChecker.TypeChecker found cannot fail (see typeChecker.infallible())
+    is not guarded by a handler for its errors. With caches, every operator of a ~dynamic program, whose types are not
+    checked, gets an InlineCache of its own: while its operands keep their types the site calls their handler with no
+    lookup, and stats counts its hits and misses, which shows the sites whose types change. The handlers being the
+    ops table's own functions, the guard and the counts cost more than they save (see bench/engines.py), so caches
+    are off by default. A chain of CHAIN or more operators
+    on the left of one another, as in 1 + 2 + 3 + ..., becomes one closure looping over its operands, so long chains
+    do not nest closures as deep as they are long. A statement nested too deeply to compile or run within the
+    recursion limit is reported as an error. print writes to out (stdout by default). A run-time error is reported
+    to diagnostics (stdout by default) like the parser's errors and stops the program.
+    """
+    def __init__(self, out:ty.TextIO|None=None, diagnostics:dm.Diagnostics|None=None, caches:bool=False) -> None:
+        self.out:ty.TextIO = out if out != None else sys.stdout
+        self.diagnostics:dm.Diagnostics = diagnostics if diagnostics != None else dm.Diagnostics()
+        self.caches:bool = caches
+        self.names:ty.List[str] = []
+        self.globals:ty.List[ty.Any] = []
+        self.functions:ty.Dict[str, ty.Tuple[Closure, ty.Dict[str, str], int]] = {}
+        self.errors:int = 0
+        self.stats:CacheStats = CacheStats()
+        self.__cached:bool = False
+    
+    def compile(self, program:at.ProgramNode) -> Closure:
+        "Closure running the program with an env of len(self.names) slots."
+        self.names = list(rs.resolved(program).names)
+        self.__cached = self.caches and program.typing == 1
+        self.stats = CacheStats()
+        return self.__block(program.body)
+    
+    def run(self, program:at.ProgramNode|Closure) -> bool:
+        "Run a program (or the closure compile() made of it); False if it stopped at an error."
+        root:Closure = self.compile(program) if isinstance(program, at.ProgramNode) else program
+        self.globals = [None] * len(self.names)
+        return self.__call(root, self.globals)
+    
+    def call(self, name:str, *args:ty.Any) -> bool:
+        "Run the body of a function defined by the program last run(), with args for its parameters."
+        if name not in self.functions:
+            raise NameError(f"{name}() is not defined: run() the program defining it first.")
+        body, parameters, size = self.functions[name]
+        if len(args) != len(parameters):
+            raise TypeError(f"{name}() takes {len(parameters)} arguments, got {len(args)}.")
+        return self.__call(body, list(args) + [None] * (size - len(args)))
+    
+    def __call(self, closure:Closure, env:ty.List[ty.Any]) -> bool:
+        try:
+            closure(env)
+            return True
+        except Failure as failure:
+            self.__error(*failure.args, offset=failure.offset)
+            return False
+    
+    def __error(self, errType:ty.Type[err.Error], *args:ty.Any, offset:int=-1) -> None:
+        "Displays errors."
+        self.errors += 1
+        self.diagnostics.add(errType, *args, offset=offset)
+        self.diagnostics.flush()
+    
+    def __block(self, block:at.StatementNode|None) -> Closure:
+        statements:ty.Tuple[Closure, ...] = tuple(self.__guarded(node) for node in at.statements(block))
+        if len(statements) == 1:
+            return statements[0]
+        
+        def run(env:ty.List[ty.Any]) -> None:
+            for statement in statements:
+                statement(env)
+        return run
+    
+    def __guarded(self, node:at.ASTNode) -> Closure:
+        "The closure of a statement, or one reporting it if it is nested too deeply to compile or to run."
+        token:tok.Token = node.token
+        def tooDeep() -> Failure:
+            pos:int = token.printPos - token.size + 1
+            return Failure(err.exprErr, token, token.line, pos, f"Expression nested too deeply at line {token.line} pos {pos}.",
+                           offset=token.pos - token.size + 1)
+        try:
+            statement:Closure = self.__statement(node)
+        except RecursionError:
+            failure:Failure = tooDeep()
+            def fail(env:ty.List[ty.Any]) -> None:
+                raise failure
+            return fail
+        
+        expression:ty.Any = getattr(node, "val", None) or getattr(node, "condition", None)
+        if expression == None or depth(expression) < DEEP:
+            return statement
+        def guarded(env:ty.List[ty.Any]) -> None:
+            try:
+                statement(env)
+            except RecursionError:
+                raise tooDeep() from None
+        return guarded
+    
+    def __statement(self, node:at.ASTNode) -> Closure:
+        if isinstance(node, at.LetNode):
+            value:Closure = self.__expr(node.val)
+            slot:int = node.ident.slot
+            def let(env:ty.List[ty.Any]) -> None:
+                env[slot] = value(env)
+            return let
+        
+        elif isinstance(node, at.PrintNode):
+            write:ty.Callable[[str], ty.Any] = self.out.write
+            if isinstance(node.val, at.StrNode):
+                line:str = f"{node.val.val}\n"
+                return lambda env: write(line)
+            value = self.__expr(node.val)
+            return lambda env: write(f"{value(env)}\n")
+        
+        elif isinstance(node, at.IfNode):
+            condition:Closure = self.__expr(node.condition)
+            thenBranch:Closure = self.__block(node.thenBranch)
+            if node.elseBranch == None:
+                def if_(env:ty.List[ty.Any]) -> None:
+                    if condition(env):
+                        thenBranch(env)
+                return if_
+            
+            elseBranch:Closure = self.__block(node.elseBranch)
+            def ifElse(env:ty.List[ty.Any]) -> None:
+                if condition(env):
+                    thenBranch(env)
+                else:
+                    elseBranch(env)
+            return ifElse
+        
+        elif isinstance(node, at.WhileNode):
+            condition = self.__expr(node.condition)
+            body:Closure = self.__block(node.thenBranch)
+            def while_(env:ty.List[ty.Any]) -> None:
+                while condition(env):
+                    body(env)
+            return while_
+        
+        elif isinstance(node, at.FunNode):
+            body = self.__block(node.body)
+            function:ty.Tuple[Closure, ty.Dict[str, str], int] = (body, node.parameters, len(node.names))
+            functions:ty.Dict[str, ty.Tuple[Closure, ty.Dict[str, str], int]] = self.functions
+            name:str = node.name
+            def fun(env:ty.List[ty.Any]) -> None:
+                functions[name] = function
+            return fun
+        
+        return lambda env: None
+    
+    def __expr(self, node:at.ASTNode) -> Closure:
+        if isinstance(node, at.NumNode) or isinstance(node, at.StrNode):
+            constant:ty.Any = node.val
+            return lambda env: constant
+        
+        elif isinstance(node, at.IdentNode):
+            token:tok.Token = node.token
+            slot:int = node.slot
+            if node.depth:
+                engine:ClosureEngine = self
+                def loadGlobal(env:ty.List[ty.Any]) -> ty.Any:
+                    if (value:=engine.globals[slot]) is None:
+                        raise Failure(err.unknownIdent, token, token.line, token.printPos - token.size + 1, offset=token.pos - token.size + 1)
+                    return value
+                return loadGlobal
+            
+            if not node.checked:
+                return lambda env: env[slot]
+            def load(env:ty.List[ty.Any]) -> ty.Any:
+                if (value:=env[slot]) is None:
+                    raise Failure(err.unknownIdent, token, token.line, token.printPos - token.size + 1, offset=token.pos - token.size + 1)
+                return value
+            return load
+        
+        elif isinstance(node, at.UnaryOpNode):
+            operand:Closure = self.__expr(node.operand)
+            token = node.token
+            if node.op == '-' and node.typ in (tc.TT.BOOL, tc.TT.INT):
+                return lambda env: -operand(env)
+            if node.op == '-' and self.__cached:
+                return self.__cachedNeg(node, operand)
+            if node.op == '-':
+                def neg(env:ty.List[ty.Any]) -> ty.Any:
+                    try:
+                        return -operand(env)
+                    except (ArithmeticError, TypeError) as e:
+                        raise self.__illegal(token, e) from None
+                return neg
+            return operand
+        
+        elif isinstance(node, at.BinOpNode):
+            return self.__binOp(node)
+        
+        raise TypeError(f"Cannot compile {node.__class__.__name__}.")
+    
+    def __binOp(self, node:at.BinOpNode) -> Closure:
+        spine:ty.Any = node.left
+        for _ in range(CHAIN - 1):
+            if not isinstance(spine, at.BinOpNode):
+                break
+            spine = spine.left
+        else:
+            return self.__chain(node)
+        f:ty.Callable[[ty.Any, ty.Any], ty.Any] = parse.ops[node.op]
+        token:tok.Token = node.token
+        illegal:ty.Callable[[tok.Token, Exception], Failure] = self.__illegal
+        left:Closure = self.__expr(node.left)
+        if self.__cached:
+            return self.__cachedBinOp(node, f, left)
+        infallible:bool = tc.infallible(node.op, node.leftTyp, node.rightTyp)
+        
+        # Constant right operand, as in i + 1 or i < n: one call less per evaluation
+        if isinstance(node.right, at.NumNode) or isinstance(node.right, at.StrNode):
+            constant:ty.Any = node.right.val
+            if infallible:
+                return lambda env: f(left(env), constant)
+            def binOpConst(env:ty.List[ty.Any]) -> ty.Any:
+                try:
+                    return f(left(env), constant)
+                except (ArithmeticError, TypeError) as e:
+                    raise illegal(token, e) from None
+            return binOpConst
+        
+        right:Closure = self.__expr(node.right)
+        if infallible:
+            return lambda env: f(left(env), right(env))
+        def binOp(env:ty.List[ty.Any]) -> ty.Any:
+            try:
+                return f(left(env), right(env))
+            except (ArithmeticError, TypeError) as e:
+                raise illegal(token, e) from None
+        return binOp
+    
+    def __chain(self, node:at.BinOpNode) -> Closure:
+        "A chain of operators on the left of one another, run by a loop from its first operand on."
+        links:ty.List[at.BinOpNode] = []
+        while isinstance(node, at.BinOpNode):
+            links.append(node)
+            node = node.left
+        first:Closure = self.__expr(node)
+        steps:ty.Tuple[ty.Tuple[Operator, Closure, tok.Token], ...] = tuple(
+            (parse.ops[link.op], self.__expr(link.right), link.token) for link in reversed(links))
+        illegal:ty.Callable[[tok.Token, Exception], Failure] = self.__illegal
+        def chain(env:ty.List[ty.Any]) -> ty.Any:
+            value:ty.Any = first(env)
+            for f, right, token in steps:
+                try:
+                    value = f(value, right(env))
+                except (ArithmeticError, TypeError) as e:
+                    raise illegal(token, e) from None
+            return value
+        return chain
+    
+    def __cachedBinOp(self, node:at.BinOpNode, f:Operator, left:Closure) -> Closure:
+        "The operation of node through an InlineCache of its own, its types and handler held by the site."
+        token:tok.Token = node.token
+        illegal:ty.Callable[[tok.Token, Exception], Failure] = self.__illegal
+        cache:InlineCache = self.__cache(node, HANDLERS[node.op], f)
+        counts:ty.List[int] = cache.counts
+        leftType:type|None = None
+        rightType:type|None = None
+        handler:Operator = f
+        
+        if isinstance(node.right, at.NumNode) or isinstance(node.right, at.StrNode):
+            constant:ty.Any = node.right.val
+            def cachedBinOpConst(env:ty.List[ty.Any]) -> ty.Any:
+                nonlocal leftType, rightType, handler
+                leftVal:ty.Any = left(env)
+                if type(leftVal) is leftType:
+                    counts[0] += 1
+                else:
+                    handler = cache.miss(leftVal, constant)
+                    leftType, rightType = cache.left, cache.right
+                try:
+                    return handler(leftVal, constant)
+                except (ArithmeticError, TypeError) as e:
+                    raise illegal(token, e) from None
+            return cachedBinOpConst
+        
+        right:Closure = self.__expr(node.right)
+        def cachedBinOp(env:ty.List[ty.Any]) -> ty.Any:
+            nonlocal leftType, rightType, handler
+            leftVal:ty.Any = left(env)
+            rightVal:ty.Any = right(env)
+            if type(leftVal) is leftType and type(rightVal) is rightType:
+                counts[0] += 1
+            else:
+                handler = cache.miss(leftVal, rightVal)
+                leftType, rightType = cache.left, cache.right
+            try:
+                return handler(leftVal, rightVal)
+            except (ArithmeticError, TypeError) as e:
+                raise illegal(token, e) from None
+        return cachedBinOp
+    
+    def __cachedNeg(self, node:at.UnaryOpNode, operand:Closure) -> Closure:
+        "The negation of node through an InlineCache of its own, its type and handler held by the site."
+        token:tok.Token = node.token
+        illegal:ty.Callable[[tok.Token, Exception], Failure] = self.__illegal
+        cache:InlineCache = self.__cache(node, NEG_HANDLERS, parse.UNARY_OPS['-'])
+        counts:ty.List[int] = cache.counts
+        operandType:type|None = None
+        handler:ty.Callable[[ty.Any], ty.Any] = cache.generic
+        def cachedNeg(env:ty.List[ty.Any]) -> ty.Any:
+            nonlocal operandType, handler
+            value:ty.Any = operand(env)
+            if type(value) is operandType:
+                counts[0] += 1
+            else:
+                handler = cache.miss(value)
+                operandType = cache.left
+            try:
+                return handler(value)
+            except (ArithmeticError, TypeError) as e:
+                raise illegal(token, e) from None
+        return cachedNeg
+    
+    def __cache(self, node:at.BinOpNode|at.UnaryOpNode, table:ty.Dict[ty.Tuple[type, type], ty.Callable[..., ty.Any]], generic:ty.Callable[..., ty.Any]) -> InlineCache:
+        cache:InlineCache = InlineCache(node.op, node.token, table, generic)
+        self.stats.caches.append(cache)
+        return cache
+    
+    @staticmethod
+    def __illegal(token:tok.Token, e:Exception) -> Failure:
+        pos:int = token.printPos - token.size + 1
+        return Failure(err.illegalOp, token.val, token.line, pos, f"Cannot evaluate \"{token.val}\" ({e}) at line {token.line} pos {pos}.",
+                       offset=token.pos - token.size + 1)
@@ -1,3 +1,2 @@
-import other as ot
-
-ANSI = ot.isANSISupported()
\ No newline at end of file
+# Version of the language and its tools; caches written by another version are not used
+VERSION = "0.1.0"
@@ -0,0 +1,181 @@
+import array
+import enum
+import operator
+import typing as ty
+
+import asTree as at
+import resolver as rs
+import tok
+
+TT = tok.TokenTypes
+
+
+class OpCodes(enum.IntEnum):
+    "Instructions of the bytecode; every one is followed by an argument word (0 when unused)."
+    HALT = 0            # end of the code
+    CONST = 1           # push consts[arg]
+    LOAD = 2            # push slot arg
+    LOAD_GLOBAL = 3     # push slot arg of the program (from a function body)
+    STORE = 4           # pop into slot arg
+    BINARY = 5          # pop right, replace left by BINARY_OPS[arg](left, right)
+    UNARY = 6           # replace top by UNARY_OPS[arg](top)
+    PRINT = 7           # pop and print
+    JUMP = 8            # continue at arg
+    JUMP_IF_FALSE = 9   # pop, continue at arg if falsy
+    JUMP_IF_TRUE = 10   # pop, continue at arg if truthy
+    DEFINE = 11         # define the function compiled to consts[arg]
+
+
+# Same operators as the parser's ops table
+BINARY_OPS:ty.Tuple[str, ...] = ('+', '-', '*', '/', '^', '%', '==', '!=', '<', '<=', '>', '>=')
+BINARY_FUNCS:ty.Tuple[ty.Callable[[ty.Any, ty.Any], ty.Any], ...] = (
+    operator.add, operator.sub, operator.mul, operator.truediv, operator.pow, operator.mod,
+    operator.eq, operator.ne, operator.lt, operator.le, operator.gt, operator.ge
+)
+UNARY_OPS:ty.Tuple[str, ...] = ('-', '+')
+UNARY_FUNCS:ty.Tuple[ty.Callable[[ty.Any], ty.Any], ...] = (operator.neg, operator.pos)
+
+
+class Code:
+    """
+    Bytecode of the program or of one function: instructions as (opcode, argument) pairs in an array, the constants
+    and slot names they refer to, and the tokens of the instructions that can fail at run time for reporting them.
+    A function's parameters take its first slots, in order; names are the slots' names, if known beforehand.
+    """
+    def __init__(self, name:str, parameters:ty.Dict[str, str]|None=None, names:ty.List[str]|None=None) -> None:
+        self.name:str = name
+        self.parameters:ty.Dict[str, str] = parameters if parameters != None else {}
+        self.code:array.array = array.array('i')
+        self.consts:ty.List[ty.Any] = []
+        self.names:ty.List[str] = list(names) if names != None else list(self.parameters)
+        self.slots:ty.Dict[str, int] = {name: slot for slot, name in enumerate(self.names)}
+        self.tokens:ty.Dict[int, tok.Token] = {}
+        self.__constIndex:ty.Dict[ty.Tuple[type, ty.Any], int] = {}
+    
+    def __repr__(self) -> str:
+        return f"Code({self.name}, {len(self.code) // 2} instructions, {len(self.names)} slots)"
+    
+    def emit(self, op:OpCodes, arg:int=0, token:tok.Token|None=None) -> int:
+        "Append an instruction and return its address."
+        if token != None:
+            self.tokens[len(self.code)] = token
+        self.code.append(op)
+        self.code.append(arg)
+        return len(self.code) - 2
+    
+    def patch(self, address:int, target:int|None=None) -> None:
+        "Point the jump at address to target (the end of the code by default)."
+        self.code[address + 1] = len(self.code) if target == None else target
+    
+    def const(self, value:ty.Any) -> int:
+        key:ty.Tuple[type, ty.Any] = (type(value), value)
+        if key not in self.__constIndex:
+            self.__constIndex[key] = len(self.consts)
+            self.consts.append(value)
+        return self.__constIndex[key]
+    
+    def slot(self, name:str) -> int:
+        if name not in self.slots:
+            self.slots[name] = len(self.names)
+            self.names.append(name)
+        return self.slots[name]
+    
+    def disassemble(self) -> str:
+        lines:ty.List[str] = []
+        for address in range(0, len(self.code), 2):
+            op:OpCodes = OpCodes(self.code[address])
+            arg:int = self.code[address + 1]
+            if op == OpCodes.CONST or op == OpCodes.DEFINE:
+                note:str = repr(self.consts[arg])
+            elif op == OpCodes.LOAD or op == OpCodes.STORE:
+                note = self.names[arg]
+            elif op == OpCodes.BINARY:
+                note = BINARY_OPS[arg]
+            elif op == OpCodes.UNARY:
+                note = UNARY_OPS[arg]
+            else:
+                note = ''
+            lines.append(f"{address:>6} {op.name:<14}{arg:<6}{note}")
+        return '\n'.join(lines)
+
+
+class Compiler:
+    """
+    Compiles a syntax tree from Parser.parseTree() to bytecode. Names take the slots resolver.Resolver gave them
+    (resolving the tree first if it is not yet): the program's code has one slot per name of the program, a function
+    body has slots of its own for its parameters and lets and reads the program's slots for the other names.
+    """
+    def compile(self, program:at.ProgramNode) -> Code:
+        code:Code = Code("<program>", names=rs.resolved(program).names)
+        self.__block(code, program.body)
+        code.emit(OpCodes.HALT)
+        return code
+    
+    def __block(self, code:Code, block:at.StatementNode|None) -> None:
+        for statement in at.statements(block):
+            self.__statement(code, statement)
+    
+    def __statement(self, code:Code, node:at.ASTNode) -> None:
+        if isinstance(node, at.LetNode):
+            self.__expr(code, node.val)
+            code.emit(OpCodes.STORE, node.ident.slot)
+        
+        elif isinstance(node, at.PrintNode):
+            if isinstance(node.val, at.StrNode):
+                code.emit(OpCodes.CONST, code.const(node.val.val))
+            else:
+                self.__expr(code, node.val)
+            code.emit(OpCodes.PRINT)
+        
+        elif isinstance(node, at.IfNode):
+            self.__expr(code, node.condition)
+            skip:int = code.emit(OpCodes.JUMP_IF_FALSE)
+            self.__block(code, node.thenBranch)
+            if node.elseBranch != None:
+                end:int = code.emit(OpCodes.JUMP)
+                code.patch(skip)
+                self.__block(code, node.elseBranch)
+                code.patch(end)
+            else:
+                code.patch(skip)
+        
+        elif isinstance(node, at.WhileNode):
+            # Condition after the body: one jump per iteration
+            enter:int = code.emit(OpCodes.JUMP)
+            body:int = len(code.code)
+            self.__block(code, node.thenBranch)
+            code.patch(enter)
+            self.__expr(code, node.condition)
+            code.emit(OpCodes.JUMP_IF_TRUE, body)
+        
+        elif isinstance(node, at.FunNode):
+            function:Code = Code(node.name, node.parameters, node.names)
+            self.__block(function, node.body)
+            function.emit(OpCodes.HALT)
+            code.emit(OpCodes.DEFINE, code.const(function))
+    
+    def __expr(self, code:Code, node:at.ASTNode) -> None:
+        # Explicit stack: operator chains can be as long as a line
+        stack:ty.List[ty.Tuple[at.ASTNode, bool]] = [(node, False)]
+        while stack:
+            node, ready = stack.pop()
+            if isinstance(node, at.NumNode):
+                code.emit(OpCodes.CONST, code.const(node.val))
+            
+            elif isinstance(node, at.IdentNode):
+                code.emit(OpCodes.LOAD_GLOBAL if node.depth else OpCodes.LOAD, node.slot, node.token)
+            
+            elif isinstance(node, at.BinOpNode):
+                if ready:
+                    code.emit(OpCodes.BINARY, BINARY_OPS.index(node.op), node.token)
+                else:
+                    stack.extend(((node, True), (node.right, False), (node.left, False)))
+            
+            elif isinstance(node, at.UnaryOpNode):
+                if ready:
+                    code.emit(OpCodes.UNARY, UNARY_OPS.index(node.op), node.token)
+                else:
+                    stack.extend(((node, True), (node.operand, False)))
+            
+            elif isinstance(node, at.StrNode):
+                code.emit(OpCodes.CONST, code.const(node.val))
@@ -0,0 +1,105 @@
+import json
+import sys
+import typing as ty
+
+import err
+import other as ot
+
+BATCH_SIZE:int = 64
+
+
+class Diagnostic:
+    """
+    One reported error, as it was reported: the error type, the arguments for it and the offset of the character
+    it is about in the source (-1 if unknown). The message is only built when the diagnostic is rendered.
+    """
+    __slots__ = ("errType", "args", "kwargs", "offset")
+    
+    def __init__(self, errType:ty.Type[err.Error], args:ty.Tuple[ty.Any, ...], kwargs:ty.Dict[str, ty.Any], offset:int=-1) -> None:
+        self.errType:ty.Type[err.Error] = errType
+        self.args:ty.Tuple[ty.Any, ...] = args
+        self.kwargs:ty.Dict[str, ty.Any] = kwargs
+        self.offset:int = offset
+    
+    def error(self) -> err.Error:
+        return self.errType(*self.args, **self.kwargs)
+    
+    def __str__(self) -> str:
+        return str(self.error())
+    
+    def asDict(self) -> ty.Dict[str, ty.Any]:
+        "The diagnostic for tools: its code (like parser.syntaxErr), line, pos, offset and message."
+        error:err.Error = self.error()
+        # Every error type takes the line and pos after what the error is about
+        line:ty.Any = self.args[1] if len(self.args) > 2 else None
+        pos:ty.Any = self.args[2] if len(self.args) > 2 else None
+        return {"code": f"{error.metatyp}.{error.typ}", "line": line, "pos": pos, "offset": self.offset, "message": error.msg}
+
+
+class Diagnostics:
+    """
+    Collects the errors of a lexer, a parser or an engine and writes them to out (stdout at the time of writing by
+    default) in batches of batchSize, as text lines starting with ?? or with asJson as one JSON object per line.
+    Whatever is pending is written by flush(), which the parser calls when it is done; with write False nothing
+    is written and the diagnostics are only kept in records.
+    
+    Only the first limit errors (all if None) are kept and written, with a note once the limit is passed;
+    count goes on counting them all.
+    """
+    def __init__(self, out:ty.TextIO|None=None, limit:int|None=None, asJson:bool=False, write:bool=True, batchSize:int=BATCH_SIZE) -> None:
+        self.out:ty.TextIO|None = out
+        self.limit:int|None = limit
+        self.asJson:bool = asJson
+        self.write:bool = write
+        self.batchSize:int = batchSize
+        self.records:ty.List[Diagnostic] = []
+        self.count:int = 0
+        self.__written:int = 0 # records written so far
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    @property
+    def dropped(self) -> int:
+        "Errors past the limit, counted but not kept."
+        return self.count - len(self.records)
+    
+    def add(self, errType:ty.Type[err.Error], *args:ty.Any, offset:int=-1, **kwargs:ty.Any) -> None:
+        "Report an error of errType, built from args and kwargs when it is rendered."
+        self.count += 1
+        if self.limit != None and len(self.records) >= self.limit:
+            if self.count == self.limit + 1 and self.write:
+                self.flush()
+                if not self.asJson:
+                    self.__stream().write(f"{ot.errorMark()} Too many errors, only the first {self.limit} are shown.\n")
+            return
+        
+        self.records.append(Diagnostic(errType, args, kwargs, offset))
+        if self.write and len(self.records) - self.__written >= self.batchSize:
+            self.flush()
+    
+    def flush(self) -> None:
+        "Write the pending diagnostics."
+        if not self.write or self.__written == len(self.records):
+            return
+        
+        pending:ty.List[Diagnostic] = self.records[self.__written:]
+        self.__written = len(self.records)
+        if self.asJson:
+            text:str = ''.join(json.dumps(record.asDict(), ensure_ascii=False, default=str) + '\n' for record in pending)
+        else:
+            mark:str = ot.errorMark() + ' '
+            text = ''.join(mark + str(record) + '\n' for record in pending)
+        stream:ty.TextIO = self.__stream()
+        stream.write(text)
+        stream.flush()
+    
+    def messages(self) -> ty.List[str]:
+        "Messages of the kept diagnostics, rendered now."
+        return [str(record) for record in self.records]
+    
+    def asDicts(self) -> ty.List[ty.Dict[str, ty.Any]]:
+        return [record.asDict() for record in self.records]
+    
+    def __stream(self) -> ty.TextIO:
+        return self.out if self.out != None else sys.stdout
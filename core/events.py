@@ -0,0 +1,71 @@
+import enum
+import sys
+import typing as ty
+
+import tok
+
+
+class EventTypes(enum.Enum):
+    "Kinds of events the parser reports to its listener, with what they carry as value."
+    TYPING = 1          # 0 for static, 1 for dynamic
+    PROGRAM_START = 2
+    PROGRAM_END = 3
+    KEYWD = 4           # token is the statement keyword
+    STRING = 5          # token is the printed string
+    EXPRESSION = 6      # an expression starts at token
+    RESULT = 7          # value of the printed expression starting at token
+    COMPARISON = 8
+    PARAMETERS = 9
+    IF_BLOCK = 10       # whether the block will be executed
+    ELIF_BLOCK = 11     # (number of the elif block, whether it will be executed)
+    WHILE_BLOCK = 12    # whether the block will be executed
+
+
+class Listener:
+    """
+    Receives the parser's trace events: their kind, the token they are about, its line and a value for some kinds.
+    Ignores them all; subclass it and override event().
+    """
+    def event(self, kind:EventTypes, token:tok.Token, line:int, value:ty.Any=None) -> None:
+        pass
+
+
+class ConsoleListener(Listener):
+    "Prints the parser's trace events to stdout."
+    def event(self, kind:EventTypes, token:tok.Token, line:int, value:ty.Any=None) -> None:
+        if kind == EventTypes.TYPING:
+            print(f"Typing: {'dynamic' if value else 'static'}")
+        elif kind == EventTypes.PROGRAM_START:
+            print("PROGRAM-START")
+        elif kind == EventTypes.PROGRAM_END:
+            print("PROGRAM-END")
+        elif kind == EventTypes.KEYWD:
+            print(f"KEYWD: {token.val}")
+        elif kind == EventTypes.STRING:
+            print(f"STRING: {token.val}")
+        elif kind == EventTypes.EXPRESSION:
+            print("EXPRESSION")
+        elif kind == EventTypes.RESULT:
+            print("EXPRESSION:", value)
+        elif kind == EventTypes.COMPARISON:
+            print("COMPARISON")
+        elif kind == EventTypes.PARAMETERS:
+            print("PARAMETERS")
+        elif kind == EventTypes.IF_BLOCK:
+            print(f"IF-block will {'' if value else 'NOT '}be executed!")
+        elif kind == EventTypes.ELIF_BLOCK:
+            print(f"ELIF-block ({value[0]}) will {'' if value[1] else 'NOT '}be executed!")
+        elif kind == EventTypes.WHILE_BLOCK:
+            print(f"WHILE-block will {'' if value else 'NOT '}be executed!")
+
+
+class OutputListener(Listener):
+    "Writes only what the program's print statements print, one line each, to out (stdout by default)."
+    def __init__(self, out:ty.TextIO|None=None) -> None:
+        self.out:ty.TextIO|None = out
+    
+    def event(self, kind:EventTypes, token:tok.Token, line:int, value:ty.Any=None) -> None:
+        if kind == EventTypes.STRING:
+            (self.out if self.out != None else sys.stdout).write(f"{token.val.val}\n")
+        elif kind == EventTypes.RESULT:
+            (self.out if self.out != None else sys.stdout).write(f"{value}\n")
@@ -0,0 +1,302 @@
+import array
+import bisect
+import enum
+import typing as ty
+
+import asTree as at
+import basicTypes as bt
+import tok
+
+TT = tok.TokenTypes
+OPS = ('', '+', '-', '*', '/', '^', '%', '==', '!=', '<', '<=', '>', '>=')
+OP_CODES = {op: code for code, op in enumerate(OPS)}
+
+
+class NodeKinds(enum.Enum):
+    PROGRAM = 1
+    BINOP = 2
+    UNARYOP = 3
+    NUM = 4
+    STR = 5
+    IDENT = 6
+    LET = 7
+    PRINT = 8
+    IF = 9
+    WHILE = 10
+    FOR = 11
+    FUN = 12
+
+
+KINDS = {kind.value: kind for kind in NodeKinds}
+# Token types and keywords of rebuilt tokens (see FlatTree.toTree())
+OP_TYPES:ty.Dict[str, TT] = {
+    '+': TT.PLUS, '-': TT.MINUS, '*': TT.ASTERISK, '/': TT.FSLASH, '^': TT.CARET, '==': TT.EQEQ, '!=': TT.NOTEQ,
+    '<': TT.LT, '<=': TT.LTEQ, '>': TT.GT, '>=': TT.GTEQ
+}
+KEYWORDS:ty.Dict[NodeKinds, str] = {
+    NodeKinds.LET: "let", NodeKinds.PRINT: "print", NodeKinds.IF: "if", NodeKinds.WHILE: "while", NodeKinds.FOR: "for", NodeKinds.FUN: "fun"
+}
+
+
+class FlatTree:
+    """
+    A syntax tree stored as parallel array columns instead of one object per node; a node is an integer handle
+    (its index). Nodes are stored children first, so a linear scan visits every child before its parent and the
+    program is the last node.
+    
+    Per node: kinds, ops (index into OPS), up to three child handles (firsts, seconds, thirds; -1 for none),
+    nexts (the next statement of a block, -1 at its end), vals (index into the values pool, -1 for none),
+    tokens (offset of the node's token in the source, -1 for none), sizes (the token's size, which rebuilt tokens
+    could not tell from the node: an elif's, a folded constant's) and typs/rightTyps (TokenTypes values, 0 for none).
+    
+    Children per kind: PROGRAM body; BINOP left, right; UNARYOP operand; LET ident, value; PRINT value;
+    IF condition, then, else; WHILE and FOR condition (iterable), body; FUN body. A block is the handle of its first
+    statement. Values: NUM and STR the literal, IDENT the name, FUN (name, parameters), PROGRAM the typing.
+    typs is a node's typ, or a BINOP's leftTyp; rightTyps a BINOP's rightTyp.
+    """
+    def __init__(self, lineIndex:tok.LineIndex|None=None) -> None:
+        self.lineIndex:tok.LineIndex|None = lineIndex
+        self.kinds:array.array = array.array('b')
+        self.ops:array.array = array.array('b')
+        self.firsts:array.array = array.array('i')
+        self.seconds:array.array = array.array('i')
+        self.thirds:array.array = array.array('i')
+        self.nexts:array.array = array.array('i')
+        self.vals:array.array = array.array('i')
+        self.tokens:array.array = array.array('i')
+        self.sizes:array.array = array.array('i')
+        self.typs:array.array = array.array('h')
+        self.rightTyps:array.array = array.array('h')
+        self.values:ty.List[ty.Any] = []
+        self.__pool:ty.Dict[ty.Tuple[type, ty.Any], int] = {}
+    
+    def __len__(self) -> int:
+        return len(self.kinds)
+    
+    def __repr__(self) -> str:
+        return f"FlatTree({len(self)} nodes, {len(self.values)} values)"
+    
+    @property
+    def root(self) -> int:
+        return len(self.kinds) - 1
+    
+    def add(self, kind:NodeKinds, op:str='', first:int=-1, second:int=-1, third:int=-1, value:ty.Any=None,
+            token:int=-1, size:int=0, typ:TT|None=None, rightTyp:TT|None=None) -> int:
+        "Append a node (its children must be there already) and return its handle."
+        self.kinds.append(kind.value)
+        self.ops.append(OP_CODES[op])
+        self.firsts.append(first)
+        self.seconds.append(second)
+        self.thirds.append(third)
+        self.nexts.append(-1)
+        self.vals.append(-1 if value is None else self.__intern(value))
+        self.tokens.append(token)
+        self.sizes.append(size)
+        self.typs.append(typ.value if typ != None else 0)
+        self.rightTyps.append(rightTyp.value if rightTyp != None else 0)
+        return len(self.kinds) - 1
+    
+    def __intern(self, value:ty.Any) -> int:
+        "Index of value in the values pool, shared by equal values of the same type."
+        key:ty.Tuple[type, ty.Any] = (type(value), value)
+        index:int|None = self.__pool.get(key)
+        if index == None:
+            index = self.__pool[key] = len(self.values)
+            self.values.append(value)
+        return index
+    
+    def kind(self, node:int) -> NodeKinds:
+        return KINDS[self.kinds[node]]
+    
+    def op(self, node:int) -> str:
+        return OPS[self.ops[node]]
+    
+    def children(self, node:int) -> ty.Tuple[int, int, int]:
+        return self.firsts[node], self.seconds[node], self.thirds[node]
+    
+    def value(self, node:int) -> ty.Any:
+        index:int = self.vals[node]
+        return self.values[index] if index != -1 else None
+    
+    def typ(self, node:int) -> TT|None:
+        return tok.TYPES[self.typs[node]] if self.typs[node] else None
+    
+    def line(self, node:int) -> int:
+        "Line of the node's token, -1 without one."
+        return self.lineIndex.line(self.tokens[node]) if self.lineIndex != None and self.tokens[node] != -1 else -1
+    
+    def statements(self, block:int) -> ty.Iterator[int]:
+        "Handles of the statements of the block starting at handle block."
+        while block != -1:
+            yield block
+            block = self.nexts[block]
+    
+    @classmethod
+    def fromTree(cls, program:at.ProgramNode) -> "FlatTree":
+        "Flatten an object tree from Parser.parseTree(); the program becomes the last node."
+        tree:FlatTree = cls()
+        handles:ty.Dict[int, int] = {}
+        # Explicit stack instead of recursion: statement chains and operator chains can be as long as the program
+        stack:ty.List[ty.Tuple[at.ASTNode, bool]] = [(program, False)]
+        while stack:
+            node, ready = stack.pop()
+            if not ready:
+                stack.append((node, True))
+                stack.extend((child, False) for child in cls.__objChildren(node))
+                continue
+            
+            if tree.lineIndex == None and node.token != None:
+                tree.lineIndex = node.token.lineIndex
+            handles[id(node)] = tree.__addObj(node, handles)
+        
+        return tree
+    
+    @staticmethod
+    def __objChildren(node:at.ASTNode) -> ty.List[at.ASTNode]:
+        "Child nodes of an object node, statements of its blocks included."
+        children:ty.List[ty.Any] = []
+        if isinstance(node, at.ProgramNode):
+            children = [node.body]
+        elif isinstance(node, at.BinOpNode):
+            children = [node.left, node.right]
+        elif isinstance(node, at.UnaryOpNode):
+            children = [node.operand]
+        elif isinstance(node, at.LetNode):
+            children = [node.ident, node.val]
+        elif isinstance(node, at.PrintNode):
+            children = [node.val]
+        elif isinstance(node, at.IfNode):
+            children = [node.condition, node.thenBranch, node.elseBranch]
+        elif isinstance(node, at.WhileNode):
+            children = [node.condition, node.thenBranch]
+        elif isinstance(node, at.ForNode):
+            children = [node.iterable, node.thenBranch]
+        elif isinstance(node, at.FunNode):
+            children = [node.body]
+        
+        nodes:ty.List[at.ASTNode] = []
+        for child in children:
+            if isinstance(child, at.StatementNode):
+                nodes.extend(child)
+            elif child != None:
+                nodes.append(child)
+        return nodes
+    
+    def __addObj(self, node:at.ASTNode, handles:ty.Dict[int, int]) -> int:
+        "Append an object node whose children were added already."
+        def handle(child:ty.Any) -> int:
+            if child == None:
+                return -1
+            if not isinstance(child, at.StatementNode):
+                return handles[id(child)]
+            
+            # Link the statements of a block
+            block:ty.List[int] = [handles[id(statement)] for statement in child]
+            for statement, nxt in zip(block, block[1:]):
+                self.nexts[statement] = nxt
+            return block[0]
+        
+        token:int = node.token.pos if node.token != None else -1
+        size:int = node.token.size if node.token != None else 0
+        if isinstance(node, at.ProgramNode):
+            return self.add(NodeKinds.PROGRAM, first=handle(node.body), value=node.typing, token=token, size=size)
+        elif isinstance(node, at.BinOpNode):
+            return self.add(NodeKinds.BINOP, node.op, handle(node.left), handle(node.right), token=token, size=size, typ=node.leftTyp, rightTyp=node.rightTyp)
+        elif isinstance(node, at.UnaryOpNode):
+            return self.add(NodeKinds.UNARYOP, node.op, handle(node.operand), token=token, size=size, typ=node.typ)
+        elif isinstance(node, at.NumNode):
+            return self.add(NodeKinds.NUM, value=node.val, token=token, size=size, typ=node.typ)
+        elif isinstance(node, at.StrNode):
+            return self.add(NodeKinds.STR, value=node.val, token=token, size=size)
+        elif isinstance(node, at.IdentNode):
+            return self.add(NodeKinds.IDENT, value=node.name, token=token, size=size, typ=node.typ)
+        elif isinstance(node, at.LetNode):
+            return self.add(NodeKinds.LET, first=handle(node.ident), second=handle(node.val), token=token, size=size, typ=node.typ)
+        elif isinstance(node, at.PrintNode):
+            return self.add(NodeKinds.PRINT, first=handle(node.val), token=token, size=size)
+        elif isinstance(node, at.IfNode):
+            return self.add(NodeKinds.IF, first=handle(node.condition), second=handle(node.thenBranch), third=handle(node.elseBranch), token=token, size=size)
+        elif isinstance(node, at.WhileNode):
+            return self.add(NodeKinds.WHILE, first=handle(node.condition), second=handle(node.thenBranch), token=token, size=size)
+        elif isinstance(node, at.ForNode):
+            return self.add(NodeKinds.FOR, first=handle(node.iterable), second=handle(node.thenBranch), token=token, size=size)
+        elif isinstance(node, at.FunNode):
+            return self.add(NodeKinds.FUN, first=handle(node.body), value=(node.name, tuple(node.parameters.items())), token=token, size=size)
+        raise TypeError(f"Cannot flatten {node.__class__.__name__}.")
+    
+    def toTree(self, stream:tok.TokenStream|None=None) -> at.ProgramNode:
+        """
+        Rebuild the object tree of the program at the root, in one pass over the nodes (children come first).
+        Nodes get their tokens back from stream, the TokenStream the tree was parsed from. Without one, tokens are
+        rebuilt from the nodes when the tree has a line index (their type, value and position, enough to report
+        errors); otherwise nodes have none.
+        """
+        nodes:ty.List[ty.Any] = [None] * len(self)
+        def block(first:int) -> at.StatementNode|None:
+            chain:at.StatementNode|None = None
+            for statement in reversed(list(self.statements(first))):
+                chain = at.StatementNode(nodes[statement], chain, nodes[statement].token)
+            return chain
+        
+        for node in range(len(self)):
+            kind:NodeKinds = KINDS[self.kinds[node]]
+            first, second, third = self.firsts[node], self.seconds[node], self.thirds[node]
+            token:tok.Token|None = self.__token(stream, self.tokens[node]) if stream != None else self.__rebuild(kind, node)
+            if kind == NodeKinds.PROGRAM:
+                nodes[node] = at.ProgramNode(block(first), self.value(node), token)
+            elif kind == NodeKinds.BINOP:
+                nodes[node] = at.BinOpNode(nodes[first], self.op(node), nodes[second], self.typ(node),
+                                           tok.TYPES[self.rightTyps[node]] if self.rightTyps[node] else None, token)
+            elif kind == NodeKinds.UNARYOP:
+                nodes[node] = at.UnaryOpNode(self.op(node), nodes[first], token)
+                nodes[node].typ = self.typ(node)
+            elif kind == NodeKinds.NUM:
+                nodes[node] = at.NumNode(self.value(node), self.typ(node), token)
+            elif kind == NodeKinds.STR:
+                nodes[node] = at.StrNode(self.value(node), token)
+            elif kind == NodeKinds.IDENT:
+                nodes[node] = at.IdentNode(self.value(node), self.typ(node), token)
+            elif kind == NodeKinds.LET:
+                nodes[node] = at.LetNode(nodes[first], nodes[second], self.typ(node), token)
+            elif kind == NodeKinds.PRINT:
+                nodes[node] = at.PrintNode(nodes[first], token)
+            elif kind == NodeKinds.IF:
+                nodes[node] = at.IfNode(nodes[first], block(second), block(third), token)
+            elif kind == NodeKinds.WHILE:
+                nodes[node] = at.WhileNode(nodes[first], block(second), token)
+            elif kind == NodeKinds.FOR:
+                nodes[node] = at.ForNode(nodes[first], block(second), token)
+            elif kind == NodeKinds.FUN:
+                name, parameters = self.value(node)
+                nodes[node] = at.FunNode(name, dict(parameters), block(first), token)
+        
+        return nodes[-1]
+    
+    def __rebuild(self, kind:NodeKinds, node:int) -> tok.Token|None:
+        "Token of a node, made up from what the node holds."
+        offset:int = self.tokens[node]
+        if self.lineIndex == None or offset == -1:
+            return None
+        
+        value:ty.Any = self.value(node)
+        size:int = self.sizes[node]
+        if kind == NodeKinds.BINOP or kind == NodeKinds.UNARYOP:
+            return tok.Token(OP_TYPES[self.op(node)], self.op(node), offset, size, self.lineIndex)
+        elif kind == NodeKinds.NUM:
+            typ:TT = TT.FLOAT if isinstance(value, float) else TT.INT
+            return tok.Token(typ, bt.VFloat(value) if typ == TT.FLOAT else bt.VInt(value), offset, size, self.lineIndex)
+        elif kind == NodeKinds.STR:
+            return tok.Token(TT.STRING, bt.VString(value), offset, size, self.lineIndex)
+        elif kind == NodeKinds.IDENT:
+            return tok.Token(TT.IDENT, value, offset, size, self.lineIndex)
+        elif kind in KEYWORDS:
+            return tok.Token(TT.KEYWD, KEYWORDS[kind], offset, size, self.lineIndex, tok.KEYWORDS[KEYWORDS[kind]])
+        return tok.Token(TT.PLACEHOLDER, '', offset, size, self.lineIndex)
+    
+    @staticmethod
+    def __token(stream:tok.TokenStream, offset:int) -> tok.Token|None:
+        "Token of stream ending at offset."
+        if offset == -1:
+            return None
+        index:int = bisect.bisect_left(stream.ends, offset, key=stream.absolute)
+        return stream.token(index) if index < len(stream) and stream.end(index) == offset else None
@@ -0,0 +1,149 @@
+import collections
+import functools
+import json
+import platform
+import time
+import tracemalloc
+import typing as ty
+
+import commons as comm
+import diagnostics as dm
+import lex
+import parse
+import resolver as rs
+import tok
+import typeChecker as tc
+
+# Methods timed as a phase. Profile.start() replaces them on their class with timing wrappers and stop() puts the
+# originals back, so nothing is measured (or slowed down) outside a profile.
+PHASES:ty.Tuple[ty.Tuple[type, str, str], ...] = (
+    (lex.Lexer, "_Lexer__progDecl", "header"),
+    (lex.Lexer, "tokenize", "lex"),
+    (lex.Lexer, "_Lexer__checkKeyword", "lex.keyword"),
+    (lex.Lexer, "tokenizeAll", "lex.all"),
+    (tok.TokenCursor, "tokenize", "lex"),
+    (parse.Parser, "_Parser__print", "statement.print"),
+    (parse.Parser, "_Parser__if", "statement.if"),
+    (parse.Parser, "_Parser__while", "statement.while"),
+    (parse.Parser, "_Parser__let", "statement.let"),
+    (parse.Parser, "_Parser__fun", "statement.fun"),
+    (parse.Parser, "_Parser__printNode", "statement.print"),
+    (parse.Parser, "_Parser__ifNode", "statement.if"),
+    (parse.Parser, "_Parser__whileNode", "statement.while"),
+    (parse.Parser, "_Parser__letNode", "statement.let"),
+    (parse.Parser, "_Parser__funNode", "statement.fun"),
+    (parse.Parser, "_Parser__comp", "condition"),
+    (parse.Parser, "_Parser__conditionNode", "condition"),
+    (parse.Parser, "_Parser__expr", "expression"),
+    (parse.Parser, "_Parser__exprNode", "expression"),
+    (rs.Resolver, "resolve", "resolve"),
+    (tc.TypeChecker, "check", "typecheck"),
+    (dm.Diagnostics, "add", "diagnostics"),
+    (dm.Diagnostics, "flush", "diagnostics"),
+)
+# Phases whose calls return a token to count
+TOKEN_PHASES:ty.FrozenSet[str] = frozenset(("lex",))
+
+
+class Profile:
+    """
+    Records, while it is started, the wall time and calls of every phase of PHASES, the tokens read by type and
+    (with memory) the peak memory allocated, traced by tracemalloc. Used as a context manager it is started and
+    stopped around the block; report() (or save()) gives the results as JSON.
+    
+    Times of a phase are counted once however deeply it recurses: seconds includes the phases it calls and
+    selfSeconds does not. Only one profile can be started at a time.
+    """
+    active:ty.ClassVar["Profile|None"] = None
+    
+    def __init__(self, memory:bool=True) -> None:
+        self.memory:bool = memory
+        self.calls:ty.Dict[str, int] = collections.defaultdict(int)
+        self.seconds:ty.Dict[str, float] = collections.defaultdict(float)
+        self.selfSeconds:ty.Dict[str, float] = collections.defaultdict(float)
+        self.tokens:ty.Dict[str, int] = collections.defaultdict(int)
+        self.peakBytes:int|None = None
+        self.wallSeconds:float = 0.0
+        self.__start:float = 0.0
+        self.__originals:ty.List[ty.Tuple[type, str, ty.Any]] = []
+        self.__children:ty.List[float] = [] # time spent in phases called by each running phase
+        self.__depths:ty.Dict[str, int] = collections.defaultdict(int)
+    
+    def __enter__(self) -> "Profile":
+        self.start()
+        return self
+    
+    def __exit__(self, *exc:ty.Any) -> None:
+        self.stop()
+    
+    def start(self) -> None:
+        if Profile.active != None:
+            raise RuntimeError("Another profile is running.")
+        Profile.active = self
+        for cls, name, phase in PHASES:
+            original:ty.Any = cls.__dict__[name]
+            self.__originals.append((cls, name, original))
+            setattr(cls, name, self.__timed(original, phase))
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        else:
+            self.memory = False # someone else is tracing; their peak is not ours to reset
+        self.__start = time.perf_counter()
+    
+    def stop(self) -> None:
+        if Profile.active != self:
+            return
+        self.wallSeconds += time.perf_counter() - self.__start
+        if self.memory:
+            self.peakBytes = max(self.peakBytes or 0, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        for cls, name, original in reversed(self.__originals):
+            setattr(cls, name, original)
+        self.__originals = []
+        Profile.active = None
+    
+    def report(self) -> ty.Dict[str, ty.Any]:
+        "The results: phases sorted by time, token counts by type (most frequent first) and the peak memory."
+        phases:ty.Dict[str, ty.Dict[str, ty.Any]] = {
+            phase: {"calls": self.calls[phase], "seconds": round(self.seconds[phase], 6), "selfSeconds": round(self.selfSeconds[phase], 6)}
+            for phase in sorted(self.calls, key=self.seconds.__getitem__, reverse=True)
+        }
+        return {
+            "viper": comm.VERSION, "python": platform.python_version(), "wallSeconds": round(self.wallSeconds, 6),
+            "phases": phases, "tokens": dict(sorted(self.tokens.items(), key=lambda item: item[1], reverse=True)),
+            "tokenCount": sum(self.tokens.values()), "peakBytes": self.peakBytes,
+        }
+    
+    def save(self, path:str) -> None:
+        with open(path, 'w', encoding="utf-8") as file:
+            json.dump(self.report(), file, indent=2)
+            file.write('\n')
+    
+    def __timed(self, function:ty.Callable[..., ty.Any], phase:str) -> ty.Callable[..., ty.Any]:
+        "function, recording its calls under phase."
+        children:ty.List[float] = self.__children
+        depths:ty.Dict[str, int] = self.__depths
+        calls, seconds, selfSeconds, tokens = self.calls, self.seconds, self.selfSeconds, self.tokens
+        counting:bool = phase in TOKEN_PHASES
+        clock:ty.Callable[[], float] = time.perf_counter
+        
+        @functools.wraps(function)
+        def timed(*args:ty.Any, **kwargs:ty.Any) -> ty.Any:
+            depths[phase] += 1
+            children.append(0.0)
+            start:float = clock()
+            try:
+                result:ty.Any = function(*args, **kwargs)
+            finally:
+                elapsed:float = clock() - start
+                selfSeconds[phase] += elapsed - children.pop()
+                if children:
+                    children[-1] += elapsed
+                depths[phase] -= 1
+                if not depths[phase]:
+                    seconds[phase] += elapsed
+                calls[phase] += 1
+            if counting:
+                tokens[result.typ.name] += 1
+            return result
+        return timed
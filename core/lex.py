@@ -1,265 +1,724 @@
-import sys
-import typing as ty
-
-import basicTypes as bt
-import err
-import other as ot
-import tok
-
-ANSI = ot.isANSISupported()
-TT = tok.TokenTypes
-
-
-class Lexer:
-    def __init__(self, src:str) -> None:
-        "Initialise Lexer object for lexical analysis of the source."
-        self.src:str = src + '\0'
-        self.char:str = ''
-        self.line:int = 1
-        self.pos:int = -1
-        self.printPos:int = 0
-
-        self.__readChar()
-        self.programTyping:int|None = self.__progDecl()
-    
-    def __progDecl(self):
-        self.__skipWhitespaces()
-        self.__skipComments()
-
-        if self.char == '~':
-            self.__readChar()
-            self.__skipWhitespaces()
-            if self.char not in ('\n', '\0'):
-                typing:tok.Token = self.tokenize()
-                if typing.val not in ("dynamic", "static"):
-                    self.__displayError(err.illegalProgDeclErr, typing, self.line, self.printPos-typing.size)
-                else:
-                    while self.char in (' ', '\r', '\t'):
-                        self.__readChar()
-                    self.__skipComments()
-                    
-                    if self.char in ('\n', '\0'):
-                        self.__readChar()
-                        return 1 if typing.val == "dynamic" else 0
-                    else:
-                        self.__displayError(err.illegalProgDeclErr, typing, self.line, self.printPos,
-                                     msg=f"Illegal program declaration: Expected newline on line {self.line} pos {self.printPos}.")
-            else:
-                self.__displayError(err.illegalProgDeclErr, tok.Token(TT.PLACEHOLDER, '', self.line, self.pos, self.printPos, 0), self.line, self.printPos-0,
-                             msg=f"Illegal program declaration: Unexpected newline/EOF on line {self.line} pos {self.printPos-0}.")
-        
-    
-    def __checkKeyword(self, ident:str) -> ty.Tuple[bool, TT|str]:
-        "Check if the token got in __readIdent() is a keyword."
-        for attr in TT:
-            if (ident.upper() == attr.name) and (301 <= attr.value <= 400): return True, attr
-        return False, ident
-    
-    def __displayError(self, errType:ty.Type[err.Error], *args:ty.Any, **kwargs:ty.Any) -> None:
-        "Display errors."
-        sys.stdout.write(f"{ot.RED if ANSI else ''}??{ot.RESET if ANSI else ''} " + str(errType(*args, **kwargs)) + '\n')
-        sys.stdout.flush()
-    
-    def __error(self, errType:ty.Type[err.Error], *args:ty.Any, **kwargs:ty.Any) -> None:
-        "Display errors."
-        # sys.stdout.write(f"{ot.RED if ANSI else ''}??{ot.RESET if ANSI else ''} " + str(errType(*args, **kwargs)) + '\n')
-        # sys.stdout.flush()
-        pass
-    
-    def __readChar(self) -> None:
-        "Read next character in source."
-        if self.pos < len(self.src) - 1:
-            self.pos += 1
-            self.printPos += 1
-            self.char = self.src[self.pos]
-        else:
-            self.char = '\0'
-    
-    def __peekChar(self):
-        "Peeks next character to the current character."
-        if self.pos+1 < len(self.src) - 1:
-            return self.src[self.pos+1]
-        else:
-            return '\0'
-    
-    def __readNum(self):
-        "Read number to return the token."
-        startPos:int = self.pos
-        printPos:int = self.printPos
-        dotCount:int = 0
-        errPrintPos:int = -1
-
-        while ot.isDigit(self.__peekChar()) or self.__peekChar() == '.':
-            if self.__peekChar() == '.':
-                dotCount += 1
-            if dotCount == 2:
-                errPrintPos:int = self.printPos
-            self.__readChar()
-        
-        num = self.src[startPos:self.pos+1]
-        if dotCount == 0:
-            return self.__newToken(TT.INT, bt.VInt(int(num)), self.printPos)
-        elif dotCount == 1:
-            return self.__newToken(TT.FLOAT, bt.VFloat(float(num)), self.printPos)
-        else:
-            self.__error(err.invalidNum, num, self.line, errPrintPos)
-            return self.__newToken(TT.INVALID, num, self.printPos)
-    
-    def __readSingleQuoteStr(self):
-        startPos:int = self.pos
-
-        while self.__peekChar() != '\'':
-            if self.__peekChar() in ('\n', '\0'):
-                self.__error(err.invalidStr, self.src[startPos:self.pos+1], self.line, self.printPos)
-                return self.__newToken(TT.INVALID, self.src[startPos+1:self.pos+1], self.printPos)
-            self.__readChar()
-        
-        self.__readChar()
-        return self.__newToken(TT.STRING, bt.VString(self.src[startPos+1:self.pos]), self.printPos)
-    
-    def __readDoubleQuoteStr(self):
-        startPos:int = self.pos
-
-        while self.__peekChar() != '\"':
-            if self.__peekChar() in ('\n', '\0'):
-                self.__error(err.invalidStr, self.src[startPos:self.pos+1], self.line, self.printPos)
-                return self.__newToken(TT.INVALID, self.src[startPos+1:self.pos+1], self.printPos)
-            self.__readChar()
-        
-        self.__readChar()
-        return self.__newToken(TT.STRING, bt.VString(self.src[startPos+1:self.pos]), self.printPos)
-    
-    def __readIdentAndKeyWd(self):
-        "Read identifiers and keywords"
-        startPos:int = self.pos
-        printPos:int = self.printPos
-
-        while ot.isAlpha(self.__peekChar()) or ot.isDigit(self.__peekChar()):
-            self.__readChar()
-        
-        if self.__checkKeyword(returnVal:=self.src[startPos:self.pos+1])[0]:
-            return self.__newToken(TT.KEYWD, returnVal, self.printPos)
-        
-        return self.__newToken(TT.IDENT, returnVal, self.printPos)
-    
-    def __newToken(self, tokTyp:TT, tokVal:ty.Any, line:int=-1, printPos:int|ty.Tuple[int, int]=-1) -> tok.Token:
-        "Create a new token, and return created token."
-        if line == -1: line = self.line
-        if printPos == -1: printPos = self.printPos
-        if isinstance(tokVal, str):
-            size = len(tokVal)
-        else:
-            size = len(tokVal) if isinstance(tokVal, str) else len(str(tokVal.val))
-        return tok.Token(tokTyp, tokVal, line, self.pos, printPos, size)
-    
-    def __skipWhitespaces(self):
-        """
-        Ignore whitespace characters (space, carriage return, tab, newline).
-        Increase line number if newline is detected and reset the printPos to zero.
-        Expand tabs to get actual number of characters.
-
-        Ignore comments (any character after an independent '#' in source till newline).
-        """
-        while self.char in (' ', '\r', '\t', '\n'):
-            if self.char == '\n': self.line += 1; self.printPos = 0
-            elif self.char == '\t': self.printPos += (len('\t'.expandtabs()) - 1)
-            self.__readChar()
-
-    def __skipComments(self):
-        if self.char == '#':
-            self.__readChar()
-            while self.char not in ('\n', '\0'):
-                self.__readChar()
-    
-    def tokenize(self) -> tok.Token:
-        "Tokenizes the source. Returns one token at a time."
-        self.__skipWhitespaces()
-        self.__skipComments()
-
-        if self.char in ('+', '-', '*', '/', '^'):
-            token = self.__newToken(
-                (TT.PLUS,
-                 TT.MINUS,
-                 TT.ASTERISK,
-                 TT.FSLASH,
-                 TT.CARET)[('+', '-', '*', '/', '^').index(self.char)],
-                self.char # Second argument of __newToken()
-            )
-        
-        elif self.char == '=':
-            if self.__peekChar() == '=':
-                self.__readChar()
-                token = self.__newToken(TT.EQEQ, '==')
-            else:
-                token = self.__newToken(TT.EQ, '=')
-        
-        elif self.char == '!':
-            if self.__peekChar() == '=':
-                self.__readChar()
-                token = self.__newToken(TT.NOTEQ, '!=')
-            else:
-                self.__error(err.invalidChar, self.char, self.line, self.printPos)
-                token = self.__newToken(TT.INVALID, self.char)
-        
-        elif self.char == '<':
-            if self.__peekChar() == '=':
-                self.__readChar()
-                token = self.__newToken(TT.LT, '<')
-            else:
-                token = self.__newToken(TT.LTEQ, '<=')
-        
-        elif self.char == '>':
-            if self.__peekChar() == '=':
-                self.__readChar()
-                token = self.__newToken(TT.GT, '>')
-            else:
-                token = self.__newToken(TT.GTEQ, '>=')
-        
-        elif self.char == '.':
-            if self.__peekChar() not in (' ', '\r', '\t', '\n', '\0'):
-                token = self.__newToken(TT.ATTR, '.')
-            else:
-                token = self.__newToken(TT.INVALID, '.')
-        
-        elif self.char == ',':
-            token = self.__newToken(TT.COMMA, ',')
-        
-        elif ot.isDigit(self.char):
-            token = self.__readNum()
-        
-        elif self.char == '\'':
-            token = self.__readSingleQuoteStr()
-        
-        elif self.char == '\"':
-            token = self.__readDoubleQuoteStr()
-        
-        elif ot.isAlpha(self.char):
-            token = self.__readIdentAndKeyWd()
-        
-        elif self.char in ('(', ')', '{', '}', '[', ']', ';'):
-            token = self.__newToken(
-                (TT.LPAREN,
-                 TT.RPAREN,
-                 TT.LFLOBRAC,
-                 TT.RFLOBRAC,
-                 TT.LSQBRAC,
-                 TT.RSQBRAC,
-                 TT.SEMICLN)[('(', ')', '{', '}', '[', ']', ';').index(self.char)],
-                self.char # Second argument of __newToken()
-            )
-        
-        elif self.char == ':':
-            token = self.__newToken(TT.COLON, ':')
-        
-        elif self.char == '~':
-            token = self.__newToken(TT.PROGDECL, '~')
-        
-        elif self.char in ('\0', ''):
-            token = self.__newToken(TT.EOF, '\0')
-        
-        else:
-            self.__error(err.invalidChar, self.char, self.line, self.printPos)
-            token = self.__newToken(TT.INVALID, self.char)
-        
-        self.__readChar()
-        return token
+import array
+import bisect
+import concurrent.futures as cf
+import mmap
+import os
+import re
+import sys
+import typing as ty
+
+import basicTypes as bt
+import diagnostics as dm
+import err
+import other as ot
+import tok
+
+TT = tok.TokenTypes
+ENGINES:ty.Tuple[str, ...] = ("char", "regex")
+
+# Master pattern of the regex engine: leading whitespace, an optional comment
+# and one whole token are matched in a single call. The token alternatives
+# mirror the branches of the character engine.
+TOKEN_RE:re.Pattern = re.compile(r"""
+    (?P<ws>[ \r\t\n]*)
+    (?P<cmt>\#[^\n\0]*)?
+    (?:
+        (?P<num>[0-9][0-9.]*)
+      | (?P<ident>[A-Za-z][A-Za-z0-9]*)
+      | (?P<str>'[^'\n\0]*'?|"[^"\n\0]*"?)
+      | (?P<op>==|!=|<=|>=)
+      | (?P<char>.)
+    )
+""", re.VERBOSE | re.DOTALL)
+
+# Byte versions for buffer sources (see Lexer.fromBuffer()). A multi-byte UTF-8
+# character outside a string or comment is one invalid character, and \Z
+# stands in for the '\0' sentinel that buffer sources do not have.
+TOKEN_RE_BYTES:re.Pattern = re.compile(rb"""
+    (?P<ws>[ \r\t\n]*)
+    (?P<cmt>\#[^\n\0]*)?
+    (?:
+        (?P<num>[0-9][0-9.]*)
+      | (?P<ident>[A-Za-z][A-Za-z0-9]*)
+      | (?P<str>'[^'\n\0]*'?|"[^"\n\0]*"?)
+      | (?P<op>==|!=|<=|>=)
+      | (?P<char>[\xc0-\xff][\x80-\xbf]*|.|\Z)
+    )
+""", re.VERBOSE | re.DOTALL)
+# Everything __progDecl() may read: blank lines, a comment and the '~' line.
+HEADER_RE_BYTES:re.Pattern = re.compile(rb"[ \r\t\n]*(?:\#[^\n\0]*)?(?:~[ \r\t\n]*[^\n\0]*\n?)?")
+CONTINUATION_RE_BYTES:re.Pattern = re.compile(rb"[\x80-\xbf]")
+NEWLINE_RE:re.Pattern = re.compile("\n")
+NEWLINE_RE_BYTES:re.Pattern = re.compile(b"\n")
+PARALLEL_MIN_CHUNK:int = 1 << 20
+
+# Token types the character engine produces for these spellings.
+DOUBLE_CHAR_TOKENS:ty.Dict[str, TT] = {
+    '==': TT.EQEQ,
+    '!=': TT.NOTEQ,
+    '<=': TT.LT,
+    '>=': TT.GT,
+}
+SINGLE_CHAR_TOKENS:ty.Dict[str, TT] = {
+    '+': TT.PLUS,
+    '-': TT.MINUS,
+    '*': TT.ASTERISK,
+    '/': TT.FSLASH,
+    '^': TT.CARET,
+    '=': TT.EQ,
+    '<': TT.LTEQ,
+    '>': TT.GTEQ,
+    ',': TT.COMMA,
+    '(': TT.LPAREN,
+    ')': TT.RPAREN,
+    '{': TT.LFLOBRAC,
+    '}': TT.RFLOBRAC,
+    '[': TT.LSQBRAC,
+    ']': TT.RSQBRAC,
+    ';': TT.SEMICLN,
+    ':': TT.COLON,
+    '~': TT.PROGDECL,
+    '\0': TT.EOF,
+}
+
+
+class Lexer:
+    def __init__(self, src:str, engine:str="char", progDecl:bool=True, diagnostics:dm.Diagnostics|None=None) -> None:
+        """
+        Initialise Lexer object for lexical analysis of the source.
+        engine selects the scanner used by tokenize(): "char" reads one character at a time,
+        "regex" matches whole tokens with a precompiled master regex. Both produce the same tokens.
+        progDecl=False skips the program declaration header, for sources that are a piece of a program.
+        Errors go to diagnostics (a new dm.Diagnostics writing to stdout by default), which a parser reading
+        from the lexer shares.
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown lexer engine \"{engine}\", expected one of {', '.join(ENGINES)}.")
+        
+        self.src:str|ty.Any = src + '\0'
+        self.char:str = ''
+        self.pos:int = -1
+        self.lineIndex:tok.LineIndex = tok.LineIndex(self.src)
+        self.engine:str = engine
+        self.buffer:bool = False
+        self.bytePos:int = -1
+        self.path:str|None = None
+        self.diagnostics:dm.Diagnostics = diagnostics if diagnostics != None else dm.Diagnostics()
+        self.__scan:ty.Callable[[], tok.Token] = self.__tokenizeRegex if engine == "regex" else self.__tokenizeChar
+
+        self.__readChar()
+        self.programTyping:int|None = self.__progDecl() if progDecl else None
+        self.diagnostics.flush()
+    
+    @classmethod
+    def fromBuffer(cls, buffer:ty.Any, progDecl:bool=True, diagnostics:dm.Diagnostics|None=None) -> "Lexer":
+        """
+        Create a lexer scanning UTF-8 bytes (bytes, memoryview or mmap) in place, without a copy or sentinel.
+        Only the program declaration header is decoded up front; afterwards the regex engine works on the bytes
+        and decodes identifier and literal slices only. Token positions are character offsets, as with a str source.
+        """
+        header:str = str(HEADER_RE_BYTES.match(buffer).group(), "utf-8") if progDecl else ""
+        lexer:Lexer = cls(header, "regex", progDecl, diagnostics)
+        
+        # Carry on from where __progDecl() stopped in the header
+        lexer.src = buffer
+        lexer.buffer = True
+        lexer.lineIndex = tok.LineIndex(buffer)
+        lexer.bytePos = len(header[:lexer.pos].encode("utf-8"))
+        lexer.char = lexer.__bufferChar(lexer.bytePos)
+        lexer.__scan = lexer.__tokenizeBuffer
+        return lexer
+    
+    @classmethod
+    def fromPath(cls, path:str, diagnostics:dm.Diagnostics|None=None) -> "Lexer":
+        "Create a lexer over the memory-mapped file at path (see fromBuffer())."
+        with open(path, "rb") as file:
+            try:
+                buffer:mmap.mmap|bytes = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError: # Empty files cannot be mapped
+                buffer = b""
+        
+        lexer:Lexer = cls.fromBuffer(buffer, diagnostics=diagnostics)
+        lexer.path = path
+        return lexer
+    
+    @property
+    def line(self) -> int:
+        "Line of the current character, resolved through the line index."
+        return self.lineIndex.line(self.pos)
+    
+    @property
+    def printPos(self) -> int:
+        "Print position (tabs expanded) of the current character, resolved through the line index."
+        return self.lineIndex.printPos(self.pos)
+    
+    def __progDecl(self):
+        self.__skipWhitespaces()
+        self.__skipComments()
+
+        if self.char == '~':
+            self.__readChar()
+            self.__skipWhitespaces()
+            if self.char not in ('\n', '\0'):
+                typing:tok.Token = self.tokenize()
+                if typing.val not in ("dynamic", "static"):
+                    self.__displayError(err.illegalProgDeclErr, typing, self.line, self.printPos-typing.size)
+                else:
+                    while self.char in (' ', '\r', '\t'):
+                        self.__readChar()
+                    self.__skipComments()
+                    
+                    if self.char in ('\n', '\0'):
+                        self.__readChar()
+                        return 1 if typing.val == "dynamic" else 0
+                    else:
+                        self.__displayError(err.illegalProgDeclErr, typing, self.line, self.printPos,
+                                     msg=f"Illegal program declaration: Expected newline on line {self.line} pos {self.printPos}.")
+            else:
+                self.__displayError(err.illegalProgDeclErr, tok.Token(TT.PLACEHOLDER, '', self.pos, 0, self.lineIndex), self.line, self.printPos-0,
+                             msg=f"Illegal program declaration: Unexpected newline/EOF on line {self.line} pos {self.printPos-0}.")
+        
+    
+    def __checkKeyword(self, ident:str) -> TT|None:
+        "Check if the token got in __readIdent() is a keyword: its token type as keyword, None for identifiers."
+        return tok.keyword(ident)
+    
+    def __displayError(self, errType:ty.Type[err.Error], *args:ty.Any, **kwargs:ty.Any) -> None:
+        "Display errors."
+        self.diagnostics.add(errType, *args, offset=self.pos, **kwargs)
+    
+    def __error(self, errType:ty.Type[err.Error], *args:ty.Any, **kwargs:ty.Any) -> None:
+        "Display errors."
+        # self.diagnostics.add(errType, *args, offset=self.pos, **kwargs)
+        pass
+    
+    def __readChar(self) -> None:
+        "Read next character in source."
+        if self.pos < len(self.src) - 1:
+            self.pos += 1
+            self.char = self.src[self.pos]
+        else:
+            self.char = '\0'
+    
+    def __peekChar(self):
+        "Peeks next character to the current character."
+        if self.pos+1 < len(self.src) - 1:
+            return self.src[self.pos+1]
+        else:
+            return '\0'
+    
+    def __readNum(self):
+        "Read number to return the token."
+        startPos:int = self.pos
+        dotCount:int = 0
+        errPos:int = -1
+
+        while ot.isDigit(self.__peekChar()) or self.__peekChar() == '.':
+            if self.__peekChar() == '.':
+                dotCount += 1
+            if dotCount == 2:
+                errPos:int = self.pos
+            self.__readChar()
+        
+        num = self.src[startPos:self.pos+1]
+        if dotCount == 0:
+            return self.__newToken(TT.INT, bt.VInt(int(num)))
+        elif dotCount == 1:
+            return self.__newToken(TT.FLOAT, bt.VFloat(float(num)))
+        else:
+            self.__error(err.invalidNum, num, self.line, self.lineIndex.printPos(errPos))
+            return self.__newToken(TT.INVALID, num)
+    
+    def __readSingleQuoteStr(self):
+        startPos:int = self.pos
+
+        while self.__peekChar() != '\'':
+            if self.__peekChar() in ('\n', '\0'):
+                self.__error(err.invalidStr, self.src[startPos:self.pos+1], self.line, self.printPos)
+                return self.__newToken(TT.INVALID, self.src[startPos+1:self.pos+1])
+            self.__readChar()
+        
+        self.__readChar()
+        return self.__newToken(TT.STRING, bt.VString(self.src[startPos+1:self.pos]))
+    
+    def __readDoubleQuoteStr(self):
+        startPos:int = self.pos
+
+        while self.__peekChar() != '\"':
+            if self.__peekChar() in ('\n', '\0'):
+                self.__error(err.invalidStr, self.src[startPos:self.pos+1], self.line, self.printPos)
+                return self.__newToken(TT.INVALID, self.src[startPos+1:self.pos+1])
+            self.__readChar()
+        
+        self.__readChar()
+        return self.__newToken(TT.STRING, bt.VString(self.src[startPos+1:self.pos]))
+    
+    def __readIdentAndKeyWd(self):
+        "Read identifiers and keywords"
+        startPos:int = self.pos
+
+        while ot.isAlpha(self.__peekChar()) or ot.isDigit(self.__peekChar()):
+            self.__readChar()
+        
+        returnVal:str = sys.intern(self.src[startPos:self.pos+1])
+        if (keyword:=self.__checkKeyword(returnVal)) != None:
+            return self.__newToken(TT.KEYWD, returnVal, keyword)
+        
+        return self.__newToken(TT.IDENT, returnVal)
+    
+    def __newToken(self, tokTyp:TT, tokVal:ty.Any, keyword:TT|None=None) -> tok.Token:
+        "Create a new token ending at the current character, and return created token."
+        if isinstance(tokVal, str):
+            size = len(tokVal)
+        else:
+            size = len(tokVal) if isinstance(tokVal, str) else len(str(tokVal.val))
+        return tok.Token(tokTyp, tokVal, self.pos, size, self.lineIndex, keyword)
+    
+    def __skipWhitespaces(self):
+        """
+        Ignore whitespace characters (space, carriage return, tab, newline).
+        Lines and tab-expanded positions are worked out by the line index when they are needed.
+        """
+        while self.char in (' ', '\r', '\t', '\n'):
+            self.__readChar()
+
+    def __skipComments(self):
+        if self.char == '#':
+            self.__readChar()
+            while self.char not in ('\n', '\0'):
+                self.__readChar()
+    
+    def tokenize(self) -> tok.Token:
+        "Tokenizes the source. Returns one token at a time."
+        return self.__scan()
+    
+    def __tokenizeChar(self) -> tok.Token:
+        "Character engine of tokenize()."
+        self.__skipWhitespaces()
+        self.__skipComments()
+
+        if self.char in ('+', '-', '*', '/', '^'):
+            token = self.__newToken(
+                (TT.PLUS,
+                 TT.MINUS,
+                 TT.ASTERISK,
+                 TT.FSLASH,
+                 TT.CARET)[('+', '-', '*', '/', '^').index(self.char)],
+                self.char # Second argument of __newToken()
+            )
+        
+        elif self.char == '=':
+            if self.__peekChar() == '=':
+                self.__readChar()
+                token = self.__newToken(TT.EQEQ, '==')
+            else:
+                token = self.__newToken(TT.EQ, '=')
+        
+        elif self.char == '!':
+            if self.__peekChar() == '=':
+                self.__readChar()
+                token = self.__newToken(TT.NOTEQ, '!=')
+            else:
+                self.__error(err.invalidChar, self.char, self.line, self.printPos)
+                token = self.__newToken(TT.INVALID, self.char)
+        
+        elif self.char == '<':
+            if self.__peekChar() == '=':
+                self.__readChar()
+                token = self.__newToken(TT.LT, '<')
+            else:
+                token = self.__newToken(TT.LTEQ, '<=')
+        
+        elif self.char == '>':
+            if self.__peekChar() == '=':
+                self.__readChar()
+                token = self.__newToken(TT.GT, '>')
+            else:
+                token = self.__newToken(TT.GTEQ, '>=')
+        
+        elif self.char == '.':
+            if self.__peekChar() not in (' ', '\r', '\t', '\n', '\0'):
+                token = self.__newToken(TT.ATTR, '.')
+            else:
+                token = self.__newToken(TT.INVALID, '.')
+        
+        elif self.char == ',':
+            token = self.__newToken(TT.COMMA, ',')
+        
+        elif ot.isDigit(self.char):
+            token = self.__readNum()
+        
+        elif self.char == '\'':
+            token = self.__readSingleQuoteStr()
+        
+        elif self.char == '\"':
+            token = self.__readDoubleQuoteStr()
+        
+        elif ot.isAlpha(self.char):
+            token = self.__readIdentAndKeyWd()
+        
+        elif self.char in ('(', ')', '{', '}', '[', ']', ';'):
+            token = self.__newToken(
+                (TT.LPAREN,
+                 TT.RPAREN,
+                 TT.LFLOBRAC,
+                 TT.RFLOBRAC,
+                 TT.LSQBRAC,
+                 TT.RSQBRAC,
+                 TT.SEMICLN)[('(', ')', '{', '}', '[', ']', ';').index(self.char)],
+                self.char # Second argument of __newToken()
+            )
+        
+        elif self.char == ':':
+            token = self.__newToken(TT.COLON, ':')
+        
+        elif self.char == '~':
+            token = self.__newToken(TT.PROGDECL, '~')
+        
+        elif self.char in ('\0', ''):
+            token = self.__newToken(TT.EOF, '\0')
+        
+        else:
+            self.__error(err.invalidChar, self.char, self.line, self.printPos)
+            token = self.__newToken(TT.INVALID, self.char)
+        
+        self.__readChar()
+        return token
+    
+    def __scanRegex(self) -> ty.Tuple[TT, int]:
+        """
+        Scanning step of the regex engine.
+        Skips whitespace and a comment and matches the next token with one TOKEN_RE call.
+        Returns the token type and start offset, and leaves pos and char on the last character
+        of the token, exactly where the character engine would.
+        """
+        src:str = self.src
+        match:re.Match = TOKEN_RE.match(src, self.pos)
+        kind:str = match.lastgroup
+        start:int = match.start(kind)
+        end:int = match.end()
+        self.pos = end - 1
+        self.char = src[self.pos]
+
+        if kind == "num":
+            dotCount:int = src.count('.', start, end)
+            return (TT.INT if dotCount == 0 else TT.FLOAT if dotCount == 1 else TT.INVALID), start
+        
+        elif kind == "ident":
+            return (TT.KEYWD if self.__checkKeyword(src[start:end]) != None else TT.IDENT), start
+        
+        elif kind == "str":
+            return (TT.STRING if end - start > 1 and src[end-1] == src[start] else TT.INVALID), start
+        
+        elif kind == "op":
+            return DOUBLE_CHAR_TOKENS[src[start:end]], start
+        
+        elif self.char == '.':
+            return (TT.ATTR if src[end] not in (' ', '\r', '\t', '\n', '\0') else TT.INVALID), start
+        
+        return SINGLE_CHAR_TOKENS.get(self.char, TT.INVALID), start
+    
+    def __tokenizeRegex(self) -> tok.Token:
+        "Regex engine of tokenize()."
+        typ, start = self.__scanRegex()
+        val:ty.Any = tok.tokenValue(self.src, typ, start, self.pos)
+        token = self.__newToken(typ, val, tok.keyword(val) if typ == TT.KEYWD else None)
+        self.__readChar()
+        return token
+    
+    def tokenizeAll(self) -> tok.TokenStream:
+        """
+        Tokenizes the rest of the source in bulk, up to and including the EOF token.
+        Tokens are stored column-wise in a TokenStream; no Token or literal objects are created.
+        """
+        if self.buffer:
+            return self.__tokenizeAllBuffer()
+        
+        stream:tok.TokenStream = tok.TokenStream(self.src, self.programTyping, len(self.src) - 1, self.lineIndex, self.pos)
+        addTyp = stream.typs.append
+        addStart = stream.starts.append
+        addEnd = stream.ends.append
+
+        while True:
+            typ, start = self.__scanRegex()
+            addTyp(typ.value)
+            addStart(start)
+            addEnd(self.pos)
+            self.__readChar()
+            if typ == TT.EOF:
+                return stream
+    
+    def seek(self, pos:int) -> None:
+        "Restart scanning of a str source at offset pos, which must not be inside a token."
+        self.pos = pos
+        self.char = self.src[pos]
+    
+    @classmethod
+    def relex(cls, stream:tok.TokenStream, offset:int, removed:int, inserted:str) -> ty.Tuple[tok.TokenStream, int, int, int]:
+        """
+        Re-lex a stream of a str source after an edit replacing removed characters at offset by inserted.
+        Scanning restarts at the last token boundary before the edit and stops as soon as a new token lines up
+        with an old one behind the edit; the tokens around the edit are spliced into a new stream.
+        Returns the new stream and first, oldStop, newStop: tokens first to oldStop of the old stream
+        were replaced by tokens first to newStop of the new one.
+        """
+        if not isinstance(stream.src, str):
+            raise TypeError("relex() needs a stream lexed from a str source.")
+        
+        src:str = stream.src[:offset] + inserted + stream.src[offset+removed:-1]
+        # Edits up to the first token may add, change or remove the program declaration header
+        if offset <= stream.origin or (stream.programTyping == None and offset <= stream.end(0) + 1):
+            new:tok.TokenStream = cls(src, "regex").tokenizeAll()
+            return new, 0, len(stream), len(new)
+        
+        delta:int = len(inserted) - removed
+        editEnd:int = offset + len(inserted)
+        # A token ending right before the edit can still grow into it. A stream cut short by a '\0'
+        # is re-lexed from its EOF token at the latest.
+        first:int = min(bisect.bisect_left(stream.ends, offset - 1, key=stream.absolute), len(stream) - 1)
+        lexer:Lexer = cls(src, "regex", progDecl=False)
+        lexer.lineIndex = stream.lineIndex.edit(lexer.src, offset, removed, inserted)
+        lexer.seek(stream.end(first - 1) + 1 if first > 0 else stream.origin)
+
+        typs:array.array = array.array('h')
+        starts:array.array = array.array('i')
+        ends:array.array = array.array('i')
+        oldStop:int = len(stream)
+        while True:
+            typ, start = lexer.__scanRegex()
+            if start >= editEnd:
+                old:int = bisect.bisect_left(stream.starts, start - delta, first, key=stream.absolute)
+                if old < len(stream) and stream.start(old) == start - delta:
+                    oldStop = old
+                    break
+            
+            typs.append(typ.value)
+            starts.append(start)
+            ends.append(lexer.pos)
+            lexer.__readChar()
+            if typ == TT.EOF:
+                break
+        
+        new = tok.TokenStream(lexer.src, stream.programTyping, len(lexer.src) - 1, lexer.lineIndex, stream.origin)
+        new.typs = stream.typs[:first] + typs + stream.typs[oldStop:]
+        new.starts = cls.__splice(stream.starts, first, oldStop, starts, stream.length + 1, len(lexer.src))
+        new.ends = cls.__splice(stream.ends, first, oldStop, ends, stream.length + 1, len(lexer.src))
+        return new, first, oldStop, first + len(typs)
+    
+    @staticmethod
+    def __splice(offsets:array.array, first:int, oldStop:int, middle:array.array, oldEnd:int, newEnd:int) -> array.array:
+        """
+        Offsets with offsets first to oldStop replaced by middle. Offsets behind the edit are stored relative
+        to the end of the source (see TokenStream), so only those between this edit and the previous one,
+        which are absolute before and relative after it, are converted.
+        """
+        prefix:array.array = offsets[:first]
+        pos:int = first - 1
+        while pos >= 0 and prefix[pos] < 0:
+            prefix[pos] += oldEnd
+            pos -= 1
+        
+        suffix:array.array = offsets[oldStop:]
+        shift:int = newEnd - oldEnd
+        pos = 0
+        while pos < len(suffix) and suffix[pos] >= 0:
+            suffix[pos] += shift - newEnd
+            pos += 1
+        return prefix + middle + suffix
+    
+    def tokenizeAllParallel(self, workers:int|None=None, chunkSize:int|None=None) -> tok.TokenStream:
+        """
+        tokenizeAll() spread over a process pool; the result is identical to the serial one.
+        Strings and comments end at a newline, so the source after the header is cut into newline-aligned chunks
+        of about chunkSize characters (bytes for buffers) that are lexed independently and stitched back together.
+        Workers re-map the file themselves when the lexer was created by fromPath().
+        """
+        workers = workers or os.cpu_count() or 1
+        start:int = self.bytePos if self.buffer else self.pos
+        end:int = len(self.src) if self.buffer else len(self.src) - 1
+        chunkSize = chunkSize or max(PARALLEL_MIN_CHUNK, (end - start) // (workers * 4) + 1)
+        if workers == 1 or end - start <= chunkSize:
+            return self.tokenizeAll()
+        
+        newline:re.Pattern = NEWLINE_RE_BYTES if self.buffer else NEWLINE_RE
+        bounds:ty.List[int] = [start]
+        while bounds[-1] + chunkSize < end:
+            match:re.Match|None = newline.search(self.src, bounds[-1] + chunkSize)
+            if match == None:
+                break
+            bounds.append(match.end())
+        bounds.append(end)
+
+        if self.path != None:
+            jobs:ty.List[ty.Tuple] = [(None, self.path, a, b) for a, b in zip(bounds, bounds[1:])]
+        elif self.buffer:
+            jobs = [(bytes(self.src[a:b]), None, 0, 0) for a, b in zip(bounds, bounds[1:])]
+        else:
+            jobs = [(self.src[a:b], None, 0, 0) for a, b in zip(bounds, bounds[1:])]
+        
+        stream:tok.TokenStream = tok.TokenStream(self.src, self.programTyping, end if not self.buffer else -1, self.lineIndex, self.pos)
+        base:int = self.pos
+        shift:int = 0
+        with cf.ProcessPoolExecutor(workers) as executor:
+            for index, (typs, starts, ends, shiftAt, shifts, length) in enumerate(executor.map(lexChunk, *zip(*jobs))):
+                byteBase:int = bounds[index]
+                if self.buffer and byteBase - base != shift:
+                    shift = byteBase - base
+                    stream.addShift(base, shift)
+                for at, chunkShift in zip(shiftAt, shifts):
+                    shift = byteBase - base + chunkShift
+                    stream.addShift(base + at, shift)
+                
+                # Every chunk ends with EOF at its end; only a '\0' inside a chunk ends the stream early
+                last:bool = ends[-1] < length or index == len(jobs) - 1
+                count:int = len(typs) if last else len(typs) - 1
+                stream.typs.extend(typs[:count])
+                stream.starts.extend(array.array('i', (offset + base for offset in starts[:count])))
+                stream.ends.extend(array.array('i', (offset + base for offset in ends[:count])))
+                base += length
+                if last:
+                    executor.shutdown(cancel_futures=True)
+                    break
+        
+        # Leave the lexer where the serial tokenizeAll() would
+        if self.buffer:
+            rest:int = bounds[index + 1]
+            stream.length = base + (len(str(self.src[rest:], "utf-8", "replace")) if rest < end else 0)
+        eofPos:int = stream.ends[-1]
+        self.pos = eofPos + 1 if eofPos < stream.length else eofPos
+        if self.buffer:
+            self.bytePos = stream.byteOffset(self.pos)
+            self.char = self.__bufferChar(self.bytePos)
+        else:
+            self.char = self.src[self.pos]
+        return stream
+    
+    def __bufferChar(self, bytePos:int) -> str:
+        "Decode the character starting at bytePos of a buffer source, '\\0' past the end."
+        if bytePos >= len(self.src):
+            return '\0'
+        
+        lead:int = self.src[bytePos]
+        if lead < 0x80:
+            return chr(lead)
+        size:int = 2 if lead < 0xe0 else 3 if lead < 0xf0 else 4
+        return str(self.src[bytePos:bytePos+size], "utf-8", "replace")[0]
+    
+    def __scanBuffer(self) -> ty.Tuple[TT, int, int, int]:
+        """
+        Scanning step for buffer sources, the byte counterpart of __scanRegex().
+        Returns the token type, its start offset and its byte span; pos is left on the last character
+        of the token and bytePos just past it.
+        """
+        buffer:ty.Any = self.src
+        match:re.Match = TOKEN_RE_BYTES.match(buffer, self.bytePos)
+        self.pos += match.end("ws") - self.bytePos
+        
+        comment:bytes|None = match.group("cmt")
+        if comment:
+            self.pos += len(comment) if comment.isascii() else len(comment) - len(CONTINUATION_RE_BYTES.findall(comment))
+        
+        kind:str = match.lastgroup
+        start:int = match.start(kind)
+        end:int = match.end()
+        text:bytes = match.group(kind)
+        chars:int = len(text) if text.isascii() else len(text) - len(CONTINUATION_RE_BYTES.findall(text))
+        if not text: # End of the buffer, where the sentinel would be
+            chars = 1
+        
+        charStart:int = self.pos
+        self.pos += chars - 1
+        self.bytePos = end
+
+        if kind == "num":
+            dotCount:int = text.count(b'.')
+            return (TT.INT if dotCount == 0 else TT.FLOAT if dotCount == 1 else TT.INVALID), charStart, start, end
+        
+        elif kind == "ident":
+            return (TT.KEYWD if self.__checkKeyword(text.decode("ascii")) != None else TT.IDENT), charStart, start, end
+        
+        elif kind == "str":
+            return (TT.STRING if len(text) > 1 and text[-1] == text[0] else TT.INVALID), charStart, start, end
+        
+        elif kind == "op":
+            return DOUBLE_CHAR_TOKENS[text.decode("ascii")], charStart, start, end
+        
+        elif text == b'.':
+            return (TT.ATTR if end < len(buffer) and buffer[end] not in b' \r\t\n\0' else TT.INVALID), charStart, start, end
+        
+        return SINGLE_CHAR_TOKENS.get(text.decode("utf-8", "replace") or '\0', TT.INVALID), charStart, start, end
+    
+    def __stepBuffer(self, start:int) -> None:
+        """
+        Step onto the character after the token scanned from byte offset start, like __readChar() does for str sources.
+        Nothing moves once the end of the buffer itself was scanned.
+        """
+        if start < len(self.src):
+            self.pos += 1
+        self.char = self.__bufferChar(self.bytePos)
+    
+    def __tokenizeBuffer(self) -> tok.Token:
+        "Regex engine of tokenize() for buffer sources."
+        typ, _, start, end = self.__scanBuffer()
+        if typ in tok.LITERALS:
+            val:ty.Any = tok.LITERALS[typ]
+        else:
+            text:str = str(self.src[start:end], "utf-8")
+            val = tok.tokenValue(text, typ, 0, len(text) - 1)
+        
+        token:tok.Token = self.__newToken(typ, val, tok.keyword(val) if typ == TT.KEYWD else None)
+        self.__stepBuffer(start)
+        return token
+    
+    def __tokenizeAllBuffer(self) -> tok.TokenStream:
+        "tokenizeAll() for buffer sources. Also records where byte offsets drift away from character offsets."
+        stream:tok.TokenStream = tok.TokenStream(self.src, self.programTyping, -1, self.lineIndex, self.pos)
+        addTyp = stream.typs.append
+        addStart = stream.starts.append
+        addEnd = stream.ends.append
+        shift:int = self.bytePos - self.pos
+        if shift: # Non-ASCII characters in the header
+            stream.addShift(self.pos, shift)
+
+        while True:
+            typ, charStart, start, end = self.__scanBuffer()
+            if start - charStart != shift: # Non-ASCII characters in a comment
+                shift = start - charStart
+                stream.addShift(charStart, shift)
+            
+            addTyp(typ.value)
+            addStart(charStart)
+            addEnd(self.pos)
+
+            if typ == TT.EOF:
+                self.__stepBuffer(start)
+                remaining:int = len(str(self.src[self.bytePos:], "utf-8", "replace")) if self.bytePos < len(self.src) else 0
+                stream.length = self.pos + remaining
+                return stream
+            
+            if end - self.pos - 1 != shift: # Non-ASCII characters in the token
+                shift = end - self.pos - 1
+                stream.addShift(self.pos + 1, shift)
+            self.__stepBuffer(start)
+
+
+def lexChunk(src:str|bytes|None, path:str|None, start:int, end:int) -> ty.Tuple:
+    """
+    Worker of Lexer.tokenizeAllParallel(): lexes one newline-aligned chunk without a header.
+    The chunk is src, or bytes start to end of the file at path. Returns the token columns and shifts
+    of the chunk's TokenStream, with offsets relative to the chunk, and its length in characters.
+    """
+    if path != None:
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            # Released before the map is closed, which fails while a view of it is held (the lexer's)
+            with memoryview(buffer)[start:end] as chunk:
+                stream:tok.TokenStream = Lexer.fromBuffer(chunk, progDecl=False).tokenizeAll()
+                return stream.typs, stream.starts, stream.ends, stream.shiftAt, stream.shifts, stream.length
+    
+    if isinstance(src, bytes):
+        lexer:Lexer = Lexer.fromBuffer(src, progDecl=False)
+    else:
+        lexer = Lexer(src, "regex", progDecl=False)
+    
+    stream = lexer.tokenizeAll()
+    return stream.typs, stream.starts, stream.ends, stream.shiftAt, stream.shifts, stream.length if lexer.buffer else len(src)
@@ -0,0 +1,192 @@
+import math
+import operator
+import typing as ty
+
+import asTree as at
+import parse
+import tok
+
+TT = tok.TokenTypes
+# Folded ints beyond this many bits are left to run time rather than written into the tree
+MAX_BITS:int = 4096
+
+
+class Stats:
+    "What an Optimizer pass did."
+    def __init__(self) -> None:
+        self.folded:int = 0         # operations replaced by their constant result
+        self.propagated:int = 0     # names replaced by the constant they hold
+        self.branches:int = 0       # if/elif/else branches dropped
+        self.loops:int = 0          # while loops dropped
+        self.statements:int = 0     # statements dropped with them, nested ones included
+    
+    def __repr__(self) -> str:
+        return f"Stats(folded={self.folded}, propagated={self.propagated}, branches={self.branches}, loops={self.loops}, statements={self.statements})"
+    
+    def asDict(self) -> ty.Dict[str, int]:
+        return {"folded": self.folded, "propagated": self.propagated, "branches": self.branches, "loops": self.loops, "statements": self.statements}
+
+
+class Optimizer:
+    """
+    Simplifies a syntax tree from Parser.parseTree() in place before an engine runs it:
+    - folds operations on constants with the parser's ops table (not ones that would fail, like 1 / 0);
+    - replaces names by the constant a let gave them, as long as every path to the read agrees on it;
+    - drops the branches of an if/elif/else whose condition is constant, and while loops whose condition is
+      constantly false.
+    Function bodies are folded on their own, as the program's values are not known when they run.
+    """
+    def __init__(self) -> None:
+        self.stats:Stats = Stats()
+    
+    def optimize(self, program:at.ProgramNode) -> at.ProgramNode:
+        program.body = self.__block(program.body, {})
+        return program
+    
+    def __block(self, block:at.StatementNode|None, env:ty.Dict[str, ty.Any]) -> at.StatementNode|None:
+        statements:ty.List[at.ASTNode] = []
+        for statement in at.statements(block):
+            statements.extend(self.__statement(statement, env))
+        
+        chain:at.StatementNode|None = None
+        for statement in reversed(statements):
+            chain = at.StatementNode(statement, chain, statement.token)
+        return chain
+    
+    def __statement(self, node:at.ASTNode, env:ty.Dict[str, ty.Any]) -> ty.List[at.ASTNode]:
+        "The statements node turns into; env holds the names with a known constant value and is updated."
+        if isinstance(node, at.LetNode):
+            node.val = self.__fold(node.val, env)
+            if isinstance(node.val, at.NumNode):
+                env[node.ident.name] = node.val.val
+            else:
+                env.pop(node.ident.name, None)
+        
+        elif isinstance(node, at.PrintNode):
+            if not isinstance(node.val, at.StrNode):
+                node.val = self.__fold(node.val, env)
+        
+        elif isinstance(node, at.IfNode):
+            node.condition = self.__fold(node.condition, env)
+            if isinstance(node.condition, at.NumNode):
+                taken, dropped = (node.thenBranch, node.elseBranch) if node.condition.val else (node.elseBranch, node.thenBranch)
+                if dropped != None:
+                    self.stats.branches += 1
+                    self.stats.statements += self.__count(dropped)
+                return list(at.statements(self.__block(taken, env)))
+            
+            thenEnv:ty.Dict[str, ty.Any] = dict(env)
+            node.thenBranch = self.__block(node.thenBranch, thenEnv)
+            node.elseBranch = self.__block(node.elseBranch, env)
+            # Constant after the if only if both ways agree on it
+            for name in list(env):
+                if name not in thenEnv or not parse.same(thenEnv[name], env[name]):
+                    del env[name]
+        
+        elif isinstance(node, at.WhileNode):
+            # Names let in the body change from one iteration to the next
+            for name in self.__writes(node.thenBranch):
+                env.pop(name, None)
+            node.condition = self.__fold(node.condition, env)
+            if isinstance(node.condition, at.NumNode) and not node.condition.val:
+                self.stats.loops += 1
+                self.stats.statements += self.__count(node.thenBranch)
+                return []
+            node.thenBranch = self.__block(node.thenBranch, dict(env))
+        
+        elif isinstance(node, at.FunNode):
+            node.body = self.__block(node.body, {})
+        
+        return [node]
+    
+    def __fold(self, node:at.ASTNode, env:ty.Dict[str, ty.Any]) -> at.ASTNode:
+        "node with its constant parts folded."
+        # Explicit stack: operator chains can be as long as a line
+        folded:ty.Dict[int, at.ASTNode] = {}
+        stack:ty.List[ty.Tuple[at.ASTNode, bool]] = [(node, False)]
+        while stack:
+            current, ready = stack.pop()
+            if isinstance(current, at.BinOpNode):
+                if not ready:
+                    stack.extend(((current, True), (current.right, False), (current.left, False)))
+                    continue
+                current.left, current.right = folded[id(current.left)], folded[id(current.right)]
+                result:at.ASTNode = current
+                if isinstance(current.left, at.NumNode) and isinstance(current.right, at.NumNode):
+                    result = self.__constant(current, parse.ops[current.op], current.left.val, current.right.val)
+            
+            elif isinstance(current, at.UnaryOpNode):
+                if not ready:
+                    stack.extend(((current, True), (current.operand, False)))
+                    continue
+                current.operand = folded[id(current.operand)]
+                result = current
+                if isinstance(current.operand, at.NumNode):
+                    result = self.__constant(current, operator.neg if current.op == '-' else operator.pos, current.operand.val)
+            
+            elif isinstance(current, at.IdentNode) and current.name in env:
+                self.stats.propagated += 1
+                result = self.__num(env[current.name], current.token)
+            
+            else:
+                result = current
+            folded[id(current)] = result
+        
+        return folded[id(node)]
+    
+    def __constant(self, node:at.ASTNode, function:ty.Callable[..., ty.Any], *operands:ty.Any) -> at.ASTNode:
+        "Constant node of function(*operands), or node itself if that fails or is not worth writing into the tree."
+        if function is operator.pow and not self.__bounded(*operands):
+            return node
+        try:
+            value:ty.Any = function(*operands)
+        except (ArithmeticError, TypeError, ValueError, MemoryError):
+            return node
+        if isinstance(value, float) and not math.isfinite(value) or isinstance(value, int) and value.bit_length() > MAX_BITS:
+            return node
+        
+        self.stats.folded += 1
+        return self.__num(value, node.token)
+    
+    @staticmethod
+    def __bounded(base:ty.Any, exponent:ty.Any) -> bool:
+        "Whether base ^ exponent is cheap to work out: not an int power past MAX_BITS, which could take all the time and memory there is."
+        if isinstance(base, float) or isinstance(exponent, float) or exponent <= 0:
+            return True
+        return abs(base) <= 1 or abs(base).bit_length() * exponent <= MAX_BITS
+    
+    @staticmethod
+    def __num(value:ty.Any, token:tok.Token|None) -> at.NumNode:
+        typ:TT = TT.BOOL if isinstance(value, bool) else TT.INT if isinstance(value, int) else TT.FLOAT
+        return at.NumNode(value, typ, token)
+    
+    @staticmethod
+    def __writes(block:at.StatementNode|None) -> ty.Set[str]:
+        "Names let anywhere in block, outside function bodies."
+        names:ty.Set[str] = set()
+        stack:ty.List[at.StatementNode|None] = [block]
+        while stack:
+            for node in at.statements(stack.pop()):
+                if isinstance(node, at.LetNode):
+                    names.add(node.ident.name)
+                elif isinstance(node, at.IfNode):
+                    stack.extend((node.thenBranch, node.elseBranch))
+                elif isinstance(node, at.WhileNode):
+                    stack.append(node.thenBranch)
+        return names
+    
+    @staticmethod
+    def __count(block:at.StatementNode|None) -> int:
+        "Statements in block, nested ones included."
+        count:int = 0
+        stack:ty.List[at.StatementNode|None] = [block]
+        while stack:
+            for node in at.statements(stack.pop()):
+                count += 1
+                if isinstance(node, at.IfNode):
+                    stack.extend((node.thenBranch, node.elseBranch))
+                elif isinstance(node, at.WhileNode):
+                    stack.append(node.thenBranch)
+                elif isinstance(node, at.FunNode):
+                    stack.append(node.body)
+        return count
@@ -1,54 +1,79 @@
-import ctypes
-import msvcrt
-import sys
-import typing as ty
-
-BOLD = "\033[1m"
-BLUE = "\033[94m"
-CYAN = "\033[96m"
-GREEN = "\033[92m"
-RED = "\033[91m"
-RESET = "\033[0m"
-UNDERLINE = "\033[4m"
-YELLOW = "\033[93m"
-
-def isDigit(char:str, starting:bool=False):
-    return '0' <= char <= '9' if not starting else '1' <= char <= '9'
-
-def isAlpha(char:str):
-    return ord(char) in range(97, 123) or ord(char) in range(65, 91)
-
-def isANSISupported():
-    """
-    Checks if the terminal supports ANSI sequences.
-    If yes, return True, else False.
-
-    Thanks to Stack Overflow for this code snippet!
-    """
-    kernel32 = ctypes.windll.kernel32
-    kernel32.SetConsoleMode(kernel32.GetStdHandle(-11), 7)
-    while msvcrt.kbhit():
-        msvcrt.getch()
-    sys.stdout.write("\x1b[6n\b\b\b\b")
-    sys.stdout.flush()
-    sys.stdin.flush()
-    if msvcrt.kbhit():
-        if ord(msvcrt.getch()) == 27 and msvcrt.kbhit():
-            if msvcrt.getch() == b"[":
-                while msvcrt.kbhit():
-                    msvcrt.getch()
-                return sys.stdout.isatty()
-    return False
-
-def isInt(string:str|int|float) -> bool:
-    string = str(string)
-    
-    if string.startswith('0x'):
-        string = string[2:]
-    elif string.startswith('0'):
-        string = string[1:]
-    
-    return all(char in '0123456789' for char in string)
-
-def evaluate(val:ty.Any) -> bool:
-    return bool(val)
+import os
+import sys
+import typing as ty
+
+BOLD = "\033[1m"
+BLUE = "\033[94m"
+CYAN = "\033[96m"
+GREEN = "\033[92m"
+RED = "\033[91m"
+RESET = "\033[0m"
+UNDERLINE = "\033[4m"
+YELLOW = "\033[93m"
+
+__ansi:bool|None = None # see isANSISupported()
+
+def isDigit(char:str, starting:bool=False):
+    return '0' <= char <= '9' if not starting else '1' <= char <= '9'
+
+def isAlpha(char:str):
+    return ord(char) in range(97, 123) or ord(char) in range(65, 91)
+
+def isANSISupported(stream:ty.TextIO|None=None) -> bool:
+    """
+    Checks if the terminal supports ANSI sequences: whether colours written to stream (stdout by default) will show.
+    Decided the first time it is asked and kept for the rest of the process; setANSI() overrides it.
+    NO_COLOR turns colours off and FORCE_COLOR on; otherwise stream must be a terminal (not TERM=dumb), and on
+    Windows one that accepts virtual terminal sequences.
+    """
+    global __ansi
+    if __ansi == None:
+        __ansi = __detectANSI(stream if stream != None else sys.stdout)
+    return __ansi
+
+def setANSI(supported:bool|None) -> None:
+    "Force colours on or off for the rest of the process, or with None detect them again when next asked."
+    global __ansi
+    __ansi = supported
+
+def errorMark() -> str:
+    "The ?? starting an error message, red if the terminal supports ANSI sequences."
+    return f"{RED}??{RESET}" if isANSISupported() else "??"
+
+def __detectANSI(stream:ty.TextIO) -> bool:
+    if os.environ.get("NO_COLOR"):
+        return False
+    if os.environ.get("FORCE_COLOR", "0") != "0":
+        return True
+    try:
+        if not stream.isatty():
+            return False
+    except (AttributeError, ValueError): # No isatty(), or a closed stream
+        return False
+    if os.environ.get("TERM") == "dumb":
+        return False
+    if os.name != "nt":
+        return True
+    
+    # Windows consoles show ANSI sequences once virtual terminal processing is enabled
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11) # stdout
+        mode = ctypes.c_uint32()
+        return bool(kernel32.GetConsoleMode(handle, ctypes.byref(mode)) and kernel32.SetConsoleMode(handle, mode.value | 4))
+    except (ImportError, AttributeError, OSError):
+        return False
+
+def isInt(string:str|int|float) -> bool:
+    string = str(string)
+    
+    if string.startswith('0x'):
+        string = string[2:]
+    elif string.startswith('0'):
+        string = string[1:]
+    
+    return all(char in '0123456789' for char in string)
+
+def evaluate(val:ty.Any) -> bool:
+    return bool(val)
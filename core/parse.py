@@ -1,471 +1,980 @@
-# TODO:
-# 1. Implement dynamic typing system
-# 2. Implement for loops
-# 3. __expr correct it, return False for True comparisons
-
-import inspect # For debugging
-import operator
-import sys
-import typing as ty
-
-import basicTypes as bt
-import commons as comm
-import err
-import lex
-import other as ot
-import tok
-
-# TT is defined here!
-TT = tok.TokenTypes
-inf = float("inf")
-nan = float("nan")
-ANSI = comm.ANSI
-ops = {
-    '+': operator.add,
-    '-': operator.sub,
-    '*': operator.mul,
-    '/': operator.truediv,
-    '^': operator.pow,
-    '%': operator.mod,
-    '==': operator.eq,
-    '!=': operator.ne,
-    '<': operator.lt,
-    '<=': operator.le,
-    '>': operator.gt,
-    '>=': operator.ge,
-    '+=': operator.iadd,
-    '-=': operator.isub,
-    '*=': operator.imul,
-    '/=': operator.itruediv,
-}
-
-
-class Parser:
-    def __init__(self, lexer:lex.Lexer) -> None:
-        self.lexer:lex.Lexer = lexer
-        self.token:tok.Token = tok.Token(TT.INIT, '', -1, -1, -1, 0)
-        self.peekToken:tok.Token = tok.Token(TT.INIT, '', -1, -1, -1, 0)
-        self.tokNum:int = 0 # aka parPos (for parser position)
-        self.symTable:ty.Dict[str, ty.Any] = {}
-        self.funcTable:ty.Dict[str, ty.Dict[str, str]] = {}
-        self.typing:int = self.lexer.programTyping if self.lexer.programTyping != None else 0 # 0 for static, 1 for dynamic
-
-        self.__readToken()
-        self.__readToken()
-    
-    def __readToken(self) -> tok.Token:
-        if self.token.typ != TT.EOF:
-            self.token = self.peekToken
-            self.peekToken = self.lexer.tokenize()
-            self.tokNum += 1
-        
-        return self.token
-    
-    def __checkToken(self, tokTyp:TT, tokVal:ty.Any=None) -> bool:
-        return (self.token.typ == tokTyp) and ((tokVal == None) or (self.token.val == tokVal))
-    
-    def __matchToken(self, tokTyp:TT, tokVal:str|None=None, error:ty.Type[err.Error]|None=None) -> None:
-        if (tokTyp == TT.PLACEHOLDER) and (tokVal != None):
-            if self.token.val != tokVal:
-                self.__error(
-                    err.syntaxErr if error == None else error,
-                    self.token, self.lexer.line, self.lexer.printPos,
-                    msg=f"Expected \"{tokVal}\", got \"{self.token.val}\" at line {self.lexer.line} pos {self.lexer.printPos-self.token.size}."
-                )
-            else:
-                self.__readToken()
-        
-        elif not self.__checkToken(tokTyp, tokVal):
-            self.__error(
-                err.syntaxErr if error == None else error,
-                self.token, self.lexer.line, self.lexer.printPos,
-                msg=f"Expected {tokTyp.name}, got \"{self.token.val}\" ({self.token.typ.name}) at line {self.lexer.line} pos {self.lexer.printPos-self.token.size}."
-            )
-        elif self.__checkToken(tokTyp, tokVal):
-            self.__readToken()
-        
-        else:
-            err.fatalErr()
-    
-    def __error(self, errType:ty.Type[err.Error], *args:ty.Any, readToken:bool=True, **kwargs:ty.Any) -> None:
-        "Displays errors."
-        sys.stdout.write(f"{ot.RED if ANSI else ''}??{ot.RESET if ANSI else ''} " + str(errType(*args, **kwargs)) + '\n')
-        sys.stdout.flush()
-        self.__readToken() if readToken else None
-    
-    def parse(self):
-        print(f"Typing: {'dynamic' if self.typing else 'static'}")
-        print("PROGRAM-START")
-        
-        while (not self.__checkToken(TT.EOF)):
-            self.__statement()
-        
-        print("PROGRAM-END")
-    
-    def __statement(self):
-        if (self.__checkToken(TT.KEYWD, "print")):
-            self.__print()
-        
-        elif (self.__checkToken(TT.KEYWD, "if")):
-            self.__if()
-        
-        elif (self.__checkToken(TT.KEYWD, "while")):
-            self.__while()
-        
-        elif (self.__checkToken(TT.KEYWD, "for")):
-            self.__for()
-        
-        elif (self.__checkToken(TT.KEYWD, "let")):
-            self.__let()
-        
-        elif (self.__checkToken(TT.KEYWD, "fun")):
-            self.__fun()
-        
-        else:
-            self.__error(err.syntaxErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size,
-                         f"Unexpected token \"{self.token.val}\" (type {self.token.typ.name}) on line {self.lexer.line} pos {self.lexer.printPos-self.token.size}.")
-            while (not self.__checkToken(TT.SEMICLN)):
-                if self.__checkToken(TT.EOF):
-                    break
-                self.__readToken()
-
-        self.__matchToken(TT.SEMICLN)
-        while self.token.typ == TT.SEMICLN:
-            self.__matchToken(TT.SEMICLN)
-    
-    def __print(self):
-        print("KEYWD: print")
-        self.__matchToken(TT.KEYWD, "print")
-
-        # String or expression
-        if self.__checkToken(TT.STRING):
-            print(f"STRING: {self.token.val}")
-            self.__matchToken(TT.STRING)
-        
-        else:
-            result:int|float|bool|None = self.__expr()
-            
-            if result == None:
-                self.__error(err.exprErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size, readToken=False)
-                return
-            
-            # invalid:bool = False
-
-            # if result == None:
-            #     invalid = True
-            
-            # if self.isComparisonOp(self.token):
-            #     comp = self.token.val
-            #     self.__readToken()
-            #     result2:int|float|None = self.__expr()
-
-            #     if result2 == None:
-            #         return
-            #     if not invalid:
-            #         print("COMPARISON:", ops[comp](result, result2))
-            
-            # else:
-
-            print("EXPRESSION:", result)
-    
-    def __if(self):
-        # if block
-        invIfCondition:bool = False
-        invElifCondition:bool = False
-
-        print("KEYWD: if")
-        self.__matchToken(TT.KEYWD, "if")
-        self.__matchToken(TT.LPAREN)
-
-        result = self.__expr()
-        if result == None:
-            invIfCondition = True
-        
-        self.__matchToken(TT.RPAREN)
-        self.__matchToken(TT.LFLOBRAC)
-
-        while not self.__checkToken(TT.RFLOBRAC):
-            self.__statement()
-        self.__matchToken(TT.RFLOBRAC)
-
-        if not invIfCondition:
-            if ot.evaluate(result):
-                print("IF-block will be executed!")
-            else:
-                print("IF-block will NOT be executed!")
-        
-        # elif block
-        elifCount = 0
-        while self.__checkToken(TT.KEYWD, "elif"):
-            print("KEYWD: elif")
-            self.__matchToken(TT.KEYWD, "elif")
-            self.__matchToken(TT.LPAREN)
-
-            result = self.__expr()
-            if result == None:
-                invElifCondition = True
-            
-            self.__matchToken(TT.RPAREN)
-            self.__matchToken(TT.LFLOBRAC)
-
-            while not self.__checkToken(TT.RFLOBRAC):
-                self.__statement()
-            
-            self.__matchToken(TT.RFLOBRAC)
-            elifCount += 1
-            
-            if not invElifCondition:
-                if ot.evaluate(result):
-                    print(f"ELIF-block ({elifCount}) will be executed!")
-                else:
-                    print(f"ELIF-block ({elifCount}) will NOT be executed!")
-        
-        # else block
-        if self.__checkToken(TT.KEYWD, "else"):
-            print("KEYWD: else")
-            self.__matchToken(TT.KEYWD, "else")
-            self.__matchToken(TT.LFLOBRAC)
-            
-            while not self.__checkToken(TT.RFLOBRAC):
-                self.__statement()
-            
-            self.__matchToken(TT.RFLOBRAC)
-
-    def __while(self):
-        invWhileCond:bool = False
-
-        print("KEYWD: while")
-        self.__matchToken(TT.KEYWD, "while")
-        self.__matchToken(TT.LPAREN)
-        
-        result = self.__expr()
-        if result == None:
-            invWhileCond = True
-        
-        self.__matchToken(TT.RPAREN)
-        self.__matchToken(TT.LFLOBRAC)
-
-        while not self.__checkToken(TT.RFLOBRAC):
-            self.__statement()
-        
-        self.__matchToken(TT.RFLOBRAC)
-
-        if not invWhileCond:
-            if ot.evaluate(result):
-                print("WHILE-block will be executed!")
-            else:
-                print("WHILE-block will NOT be executed!")
-
-    def __for(self):
-        # TODO: Implement for loop
-        pass
-
-    def __let(self):
-        print("KEYWD: let")
-        self.__matchToken(TT.KEYWD, "let")
-
-        if ((self.token.val.upper() in TT._member_names_) and (TT[self.token.val.upper()].value in range(301, 320))):
-            self.__matchToken(TT.KEYWD)
-            ident = self.token.val
-            self.__matchToken(TT.IDENT)
-            self.__matchToken(TT.EQ)
-            result = self.__expr()
-            if result == None:
-                return
-            else:
-                self.symTable[ident] = result
-        else:
-            self.__error(
-                err.syntaxErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size,
-                f"Expected identifier type (KEYWD), got {self.token.val} ({self.token.typ.name}) at line {self.lexer.line} pos {self.lexer.printPos-self.token.size}."
-            )
-            if self.__checkToken(TT.IDENT):
-                self.__readToken()
-                if self.__checkToken(TT.EQ):
-                    self.__readToken()
-                    result = self.__expr()
-                    if result == None:
-                        self.__error(err.exprErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size)
-                else:
-                    self.__error(err.syntaxErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size,
-                                 f"Expected '=' (EQ), got {self.token.val} ({self.token.typ.name}) on line {self.lexer.line} pos {self.lexer.printPos-self.token.size}.")
-            else:
-                self.__error(err.syntaxErr, self.token, self.lexer.line, self.lexer.printPos,
-                             f"Expected IDENT, got {self.token.val} ({self.token.typ.name}) on line {self.lexer.line} pos {self.lexer.printPos-self.token.size}.")
-    
-    def __fun(self):
-        print("KEYWD: fun")
-        self.__matchToken(TT.KEYWD, "fun")
-        funcName = self.token.val
-        self.__matchToken(TT.IDENT)
-        self.__matchToken(TT.LPAREN)
-        parameters:ty.Dict[str, str]|str = self.__parameters(funcName)
-        self.__matchToken(TT.RPAREN)
-
-        if parameters != "inv":
-            self.funcTable[funcName] = parameters
-
-        self.__matchToken(TT.LFLOBRAC)
-        while not self.__checkToken(TT.RFLOBRAC):
-            self.__statement()
-        
-        self.__matchToken(TT.RFLOBRAC)
-    
-    def __comp(self):
-        print("COMPARISON")
-        lparen:bool = False
-
-        if self.__checkToken(TT.LPAREN):
-            lparen = True
-            self.__readToken()
-        
-        result:int|float|None = self.__expr()
-        invalid:bool = False
-
-        if result == None:
-            invalid = True
-
-        if self.isComparisonOp(self.token):
-            comp = self.token.val
-            self.__readToken()
-            result2:int|float|None = self.__expr()
-
-            if lparen:
-                self.__matchToken(TT.RPAREN)
-
-            if result2 == None:
-                return
-            if not invalid:
-                return ops[comp](result, result2)
-            return
-        
-        else:
-            self.__error(
-                err.syntaxErr, self.token, self.lexer.line, self.lexer.printPos,
-                msg=f"Expected comparison operator at line {self.lexer.line} pos {self.lexer.printPos-self.token.size}."
-            )
-
-    def __expr(self):
-        print("EXPRESSION")
-        result:int|float|bool|None = self.__term()
-        invalid:bool = False
-
-        while (temp:=self.__checkToken(TT.PLUS)) or self.__checkToken(TT.MINUS):
-            self.__readToken()
-            result = ops["+=" if temp else "-="](result, self.__term())
-        
-        if result in (inf, nan):
-            invalid = True
-        
-        if self.isComparisonOp(self.token):
-            comp = self.token.val
-            self.__readToken()
-            result2 = self.__expr()
-            if result2 == None:
-                return
-            result = ops[comp](result, result2)
-        
-        if invalid:
-            return
-        return result
-    
-    def __term(self):
-        result:int|float = self.__unary()
-        invalid:bool = False
-        invalidNone:bool = False
-
-        if result in (inf, nan):
-            invalid = True
-        
-        if result == None:
-            invalidNone = True
-
-        while (temp:=self.__checkToken(TT.ASTERISK)) or self.__checkToken(TT.FSLASH):
-            self.__readToken()
-            result2 = self.__unary()
-            if not invalidNone:
-                result = ops["*=" if temp else "/="](result, result2)
-            else:
-                return nan
-        
-        if invalid:
-            return nan
-        return result
-    
-    def __unary(self):
-        prevSym:str = ''
-
-        if (self.__checkToken(TT.MINUS)) or self.__checkToken(TT.PLUS):
-            prevSym = self.token.val
-            prevSymLine, prevSymPos = self.lexer.line, self.lexer.printPos
-            self.__readToken()
-        
-        result:int|float
-        if ot.isInt(str(result:=self.__primary())):
-            result = int(prevSym + str(result))
-        elif result in (True, False):
-            return bool(str(prevSym) + str(result))
-        else:
-            result = float(prevSym + str(result))
-        
-        return result
-    
-    def __primary(self):
-        result:int|float
-
-        if (temp:=self.__checkToken(TT.INT)) or self.__checkToken(TT.FLOAT):
-            result = int(self.token.val.val) if temp else float(self.token.val.val)
-            self.__readToken()
-            return result
-        
-        elif self.__checkToken(TT.IDENT):
-            if result:=self.symTable.get(self.token.val):
-                self.__readToken()
-                return result
-            else:
-                self.__error(err.unknownIdent, self.token, self.lexer.line, self.lexer.printPos-self.token.size)
-                return inf
-        
-        elif self.__checkToken(TT.LPAREN):
-            invalid:bool = False
-            self.__readToken()
-            result = self.__expr()
-            if result == None:
-                invalid = True
-            self.__matchToken(TT.RPAREN)
-
-            if invalid:
-                return inf
-            return result
-        
-        else:
-            return inf
-
-    def __iter(self):
-        arr:ty.Any = []
-        if self.token.typ == TT.LSQBRAC:
-            self.__matchToken(TT.LSQBRAC)
-
-
-    def __parameters(self, function:str) -> ty.Dict[str, str]|str:
-        print("PARAMETERS")
-        paras:ty.Dict[str, str] = {}
-        
-        while (self.token.typ == TT.KEYWD and TT[self.token.val.upper()].value in range(301, 340)):
-            typ:TT = TT[self.token.val.upper()]
-            self.__matchToken(TT.KEYWD)
-            ident:str = self.token.val
-            self.__matchToken(TT.IDENT)
-            paras[ident] = typ.name
-            
-            if self.__checkToken(TT.COMMA):
-                self.__readToken()
-        
-        if not self.__checkToken(TT.RPAREN):
-            self.__error(err.invalidParametersErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size, function)
-            return "inv"
-        
-        return paras
-
-    def isComparisonOp(self, token:tok.Token):
-        return token.typ in (TT.LT, TT.LTEQ, TT.GT, TT.GTEQ, TT.EQEQ, TT.NOTEQ)
+# TODO:
+# 1. Implement dynamic typing system
+# 2. Implement for loops
+# 3. __expr correct it, return False for True comparisons
+
+import bisect
+import inspect # For debugging
+import operator
+import typing as ty
+
+import asTree as at
+import basicTypes as bt
+import diagnostics as dm
+import err
+import events as ev
+import lex
+import other as ot
+import resolver as rs
+import tok
+import typeChecker as tc
+
+# TT is defined here!
+TT = tok.TokenTypes
+ET = ev.EventTypes
+inf = float("inf")
+nan = float("nan")
+ops = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '^': operator.pow,
+    '%': operator.mod,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '+=': operator.iadd,
+    '-=': operator.isub,
+    '*=': operator.imul,
+    '/=': operator.itruediv,
+}
+UNARY_OPS = {
+    '+': operator.pos,
+    '-': operator.neg,
+}
+# Binary operators of expressions: (precedence, right-associative). Comparisons stay right-associative, a<b<c
+# being a<(b<c) as it always was; a sign binds tighter than * and / but not ^ (-2^2 is -(2^2)).
+PAREN, COMPARISON, UNARY_PRECEDENCE = 0, 1, 4
+BINARY_OPS:ty.Dict[TT, ty.Tuple[int, bool]] = {
+    TT.EQEQ: (COMPARISON, True), TT.NOTEQ: (COMPARISON, True),
+    TT.LT: (COMPARISON, True), TT.LTEQ: (COMPARISON, True), TT.GT: (COMPARISON, True), TT.GTEQ: (COMPARISON, True),
+    TT.PLUS: (2, False), TT.MINUS: (2, False),
+    TT.ASTERISK: (3, False), TT.FSLASH: (3, False),
+    TT.CARET: (5, True),
+}
+ORDER = operator.attrgetter("order")
+START = operator.attrgetter("start")
+ORDER_GAP = 1 << 32
+
+
+def same(val1:ty.Any, val2:ty.Any) -> bool:
+    "Whether two symbol values are interchangeable (1, 1.0 and True are not)."
+    return type(val1) is type(val2) and val1 == val2
+
+
+class Statement:
+    """
+    A top-level statement as recorded by Parser.parse(): its tokens run from start up to stop, the first token after it
+    (which it looks at to end). reads are the names it looks up in symTable; writes and funcs, its result, are what it
+    stores in symTable and funcTable. order sorts statements in program order and leaves room for inserting new ones.
+    Parser.reparse() stores start and stop relative to the end of the token stream (negative) behind an edit.
+    """
+    __slots__ = ("start", "stop", "order", "reads", "writes", "funcs")
+
+    def __init__(self, start:int, stop:int, reads:ty.Set[str], writes:ty.Dict[str, ty.Any], funcs:ty.Dict[str, ty.Dict[str, str]]) -> None:
+        self.start:int = start
+        self.stop:int = stop
+        self.order:int = 0
+        self.reads:ty.Set[str] = reads
+        self.writes:ty.Dict[str, ty.Any] = writes
+        self.funcs:ty.Dict[str, ty.Dict[str, str]] = funcs
+    
+    def __repr__(self) -> str:
+        return f"Statement({self.start}, {self.stop}, reads={self.reads}, writes={self.writes}, funcs={self.funcs})"
+
+
+class SymbolView:
+    """
+    Stands in for Parser.symTable while Parser.reparse() parses statements again: names written since reparsing
+    started at a statement come from written, all others from lookup(name), their value before that statement.
+    """
+    __slots__ = ("written", "lookup")
+
+    def __init__(self, lookup:ty.Callable[[str], ty.Any]) -> None:
+        self.written:ty.Dict[str, ty.Any] = {}
+        self.lookup:ty.Callable[[str], ty.Any] = lookup
+    
+    def get(self, name:str) -> ty.Any:
+        return self.written[name] if name in self.written else self.lookup(name)
+    
+    def __setitem__(self, name:str, value:ty.Any) -> None:
+        self.written[name] = value
+
+
+class Parser:
+    def __init__(self, lexer:lex.Lexer|tok.TokenStream|tok.TokenCursor, listener:ev.Listener|None=None,
+                 diagnostics:dm.Diagnostics|None=None) -> None:
+        """
+        lexer is a Lexer, or a TokenStream from Lexer.tokenizeAll() which is then read through a cursor.
+        listener receives trace events as the program is parsed (events.ConsoleListener prints them); without one
+        the parser only writes errors. Errors go to diagnostics, by default the lexer's (or a new dm.Diagnostics for a
+        stream), and are written at the latest when parsing is done.
+        """
+        if isinstance(lexer, tok.TokenStream):
+            lexer = lexer.cursor()
+        self.lexer:lex.Lexer|tok.TokenCursor = lexer
+        self.listener:ev.Listener|None = listener
+        self.stream:tok.TokenStream|None = lexer.stream if isinstance(lexer, tok.TokenCursor) else None
+        self.token:tok.Token = tok.Token(TT.INIT, '', -1, 0)
+        self.peekToken:tok.Token = tok.Token(TT.INIT, '', -1, 0)
+        self.tokNum:int = 0 # aka parPos (for parser position)
+        self.symTable:ty.Dict[str, ty.Any] = {}
+        self.funcTable:ty.Dict[str, ty.Dict[str, str]] = {}
+        self.typing:int = self.lexer.programTyping if self.lexer.programTyping != None else 0 # 0 for static, 1 for dynamic
+        self.errors:int = 0
+        self.diagnostics:dm.Diagnostics = diagnostics if diagnostics != None else (lexer.diagnostics if isinstance(lexer, lex.Lexer) else dm.Diagnostics())
+        # Top-level statements in program order and, per name, the statements reading or writing it (sorted by order)
+        self.statements:ty.List[Statement] = []
+        self.__readers:ty.Dict[str, ty.List[Statement]] = {}
+        self.__writers:ty.Dict[str, ty.List[Statement]] = {}
+        self.__definers:ty.Dict[str, ty.List[Statement]] = {}
+        self.__reads:ty.Set[str] = set()
+        self.__writes:ty.Dict[str, ty.Any] = {}
+        self.__funcs:ty.Dict[str, ty.Dict[str, str]] = {}
+
+        self.__readToken()
+        self.__readToken()
+    
+    def __readToken(self) -> tok.Token:
+        if self.token.typ != TT.EOF:
+            self.token = self.peekToken
+            self.peekToken = self.lexer.tokenize()
+            self.tokNum += 1
+        
+        return self.token
+    
+    def __checkToken(self, tokTyp:TT, tokVal:ty.Any=None) -> bool:
+        return (self.token.typ == tokTyp) and ((tokVal == None) or (self.token.val == tokVal))
+    
+    def __matchToken(self, tokTyp:TT, tokVal:str|None=None, error:ty.Type[err.Error]|None=None) -> None:
+        if (tokTyp == TT.PLACEHOLDER) and (tokVal != None):
+            if self.token.val != tokVal:
+                self.__error(
+                    err.syntaxErr if error == None else error,
+                    self.token, self.lexer.line, self.lexer.printPos,
+                    msg=f"Expected \"{tokVal}\", got \"{self.token.val}\" at line {self.lexer.line} pos {self.lexer.printPos-self.token.size}."
+                )
+            else:
+                self.__readToken()
+        
+        elif not self.__checkToken(tokTyp, tokVal):
+            self.__error(
+                err.syntaxErr if error == None else error,
+                self.token, self.lexer.line, self.lexer.printPos,
+                msg=f"Expected {tokTyp.name}, got \"{self.token.val}\" ({self.token.typ.name}) at line {self.lexer.line} pos {self.lexer.printPos-self.token.size}."
+            )
+        elif self.__checkToken(tokTyp, tokVal):
+            self.__readToken()
+        
+        else:
+            err.fatalErr()
+    
+    def __error(self, errType:ty.Type[err.Error], *args:ty.Any, readToken:bool=True, **kwargs:ty.Any) -> None:
+        "Displays errors."
+        self.errors += 1
+        self.diagnostics.add(errType, *args, offset=self.token.pos - self.token.size + 1, **kwargs)
+        self.__readToken() if readToken else None
+    
+    def __trace(self, kind:ev.EventTypes, value:ty.Any=None, token:tok.Token|None=None) -> None:
+        "Report an event about token (the current one by default) to the listener."
+        token = self.token if token == None else token
+        self.listener.event(kind, token, token.line, value)
+    
+    def parse(self):
+        if self.listener != None:
+            self.__trace(ET.TYPING, self.typing)
+            self.__trace(ET.PROGRAM_START)
+        
+        try:
+            while (not self.__checkToken(TT.EOF)):
+                statement:Statement = self.__topStatement()
+                statement.order = (len(self.statements) + 1) * ORDER_GAP
+                self.statements.append(statement)
+                self.__index(statement)
+        finally:
+            self.diagnostics.flush()
+        
+        if self.listener != None:
+            self.__trace(ET.PROGRAM_END)
+    
+    def parseTree(self) -> at.ProgramNode:
+        """
+        Parse the program into a syntax tree without evaluating anything: symTable and funcTable stay empty. Names
+        are resolved to slots by resolver.Resolver, which reports those read before any let, and a ~static program's
+        types are checked by typeChecker.TypeChecker. Syntax errors are reported as by parse() and statements with
+        errors left out.
+        """
+        if self.listener != None:
+            self.__trace(ET.TYPING, self.typing)
+            self.__trace(ET.PROGRAM_START)
+        
+        token:tok.Token = self.token
+        try:
+            program:at.ProgramNode = at.ProgramNode(self.__blockNode(TT.EOF), self.typing, token)
+            resolver:rs.Resolver = rs.Resolver(self.diagnostics)
+            resolver.resolve(program)
+            self.errors += resolver.errors
+            if self.typing == 0:
+                checker:tc.TypeChecker = tc.TypeChecker(self.diagnostics)
+                checker.check(program)
+                self.errors += checker.errors
+        finally:
+            self.diagnostics.flush()
+        
+        if self.listener != None:
+            self.__trace(ET.PROGRAM_END)
+        return program
+    
+    def reparse(self, stream:tok.TokenStream, first:int, oldStop:int, newStop:int) -> ty.List[Statement]:
+        """
+        Bring the parse up to date after Lexer.relex() turned the parser's stream into stream, replacing tokens
+        first to oldStop by tokens first to newStop. Only the statements around the changed tokens are parsed again,
+        until a statement boundary lines up with an old one, and after that only the statements reading a symbol
+        whose value changed. symTable and funcTable end up as after parsing the new stream from the start.
+        Statements parsed again report their trace events as in parse(). Returns them.
+        """
+        if self.stream == None:
+            raise TypeError("reparse() needs a parser reading a TokenStream.")
+        
+        statements:ty.List[Statement] = self.statements
+        oldLen:int = len(self.stream)
+        newLen:int = len(stream)
+        self.stream = stream
+        self.typing = stream.programTyping if stream.programTyping != None else 0
+        
+        # Statements ahead of the edit keep absolute token indices, the ones behind it are stored relative to the end
+        # of the stream so that only those between this edit and the previous one need converting
+        i:int = bisect.bisect_left(statements, first, key=lambda statement: statement.stop if statement.stop >= 0 else statement.stop + oldLen)
+        pos:int = i - 1
+        while pos >= 0 and statements[pos].stop < 0:
+            statements[pos].start += oldLen
+            statements[pos].stop += oldLen
+            pos -= 1
+        pos = i
+        while pos < len(statements) and statements[pos].stop >= 0:
+            statements[pos].start -= oldLen
+            statements[pos].stop -= oldLen
+            pos += 1
+        
+        start:int = statements[i].start + oldLen if i < len(statements) else 0
+        # Names whose value differs from the one they had at the same point before the edit, with that old value
+        dirty:ty.Dict[str, ty.Any] = {}
+        touched:ty.Set[str] = set()
+        touchedFuncs:ty.Set[str] = set()
+        parsed:ty.List[Statement] = []
+        symTable:ty.Dict[str, ty.Any] = self.symTable
+        try:
+            while True:
+                stop:int = self.__reparseRegion(i, start, newLen, newStop, dirty, touched, touchedFuncs, parsed)
+                if stop == len(statements):
+                    break
+                
+                # The old statements from stop on are kept; the next one to parse again is the first reading a dirty name
+                nxt:Statement|None = self.__nextUser(dirty, statements[stop].order - 1)
+                while nxt != None and dirty.keys().isdisjoint(nxt.reads):
+                    # Writing a dirty name without reading one makes it agree with the old value again
+                    for name in nxt.writes:
+                        dirty.pop(name, None)
+                    nxt = self.__nextUser(dirty, nxt.order)
+                
+                if nxt == None:
+                    break
+                i = bisect.bisect_left(statements, nxt.order, key=ORDER)
+                start = nxt.start + newLen
+        
+        finally:
+            self.symTable = symTable
+            self.diagnostics.flush()
+        
+        for name in touched:
+            writers:ty.List[Statement]|None = self.__writers.get(name)
+            if writers:
+                self.symTable[name] = writers[-1].writes[name]
+            else:
+                self.symTable.pop(name, None)
+        
+        for name in touchedFuncs:
+            definers:ty.List[Statement]|None = self.__definers.get(name)
+            if definers:
+                self.funcTable[name] = definers[-1].funcs[name]
+            else:
+                self.funcTable.pop(name, None)
+        
+        return parsed
+    
+    def __reparseRegion(self, i:int, start:int, newLen:int, newStop:int, dirty:ty.Dict[str, ty.Any], touched:ty.Set[str],
+                        touchedFuncs:ty.Set[str], parsed:ty.List[Statement]) -> int:
+        """
+        Parse statements from token start, replacing the old statements from index i on, until a statement boundary
+        at or after token newStop lines up with an old statement (or EOF). Updates dirty for the names written by the
+        old and the new statements and returns the index of the first old statement kept.
+        """
+        statements:ty.List[Statement] = self.statements
+        order:int|None = statements[i].order if i < len(statements) else None
+        view:SymbolView = SymbolView(lambda name: self.__valueAt(name, order))
+        self.symTable = view
+        self.__seek(start)
+        
+        region:ty.List[Statement] = []
+        stop:int = len(statements)
+        while not self.__checkToken(TT.EOF):
+            statement:Statement = self.__topStatement()
+            statement.start -= newLen
+            statement.stop -= newLen
+            region.append(statement)
+            
+            if statement.stop + newLen >= newStop:
+                index:int = bisect.bisect_left(statements, statement.stop, i, key=START)
+                if index < len(statements) and statements[index].start == statement.stop:
+                    stop = index
+                    break
+        
+        # Compare old and new values of the names written on either side where the old statements are kept
+        old:ty.List[Statement] = statements[i:stop]
+        names:ty.Set[str] = set(view.written).union(dirty, *(statement.writes for statement in old))
+        for name in names:
+            oldVal:ty.Any = dirty[name] if name in dirty else self.__valueAt(name, order)
+            for statement in old:
+                if name in statement.writes:
+                    oldVal = statement.writes[name]
+            
+            if same(view.get(name), oldVal):
+                dirty.pop(name, None)
+            else:
+                dirty[name] = oldVal
+        
+        for statement in old:
+            self.__unindex(statement)
+            touched.update(statement.writes)
+            touchedFuncs.update(statement.funcs)
+        
+        statements[i:stop] = region
+        stop = i + len(region)
+        low:int = statements[i-1].order if i > 0 else 0
+        high:int = statements[stop].order if stop < len(statements) else low + (len(region) + 1) * ORDER_GAP
+        if high - low <= len(region):
+            for index, statement in enumerate(statements):
+                statement.order = (index + 1) * ORDER_GAP
+        else:
+            step:int = (high - low) // (len(region) + 1)
+            for index, statement in enumerate(region):
+                statement.order = low + (index + 1) * step
+        
+        for statement in region:
+            self.__index(statement)
+            touched.update(statement.writes)
+            touchedFuncs.update(statement.funcs)
+        
+        parsed.extend(region)
+        return stop
+    
+    def __topStatement(self) -> Statement:
+        "Parse a top-level statement, recording its tokens and what it reads and writes."
+        start:int = self.tokNum - 2
+        self.__reads = set()
+        self.__writes = {}
+        self.__funcs = {}
+        self.__statement()
+        return Statement(start, self.tokNum - 2, self.__reads, self.__writes, self.__funcs)
+    
+    def __seek(self, index:int) -> None:
+        "Continue reading the stream at token index."
+        self.lexer = self.stream.cursor()
+        self.lexer.index = index - 1
+        self.token = self.peekToken = tok.Token(TT.INIT, '', -1, 0)
+        self.tokNum = index
+        self.__readToken()
+        self.__readToken()
+    
+    def __valueAt(self, name:str, order:int|None) -> ty.Any:
+        "Value of name right before the statement with order (after the last statement for None)."
+        writers:ty.List[Statement]|None = self.__writers.get(name)
+        if not writers:
+            return None
+        
+        index:int = len(writers) if order == None else bisect.bisect_left(writers, order, key=ORDER)
+        return writers[index-1].writes[name] if index else None
+    
+    def __nextUser(self, names:ty.Iterable[str], order:int) -> Statement|None:
+        "First statement after the one with order reading or writing one of names."
+        nxt:Statement|None = None
+        for name in names:
+            for users in (self.__readers.get(name), self.__writers.get(name)):
+                if users:
+                    index:int = bisect.bisect_right(users, order, key=ORDER)
+                    if index < len(users) and (nxt == None or users[index].order < nxt.order):
+                        nxt = users[index]
+        return nxt
+    
+    def __index(self, statement:Statement) -> None:
+        for table, names in ((self.__readers, statement.reads), (self.__writers, statement.writes), (self.__definers, statement.funcs)):
+            for name in names:
+                bisect.insort(table.setdefault(name, []), statement, key=ORDER)
+    
+    def __unindex(self, statement:Statement) -> None:
+        for table, names in ((self.__readers, statement.reads), (self.__writers, statement.writes), (self.__definers, statement.funcs)):
+            for name in names:
+                users:ty.List[Statement] = table[name]
+                del users[bisect.bisect_left(users, statement.order, key=ORDER)]
+    
+    def __statement(self):
+        if (self.__checkToken(TT.KEYWD, "print")):
+            self.__print()
+        
+        elif (self.__checkToken(TT.KEYWD, "if")):
+            self.__if()
+        
+        elif (self.__checkToken(TT.KEYWD, "while")):
+            self.__while()
+        
+        elif (self.__checkToken(TT.KEYWD, "for")):
+            self.__for()
+        
+        elif (self.__checkToken(TT.KEYWD, "let")):
+            self.__let()
+        
+        elif (self.__checkToken(TT.KEYWD, "fun")):
+            self.__fun()
+        
+        else:
+            self.__error(err.syntaxErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size,
+                         f"Unexpected token \"{self.token.val}\" (type {self.token.typ.name}) on line {self.lexer.line} pos {self.lexer.printPos-self.token.size}.")
+            while (not self.__checkToken(TT.SEMICLN)):
+                if self.__checkToken(TT.EOF):
+                    break
+                self.__readToken()
+
+        self.__matchToken(TT.SEMICLN)
+        while self.token.typ == TT.SEMICLN:
+            self.__matchToken(TT.SEMICLN)
+    
+    def __print(self):
+        if self.listener != None:
+            self.__trace(ET.KEYWD)
+        self.__matchToken(TT.KEYWD, "print")
+
+        # String or expression
+        if self.__checkToken(TT.STRING):
+            if self.listener != None:
+                self.__trace(ET.STRING)
+            self.__matchToken(TT.STRING)
+        
+        else:
+            start:tok.Token = self.token
+            errors:int = self.errors
+            result:int|float|bool|None = self.__expr()
+            
+            # An operand or operation that failed has reported its error already
+            if result == None:
+                if self.errors == errors:
+                    self.__error(err.exprErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size, readToken=False)
+                return
+            
+            # invalid:bool = False
+
+            # if result == None:
+            #     invalid = True
+            
+            # if self.isComparisonOp(self.token):
+            #     comp = self.token.val
+            #     self.__readToken()
+            #     result2:int|float|None = self.__expr()
+
+            #     if result2 == None:
+            #         return
+            #     if not invalid:
+            #         print("COMPARISON:", ops[comp](result, result2))
+            
+            # else:
+
+            if self.listener != None:
+                self.__trace(ET.RESULT, result, start)
+    
+    def __if(self):
+        # if block
+        invIfCondition:bool = False
+        invElifCondition:bool = False
+
+        keyword:tok.Token = self.token
+        if self.listener != None:
+            self.__trace(ET.KEYWD)
+        self.__matchToken(TT.KEYWD, "if")
+        self.__matchToken(TT.LPAREN)
+
+        result = self.__expr()
+        if result == None:
+            invIfCondition = True
+        
+        self.__matchToken(TT.RPAREN)
+        self.__matchToken(TT.LFLOBRAC)
+
+        while not self.__checkToken(TT.RFLOBRAC) and not self.__checkToken(TT.EOF):
+            self.__statement()
+        self.__matchToken(TT.RFLOBRAC)
+
+        if not invIfCondition and self.listener != None:
+            self.__trace(ET.IF_BLOCK, ot.evaluate(result), keyword)
+        
+        # elif block
+        elifCount = 0
+        while self.__checkToken(TT.KEYWD, "elif"):
+            keyword = self.token
+            if self.listener != None:
+                self.__trace(ET.KEYWD)
+            self.__matchToken(TT.KEYWD, "elif")
+            self.__matchToken(TT.LPAREN)
+
+            result = self.__expr()
+            if result == None:
+                invElifCondition = True
+            
+            self.__matchToken(TT.RPAREN)
+            self.__matchToken(TT.LFLOBRAC)
+
+            while not self.__checkToken(TT.RFLOBRAC) and not self.__checkToken(TT.EOF):
+                self.__statement()
+            
+            self.__matchToken(TT.RFLOBRAC)
+            elifCount += 1
+            
+            if not invElifCondition and self.listener != None:
+                self.__trace(ET.ELIF_BLOCK, (elifCount, ot.evaluate(result)), keyword)
+        
+        # else block
+        if self.__checkToken(TT.KEYWD, "else"):
+            if self.listener != None:
+                self.__trace(ET.KEYWD)
+            self.__matchToken(TT.KEYWD, "else")
+            self.__matchToken(TT.LFLOBRAC)
+            
+            while not self.__checkToken(TT.RFLOBRAC) and not self.__checkToken(TT.EOF):
+                self.__statement()
+            
+            self.__matchToken(TT.RFLOBRAC)
+
+    def __while(self):
+        invWhileCond:bool = False
+
+        keyword:tok.Token = self.token
+        if self.listener != None:
+            self.__trace(ET.KEYWD)
+        self.__matchToken(TT.KEYWD, "while")
+        self.__matchToken(TT.LPAREN)
+        
+        result = self.__expr()
+        if result == None:
+            invWhileCond = True
+        
+        self.__matchToken(TT.RPAREN)
+        self.__matchToken(TT.LFLOBRAC)
+
+        while not self.__checkToken(TT.RFLOBRAC) and not self.__checkToken(TT.EOF):
+            self.__statement()
+        
+        self.__matchToken(TT.RFLOBRAC)
+
+        if not invWhileCond and self.listener != None:
+            self.__trace(ET.WHILE_BLOCK, ot.evaluate(result), keyword)
+
+    def __for(self):
+        # TODO: Implement for loop
+        pass
+
+    def __let(self):
+        if self.listener != None:
+            self.__trace(ET.KEYWD)
+        self.__matchToken(TT.KEYWD, "let")
+
+        if ((self.token.keyword != None) and (self.token.keyword.value in range(301, 320))):
+            self.__matchToken(TT.KEYWD)
+            ident = self.token.val
+            self.__matchToken(TT.IDENT)
+            self.__matchToken(TT.EQ)
+            result = self.__expr()
+            if result == None:
+                return
+            else:
+                self.symTable[ident] = result
+                self.__writes[ident] = result
+        else:
+            self.__error(
+                err.syntaxErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size,
+                f"Expected identifier type (KEYWD), got {self.token.val} ({self.token.typ.name}) at line {self.lexer.line} pos {self.lexer.printPos-self.token.size}."
+            )
+            if self.__checkToken(TT.IDENT):
+                self.__readToken()
+                if self.__checkToken(TT.EQ):
+                    self.__readToken()
+                    result = self.__expr()
+                    if result == None:
+                        self.__error(err.exprErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size)
+                else:
+                    self.__error(err.syntaxErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size,
+                                 f"Expected '=' (EQ), got {self.token.val} ({self.token.typ.name}) on line {self.lexer.line} pos {self.lexer.printPos-self.token.size}.")
+            else:
+                self.__error(err.syntaxErr, self.token, self.lexer.line, self.lexer.printPos,
+                             f"Expected IDENT, got {self.token.val} ({self.token.typ.name}) on line {self.lexer.line} pos {self.lexer.printPos-self.token.size}.")
+    
+    def __fun(self):
+        if self.listener != None:
+            self.__trace(ET.KEYWD)
+        self.__matchToken(TT.KEYWD, "fun")
+        funcName = self.token.val
+        self.__matchToken(TT.IDENT)
+        self.__matchToken(TT.LPAREN)
+        parameters:ty.Dict[str, str]|str = self.__parameters(funcName)
+        self.__matchToken(TT.RPAREN)
+
+        if parameters != "inv":
+            self.funcTable[funcName] = parameters
+            self.__funcs[funcName] = parameters
+
+        self.__matchToken(TT.LFLOBRAC)
+        while not self.__checkToken(TT.RFLOBRAC) and not self.__checkToken(TT.EOF):
+            self.__statement()
+        
+        self.__matchToken(TT.RFLOBRAC)
+    
+    def __comp(self):
+        if self.listener != None:
+            self.__trace(ET.COMPARISON)
+        lparen:bool = False
+
+        if self.__checkToken(TT.LPAREN):
+            lparen = True
+            self.__readToken()
+        
+        result:int|float|None = self.__expr()
+        invalid:bool = False
+
+        if result == None:
+            invalid = True
+
+        if self.isComparisonOp(self.token):
+            comp = self.token.val
+            self.__readToken()
+            result2:int|float|None = self.__expr()
+
+            if lparen:
+                self.__matchToken(TT.RPAREN)
+
+            if result2 == None:
+                return
+            if not invalid:
+                return ops[comp](result, result2)
+            return
+        
+        else:
+            self.__error(
+                err.syntaxErr, self.token, self.lexer.line, self.lexer.printPos,
+                msg=f"Expected comparison operator at line {self.lexer.line} pos {self.lexer.printPos-self.token.size}."
+            )
+
+    def __expr(self):
+        "Value of the expression at the current token (see __operation()); None for an invalid expression."
+        return self.__operation(False)
+    
+    def __operation(self, build:bool) -> ty.Any:
+        """
+        Parses an expression by precedence climbing over two explicit stacks, so however deeply it nests it takes
+        no recursion: operands (values, or with build their nodes) and the operators waiting for their right
+        operand, as (precedence, right-associative, token) with PAREN for an open parenthesis. An operand that
+        is invalid is None, and so is every operation on it.
+        """
+        operands:ty.List[ty.Any] = []
+        operators:ty.List[ty.Tuple[int, bool, tok.Token]] = []
+        parens:int = 0 # open parentheses on operators
+        if self.listener != None:
+            self.__trace(ET.EXPRESSION)
+        
+        while True:
+            # Operand: any opening parentheses and signs, then a number or name
+            while True:
+                token:tok.Token = self.token
+                if token.typ == TT.LPAREN:
+                    operators.append((PAREN, False, token))
+                    parens += 1
+                    self.__readToken()
+                    if self.listener != None:
+                        self.__trace(ET.EXPRESSION)
+                elif token.typ == TT.MINUS or token.typ == TT.PLUS:
+                    operators.append((UNARY_PRECEDENCE, True, token))
+                    self.__readToken()
+                else:
+                    break
+            
+            if token.typ == TT.INT or token.typ == TT.FLOAT:
+                value:ty.Any = int(token.val.val) if token.typ == TT.INT else float(token.val.val)
+                operands.append(at.NumNode(value, token.typ, token) if build else value)
+                self.__readToken()
+            elif token.typ == TT.IDENT and build:
+                operands.append(at.IdentNode(token.val, TT.IDENT, token))
+                self.__readToken()
+            elif token.typ == TT.IDENT:
+                self.__reads.add(token.val)
+                if (result:=self.symTable.get(token.val)) is not None:
+                    operands.append(result)
+                    self.__readToken()
+                else:
+                    operands.append(None)
+                    self.__error(err.unknownIdent, token, self.lexer.line, self.lexer.printPos-token.size)
+            else:
+                operands.append(None)
+            
+            # Operator: close the parentheses before it, then reduce what binds tighter than it
+            while True:
+                token = self.token
+                operator_:ty.Tuple[int, bool]|None = BINARY_OPS.get(token.typ)
+                if operator_ != None:
+                    precedence, rightAssoc = operator_
+                    while operators and operators[-1][0] != PAREN and (precedence < operators[-1][0] or precedence == operators[-1][0] and not rightAssoc):
+                        self.__reduce(operands, operators.pop(), build)
+                    operators.append((precedence, rightAssoc, token))
+                    self.__readToken()
+                    if precedence == COMPARISON and self.listener != None:
+                        self.__trace(ET.EXPRESSION)
+                    break
+                
+                while operators and operators[-1][0] != PAREN:
+                    self.__reduce(operands, operators.pop(), build)
+                if not parens:
+                    return operands[0]
+                operators.pop()
+                parens -= 1
+                self.__matchToken(TT.RPAREN)
+    
+    def __reduce(self, operands:ty.List[ty.Any], operator_:ty.Tuple[int, bool, tok.Token], build:bool) -> None:
+        "Applies operator_ to the operands on top of operands, or with build makes its node."
+        precedence, _, token = operator_
+        if precedence == UNARY_PRECEDENCE:
+            if operands[-1] != None:
+                operands[-1] = at.UnaryOpNode(token.val, operands[-1], token) if build else UNARY_OPS[token.val](operands[-1])
+            return
+        
+        right:ty.Any = operands.pop()
+        left:ty.Any = operands[-1]
+        if left == None or right == None:
+            operands[-1] = None
+        elif build:
+            operands[-1] = at.BinOpNode(left, token.val, right, token=token)
+        else:
+            try:
+                operands[-1] = ops[token.val](left, right)
+            except (ArithmeticError, TypeError) as e:
+                operands[-1] = None
+                self.__error(err.illegalOp, token.val, token.line, token.printPos - token.size + 1,
+                             f"Cannot evaluate \"{token.val}\" ({e}) at line {token.line} pos {token.printPos - token.size + 1}.",
+                             readToken=False)
+    
+
+    def __iter(self):
+        arr:ty.Any = []
+        if self.token.typ == TT.LSQBRAC:
+            self.__matchToken(TT.LSQBRAC)
+
+
+    def __parameters(self, function:str) -> ty.Dict[str, str]|str:
+        if self.listener != None:
+            self.__trace(ET.PARAMETERS)
+        paras:ty.Dict[str, str] = {}
+        
+        while (self.token.typ == TT.KEYWD and self.token.keyword.value in range(301, 340)):
+            typ:TT = self.token.keyword
+            self.__matchToken(TT.KEYWD)
+            ident:str = self.token.val
+            self.__matchToken(TT.IDENT)
+            paras[ident] = typ.name
+            
+            if self.__checkToken(TT.COMMA):
+                self.__readToken()
+        
+        if not self.__checkToken(TT.RPAREN):
+            self.__error(err.invalidParametersErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size, function)
+            return "inv"
+        
+        return paras
+
+    def __blockNode(self, end:TT) -> at.StatementNode|None:
+        "Statements up to a token of type end (or EOF), chained. Statements reporting errors are left out."
+        first:at.StatementNode|None = None
+        last:at.StatementNode|None = None
+        while not self.__checkToken(end) and not self.__checkToken(TT.EOF):
+            errors:int = self.errors
+            token:tok.Token = self.token
+            node:at.ASTNode|None = self.__statementNode()
+            if node == None or self.errors != errors:
+                continue
+            
+            link:at.StatementNode = at.StatementNode(node, token=token)
+            if last == None:
+                first = link
+            else:
+                last.nextStatement = link
+            last = link
+        
+        return first
+    
+    def __statementNode(self) -> at.ASTNode|None:
+        node:at.ASTNode|None = None
+        if (self.__checkToken(TT.KEYWD, "print")):
+            node = self.__printNode()
+        
+        elif (self.__checkToken(TT.KEYWD, "if")):
+            node = self.__ifNode()
+        
+        elif (self.__checkToken(TT.KEYWD, "while")):
+            node = self.__whileNode()
+        
+        elif (self.__checkToken(TT.KEYWD, "for")):
+            self.__for()
+        
+        elif (self.__checkToken(TT.KEYWD, "let")):
+            node = self.__letNode()
+        
+        elif (self.__checkToken(TT.KEYWD, "fun")):
+            node = self.__funNode()
+        
+        else:
+            self.__error(err.syntaxErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size,
+                         f"Unexpected token \"{self.token.val}\" (type {self.token.typ.name}) on line {self.lexer.line} pos {self.lexer.printPos-self.token.size}.")
+            while (not self.__checkToken(TT.SEMICLN)):
+                if self.__checkToken(TT.EOF):
+                    break
+                self.__readToken()
+        
+        self.__matchToken(TT.SEMICLN)
+        while self.token.typ == TT.SEMICLN:
+            self.__matchToken(TT.SEMICLN)
+        return node
+    
+    def __printNode(self) -> at.PrintNode|None:
+        token:tok.Token = self.token
+        if self.listener != None:
+            self.__trace(ET.KEYWD)
+        self.__matchToken(TT.KEYWD, "print")
+        
+        # String or expression
+        if self.__checkToken(TT.STRING):
+            if self.listener != None:
+                self.__trace(ET.STRING)
+            val:at.ASTNode|None = at.StrNode(self.token.val.val, self.token)
+            self.__matchToken(TT.STRING)
+        
+        else:
+            val = self.__exprNode()
+            if val == None:
+                self.__error(err.exprErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size, readToken=False)
+                return None
+        
+        return at.PrintNode(val, token)
+    
+    def __conditionNode(self) -> at.ASTNode|None:
+        "( expression ) of if, elif and while."
+        self.__matchToken(TT.LPAREN)
+        condition:at.ASTNode|None = self.__exprNode()
+        if condition == None:
+            self.__error(err.conditionErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size, readToken=False)
+        self.__matchToken(TT.RPAREN)
+        return condition
+    
+    def __bodyNode(self) -> at.StatementNode|None:
+        "{ statements } of a block."
+        self.__matchToken(TT.LFLOBRAC)
+        body:at.StatementNode|None = self.__blockNode(TT.RFLOBRAC)
+        self.__matchToken(TT.RFLOBRAC)
+        return body
+    
+    def __ifNode(self) -> at.IfNode|None:
+        branches:ty.List[ty.Tuple[tok.Token, at.ASTNode|None, at.StatementNode|None]] = []
+        while self.__checkToken(TT.KEYWD, "elif" if branches else "if"):
+            token:tok.Token = self.token
+            if self.listener != None:
+                self.__trace(ET.KEYWD)
+            self.__readToken()
+            condition:at.ASTNode|None = self.__conditionNode()
+            branches.append((token, condition, self.__bodyNode()))
+        
+        elseBranch:at.StatementNode|None = None
+        if self.__checkToken(TT.KEYWD, "else"):
+            if self.listener != None:
+                self.__trace(ET.KEYWD)
+            self.__matchToken(TT.KEYWD, "else")
+            elseBranch = self.__bodyNode()
+        
+        # Each elif is an if in the else branch of the one before it
+        for token, condition, thenBranch in reversed(branches):
+            if condition == None:
+                return None
+            node:at.IfNode = at.IfNode(condition, thenBranch, elseBranch, token)
+            elseBranch = at.StatementNode(node, token=token)
+        return node
+    
+    def __whileNode(self) -> at.WhileNode|None:
+        token:tok.Token = self.token
+        if self.listener != None:
+            self.__trace(ET.KEYWD)
+        self.__matchToken(TT.KEYWD, "while")
+        condition:at.ASTNode|None = self.__conditionNode()
+        body:at.StatementNode|None = self.__bodyNode()
+        return at.WhileNode(condition, body, token) if condition != None else None
+    
+    def __letNode(self) -> at.LetNode|None:
+        token:tok.Token = self.token
+        if self.listener != None:
+            self.__trace(ET.KEYWD)
+        self.__matchToken(TT.KEYWD, "let")
+        
+        if ((self.token.keyword != None) and (self.token.keyword.value in range(301, 320))):
+            typ:TT = self.token.keyword
+            self.__matchToken(TT.KEYWD)
+            ident:at.IdentNode = at.IdentNode(self.token.val, typ, self.token)
+            self.__matchToken(TT.IDENT)
+            self.__matchToken(TT.EQ)
+            val:at.ASTNode|None = self.__exprNode()
+            if val == None:
+                self.__error(err.exprErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size, readToken=False)
+                return None
+            return at.LetNode(ident, val, typ, token)
+        
+        self.__error(
+            err.syntaxErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size,
+            f"Expected identifier type (KEYWD), got {self.token.val} ({self.token.typ.name}) at line {self.lexer.line} pos {self.lexer.printPos-self.token.size}."
+        )
+        if self.__checkToken(TT.IDENT):
+            self.__readToken()
+            if self.__checkToken(TT.EQ):
+                self.__readToken()
+                if self.__exprNode() == None:
+                    self.__error(err.exprErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size)
+            else:
+                self.__error(err.syntaxErr, self.token, self.lexer.line, self.lexer.printPos-self.token.size,
+                             f"Expected '=' (EQ), got {self.token.val} ({self.token.typ.name}) on line {self.lexer.line} pos {self.lexer.printPos-self.token.size}.")
+        else:
+            self.__error(err.syntaxErr, self.token, self.lexer.line, self.lexer.printPos,
+                         f"Expected IDENT, got {self.token.val} ({self.token.typ.name}) on line {self.lexer.line} pos {self.lexer.printPos-self.token.size}.")
+        return None
+    
+    def __funNode(self) -> at.FunNode|None:
+        token:tok.Token = self.token
+        if self.listener != None:
+            self.__trace(ET.KEYWD)
+        self.__matchToken(TT.KEYWD, "fun")
+        funcName = self.token.val
+        self.__matchToken(TT.IDENT)
+        self.__matchToken(TT.LPAREN)
+        parameters:ty.Dict[str, str]|str = self.__parameters(funcName)
+        self.__matchToken(TT.RPAREN)
+        body:at.StatementNode|None = self.__bodyNode()
+        return at.FunNode(funcName, parameters, body, token) if parameters != "inv" else None
+    
+    def __exprNode(self) -> at.ASTNode|None:
+        "Like __expr(), but builds the expression's tree; None for an invalid expression."
+        return self.__operation(True)
+    
+
+    def isComparisonOp(self, token:tok.Token):
+        return token.typ in (TT.LT, TT.LTEQ, TT.GT, TT.GTEQ, TT.EQEQ, TT.NOTEQ)
@@ -0,0 +1,184 @@
+import typing as ty
+
+import asTree as at
+import diagnostics as dm
+import err
+import tok
+
+
+class Frame:
+    """
+    The slots of the program or of a function body: its names by slot and their slots, the names let (or given as
+    parameters) so far and, for a function, every name it lets and the program's frame around it.
+    """
+    __slots__ = ("name", "names", "slots", "declared", "pending", "lets", "parent")
+    
+    def __init__(self, name:str, parameters:ty.Iterable[str]=(), lets:ty.Set[str]|None=None, parent:"Frame|None"=None) -> None:
+        self.name:str = name
+        self.names:ty.List[str] = list(parameters)
+        self.slots:ty.Dict[str, int] = {name: slot for slot, name in enumerate(self.names)}
+        self.declared:ty.Set[str] = set(self.names)
+        self.pending:ty.Set[str] = set() # let further down a while body the resolver is in
+        self.lets:ty.Set[str] = lets if lets != None else set()
+        self.parent:Frame|None = parent
+    
+    def slot(self, name:str) -> int:
+        if name not in self.slots:
+            self.slots[name] = len(self.names)
+            self.names.append(name)
+        return self.slots[name]
+
+
+class Scope:
+    "A block of a frame (or the frame's own statements) and the names surely let by the time the resolver is at."
+    __slots__ = ("frame", "parent", "assigned")
+    
+    def __init__(self, frame:Frame, parent:"Scope|None"=None) -> None:
+        self.frame:Frame = frame
+        self.parent:Scope|None = parent
+        self.assigned:ty.Set[str] = set(frame.declared) if parent == None else set()
+    
+    def assigns(self, name:str) -> bool:
+        scope:Scope|None = self
+        while scope != None:
+            if name in scope.assigned:
+                return True
+            scope = scope.parent
+        return False
+
+
+class Resolver:
+    """
+    Resolves the names of a syntax tree from Parser.parseTree() to slots before an engine runs it. Every frame,
+    the program or a function body, has a list of slots; a name's IdentNode gets (depth, slot), depth 0 for the
+    frame it is in and 1 for the program's frame read from a function body. A function's parameters take its first
+    slots and it reads the program's names it does not let itself. The names of a frame by slot go to the names of
+    its ProgramNode or FunNode, so an engine knows how many slots to make.
+    
+    Blocks (if and while bodies) are scopes chained inside their frame. A let in a block writes the frame's slot of
+    the name as it always did, so the name can be read after the block; but a read is only unchecked (checked False)
+    where every path to it lets the name first. Anywhere else the block may not have run, and the engine checks
+    the slot.
+    
+    Reads of a name let nowhere before them are reported as err.unknownIdent, and so are reads in a function of a
+    name of the program that the function shadows with a let further down.
+    """
+    def __init__(self, diagnostics:dm.Diagnostics|None=None) -> None:
+        self.diagnostics:dm.Diagnostics = diagnostics if diagnostics != None else dm.Diagnostics()
+        self.errors:int = 0
+    
+    def resolve(self, program:at.ProgramNode) -> at.ProgramNode:
+        frame:Frame = Frame("<program>")
+        functions:ty.List[at.FunNode] = []
+        self.__block(program.body, Scope(frame), functions)
+        program.names = frame.names
+        
+        # Function bodies last, as they run once the whole program has
+        for function in functions:
+            functionFrame:Frame = Frame(function.name, function.parameters, lets(function.body), frame)
+            self.__block(function.body, Scope(functionFrame), functions)
+            function.names = functionFrame.names
+        return program
+    
+    def __block(self, block:at.StatementNode|None, scope:Scope, functions:ty.List[at.FunNode]) -> None:
+        for statement in at.statements(block):
+            self.__statement(statement, scope, functions)
+    
+    def __statement(self, node:at.ASTNode, scope:Scope, functions:ty.List[at.FunNode]) -> None:
+        frame:Frame = scope.frame
+        if isinstance(node, at.LetNode):
+            self.__expr(node.val, scope)
+            name:str = node.ident.name
+            node.ident.depth, node.ident.slot, node.ident.checked = 0, frame.slot(name), False
+            frame.declared.add(name)
+            scope.assigned.add(name)
+        
+        elif isinstance(node, at.PrintNode):
+            if not isinstance(node.val, at.StrNode):
+                self.__expr(node.val, scope)
+        
+        elif isinstance(node, at.IfNode):
+            self.__expr(node.condition, scope)
+            thenScope:Scope = Scope(frame, scope)
+            self.__block(node.thenBranch, thenScope, functions)
+            if node.elseBranch != None:
+                elseScope:Scope = Scope(frame, scope)
+                self.__block(node.elseBranch, elseScope, functions)
+                # Let on both ways
+                scope.assigned |= thenScope.assigned & elseScope.assigned
+        
+        elif isinstance(node, at.WhileNode):
+            # The body's lets are read before them from the second iteration on
+            pending:ty.Set[str] = lets(node.thenBranch) - frame.declared - frame.pending
+            for name in sorted(pending):
+                frame.slot(name)
+            frame.pending |= pending
+            self.__expr(node.condition, scope)
+            self.__block(node.thenBranch, Scope(frame, scope), functions)
+            frame.pending -= pending
+        
+        elif isinstance(node, at.FunNode):
+            functions.append(node)
+    
+    def __expr(self, node:at.ASTNode, scope:Scope) -> None:
+        # Explicit stack: operator chains can be as long as a line
+        stack:ty.List[at.ASTNode] = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, at.IdentNode):
+                self.__read(node, scope)
+            elif isinstance(node, at.BinOpNode):
+                stack.extend((node.right, node.left))
+            elif isinstance(node, at.UnaryOpNode):
+                stack.append(node.operand)
+    
+    def __read(self, node:at.IdentNode, scope:Scope) -> None:
+        frame:Frame = scope.frame
+        program:Frame|None = frame.parent
+        name:str = node.name
+        token:tok.Token = node.token
+        if name in frame.declared:
+            node.depth, node.slot, node.checked = 0, frame.slots[name], not scope.assigns(name)
+            return
+        
+        if program != None and name in program.declared and name not in frame.lets:
+            node.depth, node.slot, node.checked = 1, program.slots[name], True
+            return
+        
+        node.depth, node.slot, node.checked = 0, frame.slot(name), True
+        pos:int = token.printPos - token.size + 1
+        if program != None and name in program.declared:
+            self.__error(
+                err.unknownIdent, token, token.line, pos,
+                f"Identifier \"{name}\" is read before the let that shadows it in function \"{frame.name}\" at line {token.line} pos {pos}.",
+                offset=token.pos - token.size + 1
+            )
+        elif name not in frame.pending:
+            self.__error(err.unknownIdent, token, token.line, pos, offset=token.pos - token.size + 1)
+    
+    def __error(self, errType:ty.Type[err.Error], *args:ty.Any, **kwargs:ty.Any) -> None:
+        "Displays errors."
+        self.errors += 1
+        self.diagnostics.add(errType, *args, **kwargs)
+
+
+def lets(block:at.StatementNode|None) -> ty.Set[str]:
+    "Names let anywhere in block, outside function bodies."
+    names:ty.Set[str] = set()
+    stack:ty.List[at.StatementNode|None] = [block]
+    while stack:
+        for node in at.statements(stack.pop()):
+            if isinstance(node, at.LetNode):
+                names.add(node.ident.name)
+            elif isinstance(node, at.IfNode):
+                stack.extend((node.thenBranch, node.elseBranch))
+            elif isinstance(node, at.WhileNode):
+                stack.append(node.thenBranch)
+    return names
+
+
+def resolved(program:at.ProgramNode) -> at.ProgramNode:
+    "program, resolved if it is not yet (like a tree loaded from a .vic cache), without reporting anything."
+    if program.names == None:
+        Resolver(dm.Diagnostics(write=False)).resolve(program)
+    return program
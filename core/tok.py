@@ -1,116 +1,378 @@
-import enum
-import typing as ty
-
-
-class TokenTypes(enum.Enum):
-    """
-    Class containing all token types with values to identify them.
-    """
-    # Basic
-    INVALID = -1
-    EOF = 0
-    INIT = 1
-    ATTR = 2
-    PROGDECL = 3
-    PLACEHOLDER = 4
-
-    # Arithmetic operators
-    PLUS = 101
-    MINUS = 102
-    ASTERISK = 103
-    FSLASH = 104
-    CARET = 105
-
-    # Assignment and comparison operators
-    EQ = 201
-    EQEQ = 202
-    NOTEQ = 203
-    LT = 204
-    LTEQ = 205
-    GT = 206
-    GTEQ = 207
-
-    # Keywords (data types)
-    INT = 301
-    FLOAT = 302
-    STRING = 303
-    BOOL = 304
-    IDENT = 305
-    KEYWD = 340
-    # Keywords (others)
-    LET = 341
-    IF = 342
-    ELIF = 343
-    ELSE = 344
-    WHILE = 345
-    FOR = 346
-    FUN = 347
-    RETURN = 348
-    PRINT = 349
-    SCAN = 350
-    RAISE = 351
-
-    # Other symbols
-    LPAREN = 401
-    RPAREN = 402
-    LFLOBRAC = 403
-    RFLOBRAC = 404
-    LSQBRAC = 405
-    RSQBRAC = 406
-    SEMICLN = 407
-    COLON = 408
-    COMMA = 409
-
-    # Program declarations
-    STATIC = 501
-    DYNAMIC = 502
-
-
-class TokenLiterals(enum.Enum):
-    """
-    Class containing all token literals with values to identify them.
-    """
-    # Basic
-    EOF = '\0'
-    
-    # Arithmetic operators
-    PLUS = '+'
-    MINUS = '-'
-    ASTERISK = '*'
-    FSLASH = '/'
-    CARET = '^'
-
-    # Assignment and comparison operators
-    EQ = '='
-    EQEQ = '=='
-    NOTEQ = '!='
-    LT = '<'
-    LTEQ = '<='
-    GT = '>'
-    GTEQ = '>='
-
-    # Other symbols
-    LPAREN = '('
-    RPAREN = ')'
-    LFLOBRAC = '{'
-    RFLOBRAC = '}'
-    LSQBRAC = '['
-    RSQBRAC = ']'
-    SEMICLN = ';'
-
-
-class Token:
-    def __init__(self, typ:TokenTypes, val:str, line:int, pos:int, printPos:int|tuple, size:int) -> None:
-        self.typ:TokenTypes = typ
-        self.val:str = val
-        self.line:int = line
-        self.pos:int = pos
-        self.printPos:int|ty.Tuple[int] = printPos
-        self.size:int = size
-    
-    def __repr__(self) -> str:
-        return f"Token[Typ({self.typ.name}): Val({self.val}): Line({self.line}): Pos({self.pos}): PrintPos({self.printPos}): Size({self.size})]"
-    
-    def __str__(self) -> str:
-        val = '\'' + self.val + '\''
-        return f"Type={self.typ.name:<8} : Value={val:<10} : Line={self.line:<2} : PrintPos={self.printPos} : Size={self.size}"
+import array
+import bisect
+import enum
+import re
+import sys
+import types
+import typing as ty
+
+import basicTypes as bt
+
+
+class TokenTypes(enum.Enum):
+    """
+    Class containing all token types with values to identify them.
+    """
+    # Basic
+    INVALID = -1
+    EOF = 0
+    INIT = 1
+    ATTR = 2
+    PROGDECL = 3
+    PLACEHOLDER = 4
+
+    # Arithmetic operators
+    PLUS = 101
+    MINUS = 102
+    ASTERISK = 103
+    FSLASH = 104
+    CARET = 105
+
+    # Assignment and comparison operators
+    EQ = 201
+    EQEQ = 202
+    NOTEQ = 203
+    LT = 204
+    LTEQ = 205
+    GT = 206
+    GTEQ = 207
+
+    # Keywords (data types)
+    INT = 301
+    FLOAT = 302
+    STRING = 303
+    BOOL = 304
+    IDENT = 305
+    KEYWD = 340
+    # Keywords (others)
+    LET = 341
+    IF = 342
+    ELIF = 343
+    ELSE = 344
+    WHILE = 345
+    FOR = 346
+    FUN = 347
+    RETURN = 348
+    PRINT = 349
+    SCAN = 350
+    RAISE = 351
+
+    # Other symbols
+    LPAREN = 401
+    RPAREN = 402
+    LFLOBRAC = 403
+    RFLOBRAC = 404
+    LSQBRAC = 405
+    RSQBRAC = 406
+    SEMICLN = 407
+    COLON = 408
+    COMMA = 409
+
+    # Program declarations
+    STATIC = 501
+    DYNAMIC = 502
+
+
+class TokenLiterals(enum.Enum):
+    """
+    Class containing all token literals with values to identify them.
+    """
+    # Basic
+    EOF = '\0'
+    
+    # Arithmetic operators
+    PLUS = '+'
+    MINUS = '-'
+    ASTERISK = '*'
+    FSLASH = '/'
+    CARET = '^'
+
+    # Assignment and comparison operators
+    EQ = '='
+    EQEQ = '=='
+    NOTEQ = '!='
+    LT = '<'
+    LTEQ = '<='
+    GT = '>'
+    GTEQ = '>='
+
+    # Other symbols
+    LPAREN = '('
+    RPAREN = ')'
+    LFLOBRAC = '{'
+    RFLOBRAC = '}'
+    LSQBRAC = '['
+    RSQBRAC = ']'
+    SEMICLN = ';'
+    COLON = ':'
+    COMMA = ','
+    ATTR = '.'
+    PROGDECL = '~'
+
+
+TAB_EXTRA:int = len('\t'.expandtabs()) - 1
+NEWLINE_RE_BYTES:re.Pattern = re.compile(rb"\n|[\x80-\xbf]+")
+
+
+class LineIndex:
+    """
+    Offsets at which the lines of a source start, built on first use.
+    Resolves a character offset into its line and print position (tabs expanded) by bisection,
+    so the lexer does not have to keep track of either while scanning.
+
+    After edit(), the starts behind the edit are stored relative to the end of the source
+    (start - len(src), always negative), so that the next edit does not have to move them.
+    """
+    def __init__(self, src:str|ty.Any) -> None:
+        self.src:str|ty.Any = src
+        self.starts:array.array|None = None
+        self.byteStarts:array.array|None = None
+    
+    def __build(self) -> None:
+        starts:array.array = array.array('i', [0])
+        if isinstance(self.src, str):
+            pos:int = self.src.find('\n')
+            while pos != -1:
+                starts.append(pos + 1)
+                pos = self.src.find('\n', pos + 1)
+        
+        else:
+            # UTF-8 buffer: count continuation bytes to turn byte offsets into character offsets
+            byteStarts:array.array = array.array('i', [0])
+            continuations:int = 0
+            for match in NEWLINE_RE_BYTES.finditer(self.src):
+                if match.end() - match.start() == 1 and self.src[match.start()] == 0x0a:
+                    byteStarts.append(match.end())
+                    starts.append(match.end() - continuations)
+                else:
+                    continuations += match.end() - match.start()
+            self.byteStarts = byteStarts
+        
+        self.starts = starts
+    
+    def absolute(self, start:int) -> int:
+        "Offset of a stored line start."
+        return start if start >= 0 else start + len(self.src)
+    
+    def edit(self, src:str, offset:int, removed:int, inserted:str) -> "LineIndex":
+        """
+        Line index of src, the str source after replacing removed characters at offset by inserted.
+        Reuses the line starts of this index when it has been built already; only the starts between
+        this edit and the previous one are converted.
+        """
+        index:LineIndex = LineIndex(src)
+        if self.starts == None or self.byteStarts != None:
+            return index
+        
+        keep:array.array = self.starts[:bisect.bisect_right(self.starts, offset, key=self.absolute)]
+        pos:int = len(keep) - 1
+        while pos >= 0 and keep[pos] < 0:
+            keep[pos] += len(self.src)
+            pos -= 1
+        
+        moved:array.array = self.starts[bisect.bisect_right(self.starts, offset + removed, key=self.absolute):]
+        pos = 0
+        while pos < len(moved) and moved[pos] >= 0:
+            moved[pos] += len(inserted) - removed - len(src)
+            pos += 1
+        
+        pos = inserted.find('\n')
+        while pos != -1:
+            keep.append(offset + pos + 1)
+            pos = inserted.find('\n', pos + 1)
+        index.starts = keep + moved
+        return index
+    
+    def line(self, offset:int) -> int:
+        if self.starts is None:
+            self.__build()
+        if not self.starts or self.starts[-1] >= 0:
+            return bisect.bisect_right(self.starts, offset)
+        return bisect.bisect_right(self.starts, offset, key=self.absolute)
+    
+    def printPos(self, offset:int) -> int:
+        line:int = self.line(offset)
+        if line == 0:
+            return 0
+        
+        start:int = self.absolute(self.starts[line-1])
+        if self.byteStarts is None:
+            tabs:int = self.src.count('\t', start, offset)
+        else:
+            byteStart:int = self.byteStarts[line-1]
+            tabs = str(self.src[byteStart:byteStart + 4*(offset-start)], "utf-8", "replace")[:offset-start].count('\t')
+        return offset - start + 1 + TAB_EXTRA * tabs
+
+
+class Token:
+    """
+    A token only knows its offset (pos, the offset of its last character).
+    line and printPos are resolved through the line index of its source when asked for.
+    A KEYWD token also has the token type its spelling stands for as keyword (see KEYWORDS), other tokens None.
+    """
+    __slots__ = ("typ", "val", "pos", "size", "lineIndex", "keyword")
+
+    def __init__(self, typ:TokenTypes, val:str, pos:int, size:int, lineIndex:LineIndex|None=None, keyword:TokenTypes|None=None) -> None:
+        self.typ:TokenTypes = typ
+        self.val:str = val
+        self.pos:int = pos
+        self.size:int = size
+        self.lineIndex:LineIndex|None = lineIndex
+        self.keyword:TokenTypes|None = keyword
+    
+    @property
+    def line(self) -> int:
+        return self.lineIndex.line(self.pos) if self.lineIndex != None else -1
+    
+    @property
+    def printPos(self) -> int:
+        return self.lineIndex.printPos(self.pos) if self.lineIndex != None else -1
+    
+    def __repr__(self) -> str:
+        return f"Token[Typ({self.typ.name}): Val({self.val}): Line({self.line}): Pos({self.pos}): PrintPos({self.printPos}): Size({self.size})]"
+    
+    def __str__(self) -> str:
+        val = '\'' + self.val + '\''
+        return f"Type={self.typ.name:<8} : Value={val:<10} : Line={self.line:<2} : PrintPos={self.printPos} : Size={self.size}"
+
+
+TYPES:ty.Dict[int, TokenTypes] = {typ.value: typ for typ in TokenTypes}
+LITERALS:ty.Dict[TokenTypes, str] = {TokenTypes[literal.name]: literal.value for literal in TokenLiterals}
+# Token types of the keywords by spelling: the names of the types 301 to 400 in lower case
+KEYWORDS:ty.Mapping[str, TokenTypes] = types.MappingProxyType({typ.name.lower(): typ for typ in TokenTypes if 301 <= typ.value <= 400})
+
+
+def keyword(ident:str) -> TokenTypes|None:
+    "Token type of the keyword spelled ident, in any case (let, LET, Let); None if ident is not a keyword."
+    typ:TokenTypes|None = KEYWORDS.get(ident)
+    if typ == None and not ident.islower():
+        typ = KEYWORDS.get(ident.lower())
+    return typ
+
+
+def tokenValue(src:str, typ:TokenTypes, start:int, end:int) -> ty.Any:
+    "Decode the value of the token of type typ spanning src[start:end+1]."
+    if typ == TokenTypes.INT:
+        return bt.VInt(int(src[start:end+1]))
+    elif typ == TokenTypes.FLOAT:
+        return bt.VFloat(float(src[start:end+1]))
+    elif typ == TokenTypes.STRING:
+        return bt.VString(src[start+1:end])
+    elif typ in (TokenTypes.IDENT, TokenTypes.KEYWD):
+        # Interned, so every occurrence of a name shares one string and compares by identity in dict lookups
+        return sys.intern(src[start:end+1])
+    elif typ == TokenTypes.INVALID:
+        # Unterminated strings keep their content without the opening quote
+        return src[start+1:end+1] if src[start] in ('\'', '\"') else src[start:end+1]
+    return LITERALS[typ]
+
+
+class TokenStream:
+    """
+    Column-wise (struct-of-arrays) storage of tokens, built by Lexer.tokenizeAll().
+    typs holds TokenTypes values, starts and ends the offsets of the first and last character of each token.
+    Values are decoded from src, and lines and print positions resolved through lineIndex, only when asked for.
+
+    src is either a str (with the lexer's '\\0' sentinel) or a buffer of UTF-8 bytes. For buffers, shiftAt and shifts
+    list the character offsets from which byte offsets are ahead by the given amount; they stay empty for ASCII.
+    length is the number of characters in the source, lineIndex the line index shared with the lexer
+    and origin the offset lexing started at (after the program declaration header).
+
+    After Lexer.relex(), starts and ends behind the edit are stored relative to the end of the source
+    (offset - length - 1, always negative) so that the next edit does not have to move them.
+    Read offsets through start() and end().
+    """
+    def __init__(self, src:str|ty.Any, programTyping:int|None, length:int, lineIndex:LineIndex, origin:int=0) -> None:
+        self.src:str|ty.Any = src
+        self.programTyping:int|None = programTyping
+        self.length:int = length
+        self.lineIndex:LineIndex = lineIndex
+        self.origin:int = origin
+        self.typs:array.array = array.array('h')
+        self.starts:array.array = array.array('i')
+        self.ends:array.array = array.array('i')
+        self.shiftAt:array.array = array.array('i')
+        self.shifts:array.array = array.array('i')
+    
+    def __len__(self) -> int:
+        return len(self.typs)
+    
+    def __repr__(self) -> str:
+        return f"TokenStream[Tokens({len(self)}): Typing({self.programTyping})]"
+    
+    def typ(self, index:int) -> TokenTypes:
+        return TYPES[self.typs[index]]
+    
+    def absolute(self, offset:int) -> int:
+        "Offset of a stored start or end."
+        return offset if offset >= 0 else offset + self.length + 1
+    
+    def start(self, index:int) -> int:
+        "Offset of the first character of the token at index."
+        offset:int = self.starts[index]
+        return offset if offset >= 0 else offset + self.length + 1
+    
+    def end(self, index:int) -> int:
+        "Offset of the last character of the token at index."
+        offset:int = self.ends[index]
+        return offset if offset >= 0 else offset + self.length + 1
+    
+    def value(self, index:int) -> ty.Any:
+        typ:TokenTypes = TYPES[self.typs[index]]
+        if isinstance(self.src, str):
+            return tokenValue(self.src, typ, self.start(index), self.end(index))
+        elif typ in LITERALS:
+            return LITERALS[typ]
+        
+        text:str = str(self.src[self.byteOffset(self.start(index)):self.byteOffset(self.end(index) + 1)], "utf-8")
+        return tokenValue(text, typ, 0, len(text) - 1)
+    
+    def addShift(self, offset:int, shift:int) -> None:
+        "Byte offsets are ahead of character offsets by shift from offset onwards."
+        self.shiftAt.append(offset)
+        self.shifts.append(shift)
+    
+    def byteOffset(self, offset:int) -> int:
+        "Convert a character offset into the byte offset in a buffer source."
+        index:int = bisect.bisect_right(self.shiftAt, offset) - 1
+        return offset + self.shifts[index] if index >= 0 else offset
+    
+    def token(self, index:int) -> Token:
+        "Build the Token object for the token at index."
+        val:ty.Any = self.value(index)
+        typ:TokenTypes = TYPES[self.typs[index]]
+        size:int = len(val) if isinstance(val, str) else len(str(val.val))
+        return Token(typ, val, self.end(index), size, self.lineIndex, keyword(val) if typ == TokenTypes.KEYWD else None)
+    
+    def cursor(self) -> "TokenCursor":
+        return TokenCursor(self)
+
+
+class TokenCursor:
+    """
+    Reads a TokenStream one token at a time through the interface the Parser uses on a Lexer:
+    tokenize(), line, printPos and programTyping. Reading past the end keeps returning EOF.
+    """
+    def __init__(self, stream:TokenStream) -> None:
+        self.stream:TokenStream = stream
+        self.programTyping:int|None = stream.programTyping
+        self.index:int = -1
+        self.pos:int = 0
+    
+    @property
+    def line(self) -> int:
+        return self.stream.lineIndex.line(self.pos)
+    
+    @property
+    def printPos(self) -> int:
+        return self.stream.lineIndex.printPos(self.pos)
+    
+    def tokenize(self) -> Token:
+        stream:TokenStream = self.stream
+        if self.index < len(stream) - 1:
+            self.index += 1
+        
+        # Same position the lexer is at after the token: one past it, except at the EOF sentinel
+        end:int = stream.end(self.index)
+        self.pos = end + 1 if end < stream.length else end
+        return stream.token(self.index)
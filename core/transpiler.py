@@ -0,0 +1,294 @@
+import collections
+import hashlib
+import re
+import sys
+import types
+import typing as ty
+
+import asTree as at
+import diagnostics as dm
+import err
+import lex
+import parse
+
+# Python spelling of the operators, by precedence (higher binds tighter); comparisons never chain
+PY_OPS:ty.Dict[str, ty.Tuple[str, int]] = {
+    '==': ("==", 1), '!=': ("!=", 1), '<': ("<", 1), '<=': ("<=", 1), '>': (">", 1), '>=': (">=", 1),
+    '+': ("+", 2), '-': ("-", 2), '*': ("*", 3), '/': ("/", 3), '%': ("%", 3), '^': ("**", 5),
+}
+UNARY_PRECEDENCE:int = 4
+PY_TYPES:ty.Dict[str, str] = {"INT": "int", "FLOAT": "float", "STRING": "str", "BOOL": "bool"}
+LOCAL_NAME_RE:re.Pattern = re.compile(r"'v_(\w+)'")
+Origin = ty.Tuple[int, int, int] # line, pos and offset of a Viper token
+
+
+class Translation:
+    """
+    A program transpiled to Python: its source, the code object compiled from it and, per line of the source, the
+    origin of the Viper statement it comes from ((0, 0, -1) for generated lines) with the origins of the names read
+    on it and of its operations, each with the columns it spans on the line.
+    """
+    def __init__(self, source:str, lines:ty.List[Origin], names:ty.List[ty.Dict[str, Origin]],
+                 operations:ty.List[ty.List[ty.Tuple[int, int, Origin]]], filename:str) -> None:
+        self.source:str = source
+        self.lines:ty.List[Origin] = lines
+        self.names:ty.List[ty.Dict[str, Origin]] = names
+        self.operations:ty.List[ty.List[ty.Tuple[int, int, Origin]]] = operations
+        self.filename:str = filename
+        self.code:types.CodeType = compile(source, filename, "exec")
+    
+    def __repr__(self) -> str:
+        return f"Translation({self.filename}, {len(self.lines)} lines)"
+
+
+class Transpiler:
+    """
+    Runs programs through CPython: transpiles the tree from Parser.parseTree() to the source of a Python function
+    (Viper names become its locals, a fun a nested function with its parameter types as annotations), compiles and
+    executes it. Translations of error-free programs are cached by the hash of their Viper source, so running a
+    program again skips lexing, parsing and compiling.
+    
+    Slots work as in the other engines: a function's lets are its own, other names are read from the program.
+    print writes to out (stdout by default). A run-time error is reported to diagnostics like the parser's errors,
+    at the Viper operation or name the failing Python instruction comes from, and stops the program. A program whose expressions nest
+    too deeply for CPython to compile is reported at the statement with the deepest one, and does not run.
+    """
+    cache:ty.ClassVar[collections.OrderedDict[str, Translation]] = collections.OrderedDict()
+    cacheSize:ty.ClassVar[int] = 128
+    
+    def __init__(self, out:ty.TextIO|None=None, diagnostics:dm.Diagnostics|None=None) -> None:
+        self.out:ty.TextIO = out if out != None else sys.stdout
+        self.diagnostics:dm.Diagnostics = diagnostics if diagnostics != None else dm.Diagnostics()
+        self.functions:ty.Dict[str, ty.Callable[..., None]] = {}
+        self.errors:int = 0
+        self.translation:Translation|None = None
+        self.__lines:ty.List[str] = []
+        self.__origins:ty.List[Origin] = []
+        self.__names:ty.List[ty.Dict[str, Origin]] = []
+        self.__operations:ty.List[ty.List[ty.Tuple[int, int, Origin]]] = []
+        self.__depth:int = 0
+        self.__deepest:ty.Tuple[int, at.ASTNode|None] = (0, None)
+    
+    def translate(self, source:str) -> Translation|None:
+        "Translation of a Viper source, from the cache when it has been translated before; None if it has errors."
+        key:str = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        if key in Transpiler.cache:
+            Transpiler.cache.move_to_end(key)
+            return Transpiler.cache[key]
+        
+        parser:parse.Parser = parse.Parser(lex.Lexer(source, diagnostics=self.diagnostics))
+        program:at.ProgramNode = parser.parseTree()
+        if parser.errors:
+            return None
+        
+        translation:Translation|None = self.transpile(program, f"<viper {key[:12]}>")
+        if translation == None:
+            return None
+        Transpiler.cache[key] = translation
+        if len(Transpiler.cache) > Transpiler.cacheSize:
+            Transpiler.cache.popitem(last=False)
+        return translation
+    
+    def run(self, program:str|at.ProgramNode|Translation) -> bool:
+        "Run a program given as Viper source, tree or translation; False if it did not translate or stopped at an error."
+        if isinstance(program, str):
+            translation:Translation|None = self.translate(program)
+        elif isinstance(program, at.ProgramNode):
+            translation = self.transpile(program)
+        else:
+            translation = program
+        if translation == None:
+            return False
+        
+        self.translation = translation
+        namespace:ty.Dict[str, ty.Any] = {}
+        exec(translation.code, namespace)
+        return self.__call(namespace["_main"], self.out, self.functions)
+    
+    def call(self, name:str, *args:ty.Any) -> bool:
+        "Run the body of a function defined by the program last run(), with args for its parameters."
+        if name not in self.functions:
+            raise NameError(f"{name}() is not defined: run() the program defining it first.")
+        return self.__call(self.functions[name], *args)
+    
+    def __call(self, function:ty.Callable[..., None], *args:ty.Any) -> bool:
+        try:
+            function(*args)
+            return True
+        except NameError as e:
+            statement, names, _ = self.__origin(e)
+            name:str = e.name[2:] if getattr(e, "name", None) else (match[1] if (match:=LOCAL_NAME_RE.search(str(e))) else '')
+            line, pos, offset = names.get(name, statement)
+            self.__error(err.unknownIdent, None, line, pos, f"Unknown identifier \"{name}\" at line {line} pos {pos}.", offset=offset)
+        except (ArithmeticError, TypeError) as e:
+            statement, _, operation = self.__origin(e)
+            line, pos, offset = operation if operation != None else statement
+            self.__error(err.illegalOp, '', line, pos, f"Cannot evaluate statement ({e}) at line {line} pos {pos}.", offset=offset)
+        return False
+    
+    def __origin(self, e:Exception) -> ty.Tuple[Origin, ty.Dict[str, Origin], Origin|None]:
+        """
+        Origin of the statement the exception was raised in, the origins of the names it reads and that of the
+        operation that raised it, if the failing instruction is one.
+        """
+        failing:types.TracebackType|None = None
+        traceback:types.TracebackType|None = e.__traceback__
+        while traceback != None:
+            if traceback.tb_frame.f_code.co_filename == self.translation.filename:
+                failing = traceback
+            traceback = traceback.tb_next
+        
+        if failing == None:
+            return (0, 0, -1), {}, None
+        pyLine:int = failing.tb_lineno
+        # Columns of the failing instruction: UTF-8 bytes into the line, made characters to match the operations'
+        _, _, start, end = list(failing.tb_frame.f_code.co_positions())[failing.tb_lasti // 2]
+        line:bytes = self.translation.source.splitlines()[pyLine - 1].encode("utf-8")
+        if start != None and end != None:
+            start, end = len(line[:start].decode("utf-8")), len(line[:end].decode("utf-8"))
+        operation:Origin|None = next((origin for first, last, origin in self.translation.operations[pyLine - 1] if (first, last) == (start, end)), None)
+        return self.translation.lines[pyLine - 1], self.translation.names[pyLine - 1], operation
+    
+    def __error(self, errType:ty.Type[err.Error], *args:ty.Any, offset:int=-1) -> None:
+        "Displays errors."
+        self.errors += 1
+        self.diagnostics.add(errType, *args, offset=offset)
+        self.diagnostics.flush()
+    
+    def transpile(self, program:at.ProgramNode, filename:str="<viper>") -> Translation|None:
+        "Python source of the program, compiled; None if CPython cannot compile it."
+        self.__lines, self.__origins, self.__names, self.__operations = [], [], [], []
+        self.__depth, self.__deepest = 0, (0, None)
+        self.__emit(0, "def _main(_out, _functions):", None)
+        self.__block(program.body, 1)
+        source:str = '\n'.join(self.__lines) + '\n'
+        try:
+            return Translation(source, self.__origins, self.__names, self.__operations, filename)
+        except (RecursionError, MemoryError, SyntaxError) as e:
+            # Only nesting CPython's parser or compiler has no room for gets here
+            token = self.__deepest[1].token if self.__deepest[1] != None else None
+            line, pos = (token.line, token.printPos - token.size + 1) if token != None else (0, 0)
+            reason:str = e.msg if isinstance(e, SyntaxError) else str(e) or e.__class__.__name__
+            self.__error(err.exprErr, token, line, pos, f"Expression nested too deeply to compile ({reason}) at line {line} pos {pos}.",
+                         offset=token.pos - token.size + 1 if token != None else -1)
+            return None
+    
+    def __emit(self, indent:int, line:str, node:at.ASTNode|None, names:ty.Dict[str, Origin]|None=None,
+               operations:ty.List[ty.Tuple[int, int, Origin]]|None=None) -> None:
+        self.__lines.append("    " * indent + line)
+        self.__origins.append(self.__originOf(node))
+        self.__names.append(names if names != None else {})
+        self.__operations.append([(start + 4 * indent, end + 4 * indent, origin) for start, end, origin in operations or ()])
+        if self.__depth > self.__deepest[0]:
+            self.__deepest = (self.__depth, node)
+        self.__depth = 0
+    
+    @staticmethod
+    def __originOf(node:at.ASTNode|None) -> Origin:
+        token = node.token if node != None else None
+        return (token.line, token.printPos - token.size + 1, token.pos - token.size + 1) if token != None else (0, 0, -1)
+    
+    def __block(self, block:at.StatementNode|None, indent:int) -> None:
+        if block == None:
+            self.__emit(indent, "pass", None)
+        for statement in at.statements(block):
+            self.__statement(statement, indent)
+    
+    def __statement(self, node:at.ASTNode, indent:int, keyword:str="if") -> None:
+        names:ty.Dict[str, Origin] = {}
+        operations:ty.List[ty.Tuple[int, int, Origin]] = []
+        if isinstance(node, at.LetNode):
+            target:str = f"v_{node.ident.name} = "
+            self.__emit(indent, target + self.__expr(node.val, 0, names, operations, len(target)), node, names, operations)
+        
+        elif isinstance(node, at.PrintNode):
+            value:str = repr(node.val.val) if isinstance(node.val, at.StrNode) else self.__expr(node.val, 0, names, operations, len("print("))
+            self.__emit(indent, f"print({value}, file=_out)", node, names, operations)
+        
+        elif isinstance(node, at.IfNode):
+            self.__emit(indent, f"{keyword} {self.__expr(node.condition, 0, names, operations, len(keyword) + 1)}:", node, names, operations)
+            self.__block(node.thenBranch, indent + 1)
+            elseBranch:ty.List[at.ASTNode] = list(at.statements(node.elseBranch))
+            if len(elseBranch) == 1 and isinstance(elseBranch[0], at.IfNode):
+                self.__statement(elseBranch[0], indent, "elif")
+            elif elseBranch:
+                self.__emit(indent, "else:", None)
+                self.__block(node.elseBranch, indent + 1)
+        
+        elif isinstance(node, at.WhileNode):
+            self.__emit(indent, f"while {self.__expr(node.condition, 0, names, operations, len('while '))}:", node, names, operations)
+            self.__block(node.thenBranch, indent + 1)
+        
+        elif isinstance(node, at.FunNode):
+            parameters:str = ", ".join(f"v_{name}: {PY_TYPES[typ]}" if typ in PY_TYPES else f"v_{name}" for name, typ in node.parameters.items())
+            self.__emit(indent, f"def f_{node.name}({parameters}):", node)
+            self.__block(node.body, indent + 1)
+            self.__emit(indent, f"_functions[{node.name!r}] = f_{node.name}", node)
+    
+    def __expr(self, node:at.ASTNode, precedence:int, names:ty.Dict[str, Origin], operations:ty.List[ty.Tuple[int, int, Origin]], column:int) -> str:
+        """
+        Python expression of node, in parentheses if it binds less tightly than precedence. The origins of the names
+        it reads go to names, those of its operations to operations with the columns they span, the expression
+        starting at column.
+        """
+        # Explicit stack, as in compiler.Compiler: operator chains can be as long as a line
+        stack:ty.List[ty.Tuple[at.ASTNode, int, int, bool]] = [(node, precedence, 1, False)]
+        exprs:ty.List[str] = []
+        spans:ty.List[ty.List[ty.Tuple[int, int, Origin]]] = [] # per expression in exprs, its operations' columns in it
+        while stack:
+            node, precedence, level, ready = stack.pop()
+            self.__depth = max(self.__depth, level)
+            if isinstance(node, at.NumNode) or isinstance(node, at.StrNode):
+                # Folded constants can be negative
+                exprs.append(f"({node.val!r})" if isinstance(node.val, (int, float)) and node.val < 0 and precedence > UNARY_PRECEDENCE else repr(node.val))
+                spans.append([])
+            
+            elif isinstance(node, at.IdentNode):
+                if node.token != None:
+                    names.setdefault(node.name, self.__originOf(node))
+                exprs.append(f"v_{node.name}")
+                spans.append([])
+            
+            elif isinstance(node, at.UnaryOpNode):
+                if ready:
+                    expr:str = f"{node.op}{exprs.pop()}"
+                    inner:ty.List[ty.Tuple[int, int, Origin]] = [(start + len(node.op), end + len(node.op), origin) for start, end, origin in spans.pop()]
+                    inner.append((0, len(expr), self.__originOf(node)))
+                    self.__parenthesize(exprs, spans, expr, inner, precedence > UNARY_PRECEDENCE)
+                else:
+                    stack.extend(((node, precedence, level, True), (node.operand, UNARY_PRECEDENCE, level + 1, False)))
+            
+            elif isinstance(node, at.BinOpNode):
+                op, opPrecedence = PY_OPS[node.op]
+                if ready:
+                    right:str = exprs.pop()
+                    rightSpans:ty.List[ty.Tuple[int, int, Origin]] = spans.pop()
+                    expr = f"{exprs.pop()} {op} {right}"
+                    # The left operand starts the expression, so its spans stay as they are
+                    inner = spans.pop()
+                    shift:int = len(expr) - len(right)
+                    inner.extend((start + shift, end + shift, origin) for start, end, origin in rightSpans)
+                    inner.append((0, len(expr), self.__originOf(node)))
+                    self.__parenthesize(exprs, spans, expr, inner, precedence > opPrecedence)
+                elif node.op == '^':
+                    # Right-associative
+                    stack.extend(((node, precedence, level, True), (node.right, opPrecedence, level + 1, False),
+                                  (node.left, opPrecedence + 1, level + 1, False)))
+                else:
+                    # Left-associative; comparisons never share a level, Python would chain them
+                    stack.extend(((node, precedence, level, True), (node.right, opPrecedence + 1, level + 1, False),
+                                  (node.left, opPrecedence + 1 if opPrecedence == 1 else opPrecedence, level + 1, False)))
+            
+            else:
+                raise TypeError(f"Cannot transpile {node.__class__.__name__}.")
+        operations.extend((start + column, end + column, origin) for start, end, origin in spans.pop())
+        return exprs.pop()
+    
+    @staticmethod
+    def __parenthesize(exprs:ty.List[str], spans:ty.List[ty.List[ty.Tuple[int, int, Origin]]], expr:str,
+                       inner:ty.List[ty.Tuple[int, int, Origin]], parentheses:bool) -> None:
+        "Push expr with the spans of its operations, in parentheses if it needs them."
+        if parentheses:
+            expr, inner = f"({expr})", [(start + 1, end + 1, origin) for start, end, origin in inner]
+        exprs.append(expr)
+        spans.append(inner)
@@ -0,0 +1,203 @@
+import typing as ty
+
+import asTree as at
+import diagnostics as dm
+import err
+import resolver as rs
+import tok
+
+TT = tok.TokenTypes
+# Types of values, numbers from narrowest to widest: a bool is an int and an int goes where a float does
+NUMBERS:ty.Tuple[TT, ...] = (TT.BOOL, TT.INT, TT.FLOAT)
+VALUES:ty.FrozenSet[TT] = frozenset(NUMBERS + (TT.STRING,))
+ARITHMETIC:ty.FrozenSet[str] = frozenset(('+', '-', '*'))
+COMPARISONS:ty.FrozenSet[str] = frozenset(('==', '!=', '<', '<=', '>', '>='))
+
+
+def join(typ1:TT|None, typ2:TT|None) -> TT|None:
+    "Type of a name let with values of both types: the wider number, None (unknown) for anything else."
+    if typ1 == typ2:
+        return typ1
+    if typ1 in NUMBERS and typ2 in NUMBERS:
+        return max(typ1, typ2, key=NUMBERS.index)
+    return None
+
+
+def assignable(value:TT|None, declared:TT) -> bool:
+    return value == None or value == declared or (value in NUMBERS and declared in NUMBERS and NUMBERS.index(value) <= NUMBERS.index(declared))
+
+
+def result(op:str, left:TT|None, right:TT|None) -> TT|None|bool:
+    "Type of left op right: None if it is not known statically, False if the operands do not go with op."
+    if op in COMPARISONS:
+        if left == None or right == None or op in ('==', '!=') or (left in NUMBERS) == (right in NUMBERS):
+            return TT.BOOL
+        return False
+    if left == TT.STRING or right == TT.STRING:
+        if op == '+' and left in (TT.STRING, None) and right in (TT.STRING, None):
+            return TT.STRING
+        if op == '*' and {left, right} <= {TT.STRING, TT.INT, TT.BOOL, None}:
+            return TT.STRING
+        return False
+    if left == None or right == None:
+        return TT.FLOAT if op in ('/', '^') else None
+    if op in ('/', '^'):
+        # An int to a negative int is a float, so a power only goes where a float does
+        return TT.FLOAT
+    return TT.FLOAT if TT.FLOAT in (left, right) else TT.INT
+
+
+def infallible(op:str, left:TT|None, right:TT|None) -> bool:
+    """
+    Whether left op right cannot fail at run time on operands of these static types: + - * on ints and comparisons
+    of numbers. (A float operation with an int can overflow converting the int.)
+    """
+    if op in COMPARISONS:
+        return left in NUMBERS and right in NUMBERS
+    return op in ARITHMETIC and left in (TT.BOOL, TT.INT) and right in (TT.BOOL, TT.INT)
+
+
+class TypeChecker:
+    """
+    Checks the types of a ~static program's syntax tree, once resolved (see resolver.Resolver), in one pass over
+    it. The type of an expression follows from its literals, the types its names are let with and the types of a
+    function's parameters; a name let with types of different kinds (or not let at all) is of unknown type, which
+    goes with anything. A let of a value of a type its declared type cannot hold is reported as
+    err.assignTypMismatch, an operation on operands it does not take as err.typeErr.
+    
+    Every operation is annotated with the types of its operands where they are known: BinOpNode.leftTyp and
+    rightTyp, UnaryOpNode.typ. An engine can then pick an int-only or float-only way of doing it (see infallible()).
+    A program with type errors is left unannotated, as its names can then hold values of any type.
+    """
+    def __init__(self, diagnostics:dm.Diagnostics|None=None) -> None:
+        self.diagnostics:dm.Diagnostics = diagnostics if diagnostics != None else dm.Diagnostics()
+        self.errors:int = 0
+        self.__names:ty.Dict[int, ty.Dict[int, TT|None]] = {} # per frame (its node's id), the type of each slot
+        self.__annotated:ty.List[at.BinOpNode|at.UnaryOpNode] = []
+    
+    def check(self, program:at.ProgramNode) -> at.ProgramNode:
+        self.__names = {}
+        self.__annotated = []
+        errors:int = self.errors
+        self.__declare(rs.resolved(program))
+        self.__block(program.body, program, program)
+        if self.errors != errors:
+            for node in self.__annotated:
+                if isinstance(node, at.BinOpNode):
+                    node.leftTyp = node.rightTyp = None
+                else:
+                    node.typ = None
+        self.__annotated = []
+        return program
+    
+    def __declare(self, program:at.ProgramNode) -> None:
+        "Types of the names of every frame, joined over all their lets."
+        stack:ty.List[ty.Tuple[at.StatementNode|None, at.ASTNode]] = [(program.body, program)]
+        self.__names[id(program)] = {}
+        while stack:
+            block, frame = stack.pop()
+            names:ty.Dict[int, TT|None] = self.__names[id(frame)]
+            for node in at.statements(block):
+                if isinstance(node, at.LetNode):
+                    typ:TT|None = node.typ if node.typ in VALUES else None
+                    names[node.ident.slot] = join(names[node.ident.slot], typ) if node.ident.slot in names else typ
+                elif isinstance(node, at.IfNode):
+                    stack.extend(((node.thenBranch, frame), (node.elseBranch, frame)))
+                elif isinstance(node, at.WhileNode):
+                    stack.append((node.thenBranch, frame))
+                elif isinstance(node, at.FunNode):
+                    self.__names[id(node)] = {slot: TT[typ] if TT[typ] in VALUES else None for slot, typ in enumerate(node.parameters.values())}
+                    stack.append((node.body, node))
+    
+    def __block(self, block:at.StatementNode|None, frame:at.ASTNode, program:at.ProgramNode) -> None:
+        for node in at.statements(block):
+            if isinstance(node, at.LetNode):
+                value:TT|None = self.__expr(node.val, frame, program)
+                token:tok.Token = node.ident.token
+                if node.typ not in VALUES:
+                    self.__error(err.invalidType, node.typ.name.lower(), token.line, token.printPos - token.size + 1, offset=token.pos - token.size + 1)
+                elif not assignable(value, node.typ):
+                    pos:int = token.printPos - token.size + 1
+                    self.__error(
+                        err.assignTypMismatch, token, token.line, pos,
+                        f"Cannot assign value of type \"{value.name.lower()}\" to \"{node.ident.name}\" of type \"{node.typ.name.lower()}\" at line {token.line} pos {pos}.",
+                        offset=token.pos - token.size + 1
+                    )
+            
+            elif isinstance(node, at.PrintNode):
+                if not isinstance(node.val, at.StrNode):
+                    self.__expr(node.val, frame, program)
+            
+            elif isinstance(node, at.IfNode):
+                self.__expr(node.condition, frame, program)
+                self.__block(node.thenBranch, frame, program)
+                self.__block(node.elseBranch, frame, program)
+            
+            elif isinstance(node, at.WhileNode):
+                self.__expr(node.condition, frame, program)
+                self.__block(node.thenBranch, frame, program)
+            
+            elif isinstance(node, at.FunNode):
+                self.__block(node.body, node, program)
+    
+    def __expr(self, node:at.ASTNode, frame:at.ASTNode, program:at.ProgramNode) -> TT|None:
+        "Type of the expression node, annotating its operations."
+        # Explicit stack: operator chains can be as long as a line
+        types:ty.List[TT|None] = []
+        stack:ty.List[ty.Tuple[at.ASTNode, bool]] = [(node, False)]
+        while stack:
+            node, ready = stack.pop()
+            if isinstance(node, at.NumNode):
+                types.append(node.typ)
+            
+            elif isinstance(node, at.StrNode):
+                types.append(TT.STRING)
+            
+            elif isinstance(node, at.IdentNode):
+                names:ty.Dict[int, TT|None] = self.__names[id(program if node.depth else frame)]
+                types.append(names.get(node.slot))
+            
+            elif isinstance(node, at.BinOpNode):
+                if not ready:
+                    stack.extend(((node, True), (node.right, False), (node.left, False)))
+                    continue
+                right:TT|None = types.pop()
+                left:TT|None = types.pop()
+                node.leftTyp, node.rightTyp = left, right
+                self.__annotated.append(node)
+                typ:TT|None|bool = result(node.op, left, right)
+                if typ is False:
+                    self.__operandError(node.token, frame, left, right)
+                    typ = None
+                types.append(typ)
+            
+            elif isinstance(node, at.UnaryOpNode):
+                if not ready:
+                    stack.extend(((node, True), (node.operand, False)))
+                    continue
+                operand:TT|None = types.pop()
+                node.typ = operand
+                self.__annotated.append(node)
+                if operand == TT.STRING:
+                    self.__operandError(node.token, frame, operand)
+                    operand = None
+                types.append(TT.INT if operand == TT.BOOL else operand)
+            
+            else:
+                types.append(None)
+        return types[0]
+    
+    def __operandError(self, token:tok.Token, frame:at.ASTNode, *operands:TT|None) -> None:
+        pos:int = token.printPos - token.size + 1
+        typs:str = " and ".join(f"\"{typ.name.lower() if typ != None else 'unknown'}\"" for typ in operands)
+        function:str = frame.name if isinstance(frame, at.FunNode) else "<program>"
+        self.__error(
+            err.typeErr, token, token.line, pos, function,
+            f"Unsupported operand type{'s' if len(operands) > 1 else ''} {typs} for \"{token.val}\" at line {token.line} pos {pos}.",
+            offset=token.pos - token.size + 1
+        )
+    
+    def __error(self, errType:ty.Type[err.Error], *args:ty.Any, **kwargs:ty.Any) -> None:
+        "Displays errors."
+        self.errors += 1
+        self.diagnostics.add(errType, *args, **kwargs)
@@ -0,0 +1,303 @@
+import array
+import hashlib
+import os
+import struct
+import sys
+import typing as ty
+import zlib
+
+import asTree as at
+import commons as comm
+import diagnostics as dm
+import events as ev
+import flatTree as ft
+import lex
+import parse
+import tok
+
+NK = ft.NodeKinds
+TT = tok.TokenTypes
+MAGIC:bytes = b"VIC\0"
+FORMAT:int = 2
+CACHE_DIR:str = "__vicache__"
+# Magic, format, version length; then the version, the source's sha256 and the payload's length and crc32
+# (the payload is deflated: nodes, values and the function table)
+HEADER:struct.Struct = struct.Struct("<4sHB")
+CHECK:struct.Struct = struct.Struct("<32sII")
+# Columns of a FlatTree in the order they are written, with their array typecodes
+COLUMNS:ty.Tuple[ty.Tuple[str, str], ...] = (
+    ("kinds", 'b'), ("ops", 'b'), ("firsts", 'i'), ("seconds", 'i'), ("thirds", 'i'), ("nexts", 'i'),
+    ("vals", 'i'), ("tokens", 'i'), ("sizes", 'i'), ("typs", 'h'), ("rightTyps", 'h')
+)
+# Kinds of node an expression or a statement can be
+EXPRESSIONS:ty.FrozenSet[int] = frozenset(kind.value for kind in (NK.BINOP, NK.UNARYOP, NK.NUM, NK.STR, NK.IDENT))
+STATEMENTS:ty.FrozenSet[int] = frozenset(kind.value for kind in (NK.LET, NK.PRINT, NK.IF, NK.WHILE, NK.FOR, NK.FUN))
+BLOCK:ty.FrozenSet[int] = STATEMENTS | {-1}
+TYPS:ty.FrozenSet[int] = frozenset(tok.TYPES) | {0}
+UNARY_OPS:ty.FrozenSet[int] = frozenset((ft.OP_CODES['+'], ft.OP_CODES['-']))
+# Per kind: the kinds its first, second and third child and its next statement may be (None for no node, -1 in
+# them if the node may be missing) and the types its value may have
+RULES:ty.Dict[int, ty.Tuple[ty.Tuple[ty.FrozenSet[int]|None, ...], ty.Tuple[type, ...]]] = {
+    NK.PROGRAM.value: ((BLOCK, None, None, None), (int,)),
+    NK.BINOP.value: ((EXPRESSIONS, EXPRESSIONS, None, None), (type(None),)),
+    NK.UNARYOP.value: ((EXPRESSIONS, None, None, None), (type(None),)),
+    NK.NUM.value: ((None, None, None, None), (int, float, bool)),
+    NK.STR.value: ((None, None, None, None), (str,)),
+    NK.IDENT.value: ((None, None, None, None), (str,)),
+    NK.LET.value: ((frozenset((NK.IDENT.value,)), EXPRESSIONS, None, BLOCK), (type(None),)),
+    NK.PRINT.value: ((EXPRESSIONS, None, None, BLOCK), (type(None),)),
+    NK.IF.value: ((EXPRESSIONS, BLOCK, BLOCK, BLOCK), (type(None),)),
+    NK.WHILE.value: ((EXPRESSIONS, BLOCK, None, BLOCK), (type(None),)),
+    NK.FOR.value: ((EXPRESSIONS, BLOCK, None, BLOCK), (type(None),)),
+    NK.FUN.value: ((BLOCK, None, None, BLOCK), (tuple,)),
+}
+
+
+class CorruptCache(Exception):
+    "A cache file that cannot be read back."
+
+
+class CachedProgram:
+    """
+    A parsed program as run from a cache: its syntax tree, function table (name: parameters) and typing
+    (0 for ~static, 1 for ~dynamic), the number of errors parsing it reported (0 on a hit) and whether it came
+    from the cache.
+    """
+    def __init__(self, tree:at.ProgramNode, funcTable:ty.Dict[str, ty.Dict[str, str]], typing:int, errors:int, hit:bool) -> None:
+        self.tree:at.ProgramNode = tree
+        self.funcTable:ty.Dict[str, ty.Dict[str, str]] = funcTable
+        self.typing:int = typing
+        self.errors:int = errors
+        self.hit:bool = hit
+    
+    def __repr__(self) -> str:
+        return f"CachedProgram({'hit' if self.hit else 'miss'}, {len(self.funcTable)} functions, typing={self.typing}, errors={self.errors})"
+
+
+def cachePath(path:str) -> str:
+    "Where the cache of the source at path is kept: <dir>/__vicache__/<name>.vic, like CPython's __pycache__."
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, CACHE_DIR, os.path.splitext(name)[0] + ".vic")
+
+
+def parsePath(path:str, listener:ev.Listener|None=None, write:bool=True, diagnostics:dm.Diagnostics|None=None) -> CachedProgram:
+    """
+    Parse the program at path into a syntax tree, or load it from its cache if the source has not changed since
+    (same sha256, same VERSION). On a hit nothing is lexed or parsed, so listener gets no events. A missing, stale
+    or corrupt cache is a miss; an error-free program is then written to the cache unless write is False.
+    Errors parsing it go to diagnostics (see lex.Lexer).
+    Tokens of a loaded tree are rebuilt from its nodes (see FlatTree.toTree()) and resolve lines against the source.
+    """
+    with open(path, "rb") as file:
+        source:bytes = file.read()
+    digest:bytes = hashlib.sha256(source).digest()
+    lineIndex:tok.LineIndex = tok.LineIndex(source)
+    
+    try:
+        with open(cachePath(path), "rb") as file:
+            tree, funcTable = load(file.read(), digest, lineIndex)
+        return CachedProgram(tree.toTree(), funcTable, tree.value(tree.root), 0, True)
+    except (OSError, CorruptCache):
+        pass
+    
+    diagnostics = diagnostics if diagnostics != None else dm.Diagnostics()
+    # Counted through diagnostics, which unlike parser.errors has the errors in the program declaration
+    reported:int = diagnostics.count
+    parser:parse.Parser = parse.Parser(lex.Lexer.fromBuffer(source, diagnostics=diagnostics), listener)
+    program:at.ProgramNode = parser.parseTree()
+    tree = ft.FlatTree.fromTree(program)
+    funcTable = functions(tree)
+    errors:int = diagnostics.count - reported
+    if write and not errors:
+        store(cachePath(path), tree, funcTable, digest)
+    return CachedProgram(program, funcTable, parser.typing, errors, False)
+
+
+def functions(tree:ft.FlatTree) -> ty.Dict[str, ty.Dict[str, str]]:
+    "Function table of a tree: the parameters of every function it defines, the last definition of a name winning."
+    table:ty.Dict[str, ty.Dict[str, str]] = {}
+    for node in range(len(tree)):
+        if tree.kinds[node] == NK.FUN.value:
+            name, parameters = tree.value(node)
+            table[name] = dict(parameters)
+    return table
+
+
+def store(path:str, tree:ft.FlatTree, funcTable:ty.Dict[str, ty.Dict[str, str]], digest:bytes) -> bool:
+    "Write a cache file atomically (other processes see the old file or the new one); False if it cannot be written."
+    data:bytes = dump(tree, funcTable, digest)
+    temp:str = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temp, "wb") as file:
+            file.write(data)
+        os.replace(temp, path)
+        return True
+    except OSError:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        return False
+
+
+def dump(tree:ft.FlatTree, funcTable:ty.Dict[str, ty.Dict[str, str]], digest:bytes) -> bytes:
+    "Bytes of a cache file holding tree and funcTable for the source with sha256 digest."
+    payload:ty.List[bytes] = [struct.pack("<I", len(tree))]
+    for name, typecode in COLUMNS:
+        column:array.array = getattr(tree, name)
+        if sys.byteorder == "big":
+            column = array.array(typecode, column)
+            column.byteswap()
+        payload.append(column.tobytes())
+    
+    payload.append(struct.pack("<I", len(tree.values)))
+    for value in tree.values:
+        encodeValue(value, payload)
+    encodeValue(tuple((name, tuple(parameters.items())) for name, parameters in funcTable.items()), payload)
+    
+    body:bytes = zlib.compress(b''.join(payload), 1)
+    version:bytes = comm.VERSION.encode("utf-8")
+    return HEADER.pack(MAGIC, FORMAT, len(version)) + version + CHECK.pack(digest, len(body), zlib.crc32(body)) + body
+
+
+def load(data:bytes, digest:bytes, lineIndex:tok.LineIndex|None=None) -> ty.Tuple[ft.FlatTree, ty.Dict[str, ty.Dict[str, str]]]:
+    """
+    Tree and function table from the bytes of a cache file, if it was written by this VERSION for the source with
+    sha256 digest. Raises CorruptCache for anything else: another source or version, a damaged or truncated file,
+    or a tree that is not well formed.
+    """
+    try:
+        magic, formatNum, size = HEADER.unpack_from(data, 0)
+        offset:int = HEADER.size
+        version:bytes = data[offset:offset + size]
+        offset += size
+        source, length, crc = CHECK.unpack_from(data, offset)
+        offset += CHECK.size
+    except struct.error:
+        raise CorruptCache("truncated header") from None
+    if magic != MAGIC or formatNum != FORMAT:
+        raise CorruptCache("not a cache file of this format")
+    if version != comm.VERSION.encode("utf-8") or source != digest:
+        raise CorruptCache("stale")
+    if len(data) - offset != length or zlib.crc32(memoryview(data)[offset:]) != crc:
+        raise CorruptCache("damaged")
+    
+    try:
+        body:memoryview = memoryview(zlib.decompress(memoryview(data)[offset:]))
+        tree:ft.FlatTree = ft.FlatTree(lineIndex)
+        count:int = struct.unpack_from("<I", body, 0)[0]
+        offset = 4
+        for name, typecode in COLUMNS:
+            column:array.array = array.array(typecode)
+            column.frombytes(body[offset:offset + count * column.itemsize])
+            if len(column) != count:
+                raise CorruptCache("truncated column")
+            if sys.byteorder == "big":
+                column.byteswap()
+            setattr(tree, name, column)
+            offset += count * column.itemsize
+        
+        values:int = struct.unpack_from("<I", body, offset)[0]
+        offset += 4
+        for _ in range(values):
+            value, offset = decodeValue(body, offset)
+            tree.values.append(value)
+        table, offset = decodeValue(body, offset)
+        funcTable:ty.Dict[str, ty.Dict[str, str]] = {name: dict(parameters) for name, parameters in table}
+    except (zlib.error, struct.error, IndexError, ValueError, TypeError, UnicodeDecodeError) as e:
+        raise CorruptCache(f"malformed ({e})") from None
+    if offset != len(body):
+        raise CorruptCache("trailing bytes")
+    
+    check(tree)
+    return tree, funcTable
+
+
+def check(tree:ft.FlatTree) -> None:
+    """
+    Raise CorruptCache unless tree is a well-formed program, so that rebuilding and running it cannot fail on
+    something parsing never produces: every handle, nexts included, points back to an earlier node of the right
+    kind (so there are no cycles), every op, typ and value index is valid and values have the type their kind needs.
+    """
+    n:int = len(tree)
+    if n == 0 or tree.kinds[-1] != NK.PROGRAM.value or NK.PROGRAM.value in tree.kinds[:-1]:
+        raise CorruptCache("no program")
+    # Whole columns at once where a range is enough
+    if (min(tree.kinds) < 1 or max(tree.kinds) > len(ft.KINDS) or min(tree.ops) < 0 or max(tree.ops) >= len(ft.OPS)
+            or min(tree.vals) < -1 or max(tree.vals) >= len(tree.values) or min(tree.tokens) < -1 or min(tree.sizes) < 0
+            or not set(tree.typs).union(tree.rightTyps) <= TYPS):
+        raise CorruptCache("bad column")
+    
+    kinds:ty.List[int] = tree.kinds.tolist()
+    ops:ty.List[int] = tree.ops.tolist()
+    PROGRAM, BINOP, UNARYOP, FUN = NK.PROGRAM.value, NK.BINOP.value, NK.UNARYOP.value, NK.FUN.value
+    values:ty.List[ty.Any] = [tree.values[index] if index != -1 else None for index in tree.vals]
+    for node, handles in enumerate(zip(tree.firsts, tree.seconds, tree.thirds, tree.nexts)):
+        kind:int = kinds[node]
+        slots, valueTypes = RULES[kind]
+        for handle, allowed in zip(handles, slots):
+            if handle == -1 and (allowed == None or -1 in allowed):
+                continue
+            if allowed == None or not 0 <= handle < node or kinds[handle] not in allowed:
+                raise CorruptCache(f"bad child {handle} of node {node}")
+        
+        value:ty.Any = values[node]
+        if type(value) not in valueTypes:
+            raise CorruptCache(f"bad value of node {node}")
+        if kind == BINOP and ops[node] == 0 or kind == UNARYOP and ops[node] not in UNARY_OPS:
+            raise CorruptCache(f"bad op of node {node}")
+        if kind == PROGRAM and value not in (0, 1) or kind == FUN and not (len(value) == 2
+                and type(value[0]) == str and type(value[1]) == tuple
+                and all(type(p) == tuple and len(p) == 2 and type(p[0]) == str and type(p[1]) == str for p in value[1])):
+            raise CorruptCache(f"bad value of node {node}")
+
+
+def encodeValue(value:ty.Any, out:ty.List[bytes]) -> None:
+    "Append the tagged encoding of a value of the pool (None, bool, int, float, str or a tuple of them) to out."
+    if value is None:
+        out.append(b'N')
+    elif value is True or value is False:
+        out.append(b'T' if value else b'F')
+    elif type(value) == int:
+        raw:bytes = value.to_bytes((value.bit_length() + 8) // 8, "little", signed=True)
+        out.append(b'I' + struct.pack("<I", len(raw)) + raw)
+    elif type(value) == float:
+        out.append(b'D' + struct.pack("<d", value))
+    elif type(value) == str:
+        raw = value.encode("utf-8", "surrogatepass")
+        out.append(b'S' + struct.pack("<I", len(raw)) + raw)
+    elif type(value) == tuple:
+        out.append(b'U' + struct.pack("<I", len(value)))
+        for item in value:
+            encodeValue(item, out)
+    else:
+        raise TypeError(f"Cannot cache a value of type {type(value).__name__}.")
+
+
+def decodeValue(data:memoryview, offset:int) -> ty.Tuple[ty.Any, int]:
+    "Value encoded at offset and the offset after it."
+    tag:bytes = bytes(data[offset:offset + 1])
+    offset += 1
+    if tag == b'N':
+        return None, offset
+    elif tag == b'T' or tag == b'F':
+        return tag == b'T', offset
+    elif tag == b'D':
+        return struct.unpack_from("<d", data, offset)[0], offset + 8
+    elif tag == b'I' or tag == b'S':
+        size:int = struct.unpack_from("<I", data, offset)[0]
+        offset += 4
+        raw:bytes = bytes(data[offset:offset + size])
+        if len(raw) != size:
+            raise ValueError("truncated value")
+        return (int.from_bytes(raw, "little", signed=True) if tag == b'I' else raw.decode("utf-8", "surrogatepass")), offset + size
+    elif tag == b'U':
+        count:int = struct.unpack_from("<I", data, offset)[0]
+        offset += 4
+        items:ty.List[ty.Any] = []
+        for _ in range(count):
+            item, offset = decodeValue(data, offset)
+            items.append(item)
+        return tuple(items), offset
+    raise ValueError(f"unknown tag {tag!r}")
@@ -0,0 +1,210 @@
+import sys
+import typing as ty
+
+import compiler as cp
+import diagnostics as dm
+import err
+import tok
+
+OP = cp.OpCodes
+
+# Superinstructions the VM decodes common sequences into, after the bytecode's own opcodes:
+# LOAD a; CONST k / LOAD b; BINARY f, alone or followed by STORE, JUMP_IF_TRUE or JUMP_IF_FALSE
+LOAD_CONST_BINARY, LOAD_CONST_BINARY_STORE, LOAD_CONST_BINARY_JUMP_IF_TRUE, LOAD_CONST_BINARY_JUMP_IF_FALSE = 100, 101, 102, 103
+LOAD_LOAD_BINARY, LOAD_LOAD_BINARY_STORE, LOAD_LOAD_BINARY_JUMP_IF_TRUE, LOAD_LOAD_BINARY_JUMP_IF_FALSE = 104, 105, 106, 107
+TAILS:ty.Dict[int, int] = {OP.STORE: 1, OP.JUMP_IF_TRUE: 2, OP.JUMP_IF_FALSE: 3}
+
+
+class VM:
+    """
+    Runs bytecode from compiler.Compiler with a value stack and one slot per name. print writes to out
+    (stdout by default). A run-time error is reported to diagnostics like the parser's errors and stops the program.
+    
+    Before running a code it is decoded once into a list of instruction tuples, in which common sequences are
+    fused into superinstructions so a loop iteration goes through fewer dispatches.
+    """
+    def __init__(self, out:ty.TextIO|None=None, diagnostics:dm.Diagnostics|None=None) -> None:
+        self.out:ty.TextIO = out if out != None else sys.stdout
+        self.diagnostics:dm.Diagnostics = diagnostics if diagnostics != None else dm.Diagnostics()
+        self.functions:ty.Dict[str, cp.Code] = {}
+        self.globals:ty.List[ty.Any] = []
+        self.errors:int = 0
+        self.__decoded:ty.Dict[cp.Code, ty.List[ty.Tuple[ty.Any, ...]]] = {}
+    
+    def run(self, code:cp.Code) -> bool:
+        "Run the program's code; False if it stopped at an error."
+        # Functions of an earlier program read its slots, not this one's
+        self.functions = {}
+        self.globals = [None] * len(code.names)
+        return self.__execute(code, self.globals)
+    
+    def call(self, name:str, *args:ty.Any) -> bool:
+        "Run the body of a function defined by the program last run(), with args for its parameters."
+        if name not in self.functions:
+            raise NameError(f"{name}() is not defined: run() the program defining it first.")
+        function:cp.Code = self.functions[name]
+        if len(args) != len(function.parameters):
+            raise TypeError(f"{name}() takes {len(function.parameters)} arguments, got {len(args)}.")
+        slots:ty.List[ty.Any] = list(args) + [None] * (len(function.names) - len(args))
+        return self.__execute(function, slots)
+    
+    def __decode(self, code:cp.Code) -> ty.List[ty.Tuple[ty.Any, ...]]:
+        """
+        Instruction tuples of code, indexed by instruction (word address // 2). A fused instruction replaces the first
+        of its sequence and the rest stay in place behind it, so jumps into the middle of a sequence still work.
+        """
+        words:ty.List[int] = code.code.tolist()
+        instructions:ty.List[ty.Tuple[ty.Any, ...]] = []
+        for address in range(0, len(words), 2):
+            op, arg = words[address], words[address + 1]
+            if op == OP.CONST or op == OP.DEFINE:
+                instructions.append((op, code.consts[arg]))
+            elif op == OP.BINARY:
+                instructions.append((op, cp.BINARY_FUNCS[arg]))
+            elif op == OP.UNARY:
+                instructions.append((op, cp.UNARY_FUNCS[arg]))
+            elif op == OP.JUMP or op == OP.JUMP_IF_TRUE or op == OP.JUMP_IF_FALSE:
+                instructions.append((op, arg // 2))
+            else:
+                instructions.append((op, arg))
+        
+        fused:ty.List[ty.Tuple[ty.Any, ...]] = list(instructions)
+        for i in range(len(instructions) - 2):
+            (op1, arg1), (op2, arg2), (op3, arg3) = instructions[i], instructions[i+1], instructions[i+2]
+            if op1 != OP.LOAD or (op2 != OP.CONST and op2 != OP.LOAD) or op3 != OP.BINARY:
+                continue
+            base:int = LOAD_CONST_BINARY if op2 == OP.CONST else LOAD_LOAD_BINARY
+            tail:ty.Tuple[ty.Any, ...] = instructions[i+3] if i + 3 < len(instructions) else (OP.HALT, 0)
+            if tail[0] in TAILS:
+                fused[i] = (base + TAILS[tail[0]], arg1, arg2, arg3, tail[1])
+            else:
+                fused[i] = (base, arg1, arg2, arg3)
+        return fused
+    
+    def __execute(self, code:cp.Code, slots:ty.List[ty.Any]) -> bool:
+        if code not in self.__decoded:
+            self.__decoded[code] = self.__decode(code)
+        instructions:ty.List[ty.Tuple[ty.Any, ...]] = self.__decoded[code]
+        globals_:ty.List[ty.Any] = self.globals
+        write = self.out.write
+        stack:ty.List[ty.Any] = []
+        push = stack.append
+        pop = stack.pop
+        HALT, CONST, LOAD, LOAD_GLOBAL, STORE, BINARY, UNARY = OP.HALT.value, OP.CONST.value, OP.LOAD.value, OP.LOAD_GLOBAL.value, OP.STORE.value, OP.BINARY.value, OP.UNARY.value
+        PRINT, JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE, DEFINE = OP.PRINT.value, OP.JUMP.value, OP.JUMP_IF_FALSE.value, OP.JUMP_IF_TRUE.value, OP.DEFINE.value
+        pc:int = 0
+        
+        try:
+            # Most frequent instructions first; pc stays at the current instruction until it is done
+            while True:
+                instruction:ty.Tuple[ty.Any, ...] = instructions[pc]
+                op:int = instruction[0]
+                if op == LOAD_CONST_BINARY_STORE:
+                    _, a, k, f, dest = instruction
+                    if (left:=slots[a]) is None:
+                        raise NameError(pc)
+                    slots[dest] = f(left, k)
+                    pc += 4
+                elif op == LOAD_LOAD_BINARY_STORE:
+                    _, a, b, f, dest = instruction
+                    if (left:=slots[a]) is None:
+                        raise NameError(pc)
+                    if (right:=slots[b]) is None:
+                        raise NameError(pc + 1)
+                    slots[dest] = f(left, right)
+                    pc += 4
+                elif op == LOAD_CONST_BINARY_JUMP_IF_TRUE:
+                    _, a, k, f, target = instruction
+                    if (left:=slots[a]) is None:
+                        raise NameError(pc)
+                    pc = target if f(left, k) else pc + 4
+                elif op == LOAD_CONST_BINARY:
+                    _, a, k, f = instruction
+                    if (left:=slots[a]) is None:
+                        raise NameError(pc)
+                    push(f(left, k))
+                    pc += 3
+                elif op == LOAD:
+                    if (value:=slots[instruction[1]]) is None:
+                        raise NameError(pc)
+                    push(value)
+                    pc += 1
+                elif op == CONST:
+                    push(instruction[1])
+                    pc += 1
+                elif op == BINARY:
+                    right = pop()
+                    stack[-1] = instruction[1](stack[-1], right)
+                    pc += 1
+                elif op == STORE:
+                    slots[instruction[1]] = pop()
+                    pc += 1
+                elif op == LOAD_LOAD_BINARY:
+                    _, a, b, f = instruction
+                    if (left:=slots[a]) is None:
+                        raise NameError(pc)
+                    if (right:=slots[b]) is None:
+                        raise NameError(pc + 1)
+                    push(f(left, right))
+                    pc += 3
+                elif op == LOAD_LOAD_BINARY_JUMP_IF_TRUE:
+                    _, a, b, f, target = instruction
+                    if (left:=slots[a]) is None:
+                        raise NameError(pc)
+                    if (right:=slots[b]) is None:
+                        raise NameError(pc + 1)
+                    pc = target if f(left, right) else pc + 4
+                elif op == LOAD_CONST_BINARY_JUMP_IF_FALSE:
+                    _, a, k, f, target = instruction
+                    if (left:=slots[a]) is None:
+                        raise NameError(pc)
+                    pc = pc + 4 if f(left, k) else target
+                elif op == LOAD_LOAD_BINARY_JUMP_IF_FALSE:
+                    _, a, b, f, target = instruction
+                    if (left:=slots[a]) is None:
+                        raise NameError(pc)
+                    if (right:=slots[b]) is None:
+                        raise NameError(pc + 1)
+                    pc = pc + 4 if f(left, right) else target
+                elif op == JUMP_IF_TRUE:
+                    pc = instruction[1] if pop() else pc + 1
+                elif op == JUMP_IF_FALSE:
+                    pc = pc + 1 if pop() else instruction[1]
+                elif op == JUMP:
+                    pc = instruction[1]
+                elif op == UNARY:
+                    stack[-1] = instruction[1](stack[-1])
+                    pc += 1
+                elif op == PRINT:
+                    write(f"{pop()}\n")
+                    pc += 1
+                elif op == LOAD_GLOBAL:
+                    if (value:=globals_[instruction[1]]) is None:
+                        raise NameError(pc)
+                    push(value)
+                    pc += 1
+                elif op == DEFINE:
+                    self.functions[instruction[1].name] = instruction[1]
+                    pc += 1
+                elif op == HALT:
+                    return True
+        
+        except NameError as e:
+            token:tok.Token = code.tokens[2 * e.args[0]]
+            self.__error(err.unknownIdent, token, token.line, token.printPos - token.size + 1, offset=token.pos - token.size + 1)
+        except (ArithmeticError, TypeError) as e:
+            # The operator is the first one from the failing instruction on, fused or not
+            address:int = 2 * pc
+            while instructions[address // 2][0] != BINARY and instructions[address // 2][0] != UNARY:
+                address += 2
+            token = code.tokens[address]
+            self.__error(err.illegalOp, token.val, token.line, token.printPos - token.size + 1,
+                         f"Cannot evaluate \"{token.val}\" ({e}) at line {token.line} pos {token.printPos - token.size + 1}.",
+                         offset=token.pos - token.size + 1)
+        return False
+    
+    def __error(self, errType:ty.Type[err.Error], *args:ty.Any, **kwargs:ty.Any) -> None:
+        "Displays errors."
+        self.errors += 1
+        self.diagnostics.add(errType, *args, **kwargs)
+        self.diagnostics.flush()
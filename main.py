@@ -1,43 +1,214 @@
-# log:bool = False
-
-# try:
-#     import logging as lg
-#     handler:lg.FileHandler = lg.FileHandler(filename="logs\\mainErr.log", mode="a")
-#     handler.setLevel(lg.DEBUG)
-#     handler.setFormatter(lg.Formatter("\n%(asctime)s\n%(levelname)s: %(name)s: %(message)s"))
-#     logger = lg.getLogger("main")
-#     logger.addHandler(handler)
-#     log = True
-
-# except (ModuleNotFoundError, FileNotFoundError) as e:
-#     print(e.__class__.__name__, e)
-#     print("Logger not found. Program will continue without logging.")
-
-# except Exception as e:
-#     print("Unknown error while trying to initialise logger.")
-
-# try:
-import sys
-import traceback
-
-sys.path.insert(1, ".\\core")
-import core.lex as clex
-import core.parse as cparse
-with open("tests\\main.vi", 'r') as f:
-    code:str = f.read()
-
-lexer:clex.Lexer = clex.Lexer(code)
-parser:cparse.Parser = cparse.Parser(lexer)
-
-parser.parse()
-
-# except (ModuleNotFoundError, FileNotFoundError):
-#     import traceback
-#     traceback.print_exc()
-#     print("Critical files not found.")
-
-# except Exception as e:
-#     if log:
-#         logger.fatal(f"Fatal error:\n{traceback.format_exc()}")
-#     else:
-#         print(f"Logging unavailable, error will be printed with output:\nFatal error:\n{traceback.format_exc()}")
+"""
+Runs Viper programs from the command line: files, directories (every .vi file below them) and glob patterns,
+spread over a pool of worker processes so that the interpreter starts once per worker rather than once per file.
+
+Every file's output and diagnostics are collected and written in the order the files were given, either as text
+or, with --json, as one JSON object per line (with the diagnostics as objects, not in the output). A summary goes
+to stderr. The exit status is 0 if every file ran without diagnostics, 1 if some had errors and 2 if a file could
+not be read or checked in time (--timeout, where the platform has SIGALRM) or no file matched.
+
+    python main.py [-j JOBS] [--json] [--tree] [--trace] [--max-errors N] [--timeout SECONDS] [--profile FILE] PATH...
+"""
+import argparse
+import concurrent.futures as cf
+import contextlib
+import glob
+import io
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import typing as ty
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "core"))
+import diagnostics as dm
+import events as ev
+import instrument
+import lex
+import parse
+import vic
+
+EXTENSION:str = ".vi"
+TIMEOUT:float = 60.0
+
+
+class Timeout(Exception):
+    "Checking a file took longer than it was given."
+
+
+class Result:
+    "What checking one file gave: its output, the diagnostics in it and how long it took."
+    def __init__(self, path:str, output:str='', diagnostics:ty.List[ty.Dict[str, ty.Any]]|None=None, errors:int=0,
+                 typing:int|None=None, failure:str|None=None, cached:bool=False, seconds:float=0.0) -> None:
+        self.path:str = path
+        self.output:str = output
+        self.diagnostics:ty.List[ty.Dict[str, ty.Any]] = diagnostics if diagnostics != None else [] # see Diagnostic.asDict()
+        self.errors:int = errors # all of them, also those past the limit
+        self.typing:int|None = typing
+        self.failure:str|None = failure # why the file could not be checked
+        self.cached:bool = cached
+        self.seconds:float = seconds
+    
+    @property
+    def ok(self) -> bool:
+        return not self.errors and self.failure == None
+    
+    def asDict(self) -> ty.Dict[str, ty.Any]:
+        return {"path": self.path, "ok": self.ok, "errors": self.errors, "diagnostics": self.diagnostics,
+                "typing": self.typing, "output": self.output, "failure": self.failure, "cached": self.cached,
+                "seconds": round(self.seconds, 6)}
+
+
+def expand(patterns:ty.List[str]) -> ty.Tuple[ty.List[str], ty.List[str]]:
+    "Files named by patterns (files, directories searched for .vi files, globs) in order, once each; and the patterns matching none."
+    files:ty.List[str] = []
+    unmatched:ty.List[str] = []
+    seen:ty.Set[str] = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches:ty.List[str] = sorted(glob.glob(os.path.join(glob.escape(pattern), "**", f"*{EXTENSION}"), recursive=True))
+        elif os.path.exists(pattern) or not glob.has_magic(pattern):
+            matches = [pattern] # a missing file is reported when it is checked
+        else:
+            matches = sorted(path for path in glob.glob(pattern, recursive=True) if not os.path.isdir(path))
+        
+        if not matches:
+            unmatched.append(pattern)
+        for path in matches:
+            key:str = os.path.normcase(os.path.abspath(path))
+            if key not in seen:
+                seen.add(key)
+                files.append(path)
+    return files, unmatched
+
+
+@contextlib.contextmanager
+def deadline(seconds:float|None) -> ty.Iterator[None]:
+    """
+    Raise Timeout in the block once it has run for seconds (not at all if None or 0). Needs SIGALRM, so it does nothing
+    on Windows, and a main thread, which pool workers have.
+    """
+    if not seconds or not hasattr(signal, "SIGALRM") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    
+    def expire(signum:int, frame:ty.Any) -> None:
+        raise Timeout(f"not checked within {seconds:g} s")
+    previous:ty.Any = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def check(path:str, tree:bool=False, trace:bool=False, maxErrors:int|None=None, echo:bool=True, timeout:float|None=None) -> Result:
+    """
+    Run the program at path with the parser, or with tree only parse it into a syntax tree (through its .vic cache).
+    Everything written to stdout meanwhile is the file's output: what it prints (or with trace the parser's trace
+    events) and, if echo, its diagnostics. Only the first maxErrors diagnostics are kept (all if None). A file taking
+    longer than timeout seconds is given up on, so one file cannot hold up the others (see deadline()).
+    """
+    out:io.StringIO = io.StringIO()
+    diagnostics:dm.Diagnostics = dm.Diagnostics(limit=maxErrors, write=echo)
+    start:float = time.perf_counter()
+    typing:int|None = None
+    failure:str|None = None
+    cached:bool = False
+    with contextlib.redirect_stdout(out):
+        try:
+            with deadline(timeout):
+                if tree:
+                    program:vic.CachedProgram = vic.parsePath(path, ev.ConsoleListener() if trace else None, diagnostics=diagnostics)
+                    typing, cached = program.typing, program.hit
+                else:
+                    parser:parse.Parser = parse.Parser(lex.Lexer.fromPath(path, diagnostics), ev.ConsoleListener() if trace else ev.OutputListener())
+                    typing = parser.typing
+                    parser.parse()
+        except OSError as e:
+            failure = f"{e.__class__.__name__}: {e.strerror if e.strerror else e}"
+        except (Exception, SystemExit) as e:
+            failure = f"{e.__class__.__name__}: {e}"
+    
+    return Result(path, out.getvalue(), diagnostics.asDicts(), diagnostics.count, typing, failure, cached, time.perf_counter() - start)
+
+
+def checkAll(paths:ty.List[str], jobs:int, tree:bool=False, trace:bool=False, maxErrors:int|None=None,
+             echo:bool=True, timeout:float|None=None) -> ty.Iterator[Result]:
+    "Results of checking paths (see check()), in order; with more than one job the files are checked by a pool of processes."
+    if jobs <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield check(path, tree, trace, maxErrors, echo, timeout)
+        return
+    
+    # Chunks keep the cost of sending work to the workers low on many small files
+    chunkSize:int = max(1, min(64, len(paths) // (jobs * 4)))
+    with cf.ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(check, paths, [tree] * len(paths), [trace] * len(paths), [maxErrors] * len(paths),
+                            [echo] * len(paths), [timeout] * len(paths), chunksize=chunkSize)
+
+
+def report(result:Result, asJson:bool, headers:bool, stream:ty.TextIO) -> None:
+    if asJson:
+        stream.write(json.dumps(result.asDict(), ensure_ascii=False) + '\n')
+        return
+    
+    if headers:
+        stream.write(f"==> {result.path} <==\n")
+    stream.write(result.output)
+    if result.failure != None:
+        stream.write(f"?? {result.path}: {result.failure}\n")
+
+
+def main(argv:ty.List[str]|None=None) -> int:
+    arguments:argparse.ArgumentParser = argparse.ArgumentParser(prog="viper", description="Run Viper programs.")
+    arguments.add_argument("paths", nargs='+', metavar="PATH", help=f"a {EXTENSION} file, a directory to search for them or a glob pattern")
+    arguments.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="worker processes (default: one per CPU)")
+    arguments.add_argument("--json", action="store_true", help="write one JSON object per file instead of text")
+    arguments.add_argument("--tree", action="store_true", help="only parse into syntax trees, through the .vic cache")
+    arguments.add_argument("--trace", action="store_true", help="include the parser's trace events in the output")
+    arguments.add_argument("--max-errors", type=int, metavar="N", help="diagnostics to show per file (default: all)")
+    arguments.add_argument("--timeout", type=float, default=TIMEOUT, metavar="SECONDS",
+                           help=f"give up on a file after this long, 0 for never (default: {TIMEOUT:g}; needs SIGALRM, not on Windows)")
+    arguments.add_argument("--profile", metavar="FILE", help="write a JSON report of where the time went to FILE (implies -j 1)")
+    options:argparse.Namespace = arguments.parse_args(argv)
+    
+    start:float = time.perf_counter()
+    paths, unmatched = expand(options.paths)
+    for pattern in unmatched:
+        sys.stderr.write(f"viper: no file matches {pattern}\n")
+    
+    files:int = 0
+    failed:int = 0
+    broken:int = 0
+    errors:int = 0
+    # Phases are only timed in this process
+    profile:instrument.Profile|None = instrument.Profile() if options.profile != None else None
+    if profile != None:
+        options.jobs = 1
+        profile.start()
+    try:
+        for result in checkAll(paths, options.jobs, options.tree, options.trace, options.max_errors, not options.json, options.timeout):
+            report(result, options.json, len(paths) > 1, sys.stdout)
+            files += 1
+            failed += not result.ok
+            broken += result.failure != None
+            errors += result.errors
+    finally:
+        if profile != None:
+            profile.stop()
+            profile.save(options.profile)
+    sys.stdout.flush()
+    
+    sys.stderr.write(f"viper: {files} file{'s' if files != 1 else ''}, {failed} with errors, {errors} diagnostic{'s' if errors != 1 else ''}"
+                     f"{f', {broken} not checked' if broken else ''} in {time.perf_counter() - start:.2f} s\n")
+    if broken or unmatched or not files:
+        return 2
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Tests of the execution engines: on random programs each gives the output and error stops of a reference tree-walker,
+functions are only called once a program has defined them, errors are reported at the operation or name that fails,
+and long or deeply nested expressions run or are reported as errors, with their offsets in the source.
+
+Run from the repository root: python -m unittest discover tests (or python -m pytest tests)
+"""
+import io
+import os
+import random
+import sys
+import typing as ty
+import unittest
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+import asTree as at
+import closures
+import compiler
+import diagnostics as dm
+import lex
+import parse
+import transpiler
+import vm
+
+PROGRAMS:int = 400
+STEPS:int = 5000 # statements the reference runs a program for before it gives up on it
+
+
+class Reference:
+    "Runs a syntax tree by walking it, names in a dict: the output and whether it ran to the end, None if it ran too long."
+    def __init__(self) -> None:
+        self.names:ty.Dict[str, ty.Any] = {}
+        self.out:ty.List[str] = []
+        self.steps:int = 0
+    
+    def run(self, program:at.ProgramNode) -> ty.Tuple[bool, str]|None:
+        try:
+            self.block(program.body)
+            ok:bool = True
+        except (KeyError, ArithmeticError):
+            ok = False
+        except TimeoutError:
+            return None
+        return ok, ''.join(self.out)
+    
+    def block(self, block:at.StatementNode|None) -> None:
+        for node in at.statements(block):
+            self.steps += 1
+            if self.steps > STEPS:
+                raise TimeoutError
+            if isinstance(node, at.LetNode):
+                self.names[node.ident.name] = self.expr(node.val)
+            elif isinstance(node, at.PrintNode):
+                self.out.append(f"{node.val.val if isinstance(node.val, at.StrNode) else self.expr(node.val)}\n")
+            elif isinstance(node, at.IfNode):
+                self.block(node.thenBranch if self.expr(node.condition) else node.elseBranch)
+            elif isinstance(node, at.WhileNode):
+                while self.expr(node.condition):
+                    self.block(node.thenBranch)
+    
+    def expr(self, node:at.ASTNode) -> ty.Any:
+        if isinstance(node, at.NumNode):
+            return node.val
+        if isinstance(node, at.IdentNode):
+            return self.names[node.name]
+        if isinstance(node, at.UnaryOpNode):
+            return -self.expr(node.operand) if node.op == '-' else self.expr(node.operand)
+        return parse.ops[node.op](self.expr(node.left), self.expr(node.right))
+
+
+class Programs:
+    "Random ~dynamic programs over the names a, b and c: lets, prints, if/elif/else and counting while loops."
+    def __init__(self, seed:int) -> None:
+        self.random:random.Random = random.Random(seed)
+    
+    def program(self) -> str:
+        return f"~dynamic\nlet int a = 1; let int b = 2; let int c = 3; {self.statements(0)}"
+    
+    def statements(self, depth:int, division:bool=True) -> str:
+        parts:ty.List[str] = []
+        for _ in range(self.random.randint(1, 4)):
+            roll:float = self.random.random()
+            if roll < 0.35:
+                parts.append(f"let int {self.random.choice('abc')} = {self.expr(0, division)};")
+            elif roll < 0.6:
+                parts.append(f"print {self.expr(0, division)};")
+            elif roll < 0.8 and depth < 2:
+                text:str = f"if ({self.expr(0, division)}) {{ {self.statements(depth + 1, division)} }}"
+                if self.random.random() < 0.5:
+                    text += f" elif ({self.expr(0, division)}) {{ {self.statements(depth + 1, division)} }}"
+                if self.random.random() < 0.5:
+                    text += f" else {{ {self.statements(depth + 1, division)} }}"
+                parts.append(text + ';')
+            elif depth < 2:
+                name:str = self.random.choice('abc')
+                parts.append(f"let int {name} = 0; while ({name} < {self.random.randint(0, 5)}) {{ {self.statements(depth + 1, False)} let int {name} = {name} + 1; }};")
+        return ' '.join(parts)
+    
+    def expr(self, depth:int, division:bool) -> str:
+        roll:float = self.random.random()
+        if depth > 3 or roll < 0.3:
+            return self.random.choice((str(self.random.randint(0, 9)), 'a', 'b', 'c', "1.5"))
+        if roll < 0.4:
+            return '-' + self.expr(5, division)
+        if roll < 0.5:
+            return f"({self.expr(depth + 1, division)})"
+        ops:ty.List[str] = "+ - * / == != < > <= >=".split() if division else "+ - == != < > <= >=".split()
+        return f"{self.expr(depth + 1, division)} {self.random.choice(ops)} {self.expr(depth + 1, division)}"
+
+
+def trees(seed:int) -> ty.Iterator[ty.Tuple[str, at.ProgramNode, ty.Tuple[bool, str]]]:
+    "Random programs that parse without errors and end, their trees and what the reference makes of them."
+    programs:Programs = Programs(seed)
+    for _ in range(PROGRAMS):
+        src:str = programs.program()
+        diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+        program:at.ProgramNode = parse.Parser(lex.Lexer(src, diagnostics=diagnostics)).parseTree()
+        if diagnostics.count:
+            continue
+        expected:ty.Tuple[bool, str]|None = Reference().run(program)
+        if expected != None:
+            yield src, program, expected
+
+
+class EngineTestCase(unittest.TestCase):
+    def assertRunsAs(self, src:str, expected:ty.Tuple[bool, str], ok:bool, output:str) -> None:
+        "An engine's run matches the reference's: the same output, or up to the error both stop at."
+        with self.subTest(src=src):
+            self.assertEqual(ok, expected[0])
+            self.assertEqual(output, expected[1] if ok else expected[1][:len(output)])
+
+
+class VMTest(EngineTestCase):
+    def testRandomPrograms(self) -> None:
+        for src, program, expected in trees(11):
+            out:io.StringIO = io.StringIO()
+            machine:vm.VM = vm.VM(out, dm.Diagnostics(write=False))
+            self.assertRunsAs(src, expected, machine.run(compiler.Compiler().compile(program)), out.getvalue())
+    
+    def testCallBeforeRun(self) -> None:
+        program:at.ProgramNode = parse.Parser(lex.Lexer("~dynamic\nlet int g = 5;\nfun f(int a) { print a + g; };")).parseTree()
+        out:io.StringIO = io.StringIO()
+        machine:vm.VM = vm.VM(out, dm.Diagnostics(write=False))
+        with self.assertRaises(NameError):
+            machine.call("f", 2)
+        machine.run(compiler.Compiler().compile(program))
+        self.assertTrue(machine.call("f", 2))
+        self.assertEqual(out.getvalue(), "7\n")
+
+
+class ClosureTest(EngineTestCase):
+    def runSource(self, src:str, caches:bool=False) -> ty.Tuple[bool, str, dm.Diagnostics]:
+        diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+        out:io.StringIO = io.StringIO()
+        program:at.ProgramNode = parse.Parser(lex.Lexer(src, diagnostics=diagnostics)).parseTree()
+        return closures.ClosureEngine(out, diagnostics, caches).run(program), out.getvalue(), diagnostics
+    
+    def testRandomPrograms(self) -> None:
+        for caches in (False, True):
+            for src, program, expected in trees(12):
+                out:io.StringIO = io.StringIO()
+                engine:closures.ClosureEngine = closures.ClosureEngine(out, dm.Diagnostics(write=False), caches)
+                self.assertRunsAs(src, expected, engine.run(program), out.getvalue())
+    
+    def testCallBeforeRun(self) -> None:
+        program:at.ProgramNode = parse.Parser(lex.Lexer("~dynamic\nlet int g = 5;\nfun f(int a) { print a + g; };")).parseTree()
+        out:io.StringIO = io.StringIO()
+        engine:closures.ClosureEngine = closures.ClosureEngine(out, dm.Diagnostics(write=False))
+        with self.assertRaises(NameError):
+            engine.call("f", 2)
+        engine.run(program)
+        self.assertTrue(engine.call("f", 2))
+        self.assertEqual(out.getvalue(), "7\n")
+    
+    def testCaches(self) -> None:
+        "Sites miss whenever their operand types change, a negation's included; errors keep their offsets."
+        src:str = "~dynamic\nlet int a = 1; let int i = 0;\nwhile (i < 4) { print a + 1; print -a; let float a = 1.5; let int i = i + 1; };\nprint a / 0;"
+        diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+        out:io.StringIO = io.StringIO()
+        engine:closures.ClosureEngine = closures.ClosureEngine(out, diagnostics, caches=True)
+        self.assertFalse(engine.run(parse.Parser(lex.Lexer(src)).parseTree()))
+        self.assertEqual(out.getvalue(), "2\n-1\n" + "2.5\n-1.5\n" * 4)
+        self.assertEqual([record.offset for record in diagnostics.records], [src.index('/')])
+        self.assertEqual(engine.stats.asDict(), {"sites": 5, "hits": 15, "misses": 7, "polymorphic": 2})
+        self.assertEqual([(cache.op, cache.left, cache.right, cache.hits, cache.misses) for cache in engine.stats.caches], [
+            ('<=', int, int, 5, 1), ('+', float, int, 3, 2), ('-', float, type(None), 3, 2), ('+', int, int, 4, 1), ('/', float, int, 0, 1),
+        ])
+        
+        # Types an operator does not take miss every time, and fail as without caches
+        engine = closures.ClosureEngine(io.StringIO(), dm.Diagnostics(write=False), caches=True)
+        engine.run(parse.Parser(lex.Lexer("~dynamic\nfun f(string s, int n) { print s * n; print s - n; };")).parseTree())
+        self.assertFalse(engine.call('f', "ab", 2))
+        self.assertEqual([(cache.op, cache.left, cache.right, cache.misses) for cache in engine.stats.caches], [('*', str, int, 1), ('-', None, None, 1)])
+    
+    def testLongChain(self) -> None:
+        ok, output, _ = self.runSource("~dynamic\nlet int a = 2;\nprint " + " + ".join(["a"] * 3000) + " - 1;")
+        self.assertTrue(ok)
+        self.assertEqual(output, "5999\n")
+        src:str = "~dynamic\nlet int a = 2;\nprint " + " + ".join(["a"] * 3000) + " / 0;"
+        ok, output, diagnostics = self.runSource(src)
+        self.assertFalse(ok)
+        self.assertEqual([record.errType for record in diagnostics.records], [closures.err.illegalOp])
+        self.assertEqual(diagnostics.records[0].offset, src.index('/'))
+    
+    def testDeepNesting(self) -> None:
+        "Nesting past the recursion limit is an error of the statement, which stops the program."
+        src:str = "~dynamic\nprint 1;\nprint " + "1 + (" * 1500 + "1" + ")" * 1500 + ";\nprint 2;"
+        ok, output, diagnostics = self.runSource(src)
+        self.assertFalse(ok)
+        self.assertEqual(output, "1\n")
+        self.assertEqual([record.errType for record in diagnostics.records], [closures.err.exprErr])
+        self.assertEqual(diagnostics.records[0].offset, src.index("print 1 +"))
+        ok, output, _ = self.runSource("~dynamic\nprint " + "(" * 300 + "1" + " + 1)" * 300 + ";")
+        self.assertEqual((ok, output), (True, "301\n"))
+    
+    def testOffsets(self) -> None:
+        src:str = "~dynamic\nlet int a = 1;\nprint -a + a / (a - 1);"
+        diagnostics:dm.Diagnostics = self.runSource(src)[2]
+        self.assertEqual([record.offset for record in diagnostics.records], [src.index('/')])
+
+
+class TranspilerTest(EngineTestCase):
+    def testRandomPrograms(self) -> None:
+        for src, program, expected in trees(13):
+            out:io.StringIO = io.StringIO()
+            engine:transpiler.Transpiler = transpiler.Transpiler(out, dm.Diagnostics(write=False))
+            self.assertRunsAs(src, expected, engine.run(program), out.getvalue())
+    
+    def testCallBeforeRun(self) -> None:
+        engine:transpiler.Transpiler = transpiler.Transpiler(io.StringIO(), dm.Diagnostics(write=False))
+        with self.assertRaises(NameError):
+            engine.call("f", 2)
+    
+    def testOffsets(self) -> None:
+        "Errors are reported at the operation or name that fails, as the closure engine reports them."
+        for src in ("~dynamic\nlet int a = 1;\nprint -a + a / (a - 1);", "~dynamic\nlet int a = 0;\nif (a == 0) { print 2 * (1 + 3 / a); };",
+                    "~dynamic\nlet int a = 0;\nlet int b = 1 + 2 ^ (0 - 1) * 1 / a;", "~dynamic\nlet int a = 1;\nprint a + z;"):
+            with self.subTest(src=src):
+                program:at.ProgramNode = parse.Parser(lex.Lexer(src, diagnostics=dm.Diagnostics(write=False))).parseTree()
+                diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+                self.assertFalse(transpiler.Transpiler(io.StringIO(), diagnostics).run(program))
+                self.assertEqual([record.offset for record in diagnostics.records], [src.index('/') if '/' in src else src.index('z')])
+                reference:dm.Diagnostics = dm.Diagnostics(write=False)
+                closures.ClosureEngine(io.StringIO(), reference).run(program)
+                self.assertEqual([record.offset for record in diagnostics.records], [record.offset for record in reference.records])
+        
+        diagnostics = dm.Diagnostics(write=False)
+        engine:transpiler.Transpiler = transpiler.Transpiler(io.StringIO(), diagnostics)
+        src = "~dynamic\nfun f(int a) { print 1 / a; };"
+        engine.run(parse.Parser(lex.Lexer(src)).parseTree())
+        self.assertFalse(engine.call("f", 0))
+        self.assertEqual([record.offset for record in diagnostics.records], [src.index('/')])
+    
+    def testLongChain(self) -> None:
+        "A chain CPython compiles runs; one too long for it is reported at its statement, as is too deep nesting."
+        for terms, nested in ((900, False), (3000, False), (300, True)):
+            with self.subTest(terms=terms, nested=nested):
+                expr:str = "1 + (" * terms + "1" + ")" * terms if nested else " + ".join(["1"] * terms)
+                src:str = f"~dynamic\nprint 1;\nprint {expr};"
+                diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+                out:io.StringIO = io.StringIO()
+                ok:bool = transpiler.Transpiler(out, diagnostics).run(parse.Parser(lex.Lexer(src)).parseTree())
+                if terms == 900:
+                    self.assertEqual((ok, out.getvalue()), (True, "1\n900\n"))
+                    continue
+                self.assertEqual((ok, out.getvalue()), (False, ''))
+                self.assertEqual([(record.errType, record.offset) for record in diagnostics.records], [(transpiler.err.exprErr, src.index("print 1 +"))])
+
+
+if __name__ == "__main__":
+    unittest.main()
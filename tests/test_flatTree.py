@@ -0,0 +1,64 @@
+"""
+Tests of flat trees: a tree rebuilt by toTree() has the nodes of the tree it was flattened from, and tokens rebuilt
+without the token stream have the positions and sizes of the tokens they stand for, in folded trees too.
+
+Run from the repository root: python -m unittest discover tests (or python -m pytest tests)
+"""
+import os
+import sys
+import typing as ty
+import unittest
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+import asTree as at
+import flatTree as ft
+import lex
+import optimizer
+import parse
+import tok
+
+SRC:str = (
+    "~dynamic\nlet float x = 1.50;\nlet int y = 007 + 0010;\n"
+    "if (x >= 1.0) { print 'a  b'; } elif (y != 2) { print -x; } else { print x ^ 2; };\n"
+    "while (y <= 10) { let int y = y + 1; };\nfun f(int a) {\n\tprint a * 2.50;\n};\n"
+)
+
+
+def nodes(program:at.ProgramNode, spans:bool=False) -> ty.List[ty.Tuple[ty.Any, ...]]:
+    "Every node of program, depth first, with its token's type, value, position and size (with spans only the last two)."
+    found:ty.List[ty.Tuple[ty.Any, ...]] = []
+    stack:ty.List[at.ASTNode] = [program]
+    while stack:
+        node:at.ASTNode = stack.pop()
+        token:tok.Token|None = node.token
+        found.append((node.__class__.__name__, None if token == None else
+                      (token.pos, token.size, token.line, token.printPos) if spans else
+                      (token.typ, str(token.val), token.pos, token.size, token.line, token.printPos)))
+        values:ty.List[ty.Any] = [getattr(node, name) for cls in type(node).__mro__ for name in getattr(cls, "__slots__", ())]
+        stack.extend(value for value in reversed(values) if isinstance(value, at.ASTNode))
+    return found
+
+
+class ToTreeTest(unittest.TestCase):
+    def testRebuiltTokens(self) -> None:
+        program:at.ProgramNode = parse.Parser(lex.Lexer(SRC)).parseTree()
+        tree:ft.FlatTree = ft.FlatTree.fromTree(program)
+        tree.lineIndex = tok.LineIndex(SRC)
+        self.assertEqual(nodes(tree.toTree(), True), nodes(program, True))
+    
+    def testFoldedTokens(self) -> None:
+        "Folded constants keep the token of what they replace: an operator, or a name whose value they are."
+        src:str = "~static\nlet int x = 10 * 10;\nlet bool b = 1 == 1;\nprint x + 250;\nprint -x;\n"
+        program:at.ProgramNode = optimizer.Optimizer().optimize(parse.Parser(lex.Lexer(src)).parseTree())
+        tree:ft.FlatTree = ft.FlatTree.fromTree(program)
+        tree.lineIndex = tok.LineIndex(src)
+        self.assertEqual(nodes(tree.toTree(), True), nodes(program, True))
+    
+    def testStreamTokens(self) -> None:
+        stream:tok.TokenStream = lex.Lexer(SRC).tokenizeAll()
+        program:at.ProgramNode = parse.Parser(stream).parseTree()
+        self.assertEqual(nodes(ft.FlatTree.fromTree(program).toTree(stream)), nodes(program))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Tests of the lexer: the regex engine gives the same tokens (type, value, position and size) and the same errors as
+the char engine, on sample programs, on programs from bench/corpus.py and on random sources; tokenizeAllParallel()
+gives the stream of tokenizeAll(), from a source or a mapped file; and Lexer.relex() gives the stream of lexing the
+edited source from the start.
+
+Run from the repository root: python -m unittest discover tests (or python -m pytest tests)
+"""
+import os
+import random
+import sys
+import tempfile
+import typing as ty
+import unittest
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bench"))
+import corpus
+import diagnostics as dm
+import lex
+import tok
+
+TT = tok.TokenTypes
+SAMPLES:ty.Tuple[str, ...] = (
+    "",
+    "~static\nlet int x = 1;\nlet float y = x * 2.5 / (x - 3);\nprint y;\n",
+    "~dynamic # header comment\r\nif (x >= 1) { print 'yes'; } elif (x != 2) { print \"no\"; } else { print x ^ 2; };\r\n",
+    "fun f(int a, float b) {\n\tprint a + b; # tabs and a comment\n};\nwhile (i <= 10) { let int i = i + 1; };\n",
+    "let int x = 007; let float y = 1.50; let float z = 1.2.3; print 'unterminated\n",
+    "let int é = 1; $ @ ` ? print x;\n\0",
+    "~ static\nlet string s = 'a' + \"b\"; print s == s; print -x; print +x;",
+    # Headers the lexer reports (its other errors are switched off)
+    "~stat\nprint 1;",
+    "~static ~dynamic\nprint 1;",
+    "~\n",
+    "~dynamic 1\n",
+)
+ALPHABET:ty.List[str] = list(" \t\n\r#'\"+-*/^=!<>.,()[]{};:~_0123456789abcxyzLETletifwhile\0é") + [
+    "let ", "int ", "123", "1.5", "1.2.3", "007", "1.50", "# comment\n", "'str'", "\"s\"", "~static\n", "~ dynamic # c\n", "\t\t",
+]
+
+
+def tokens(src:str, engine:str) -> ty.Tuple[ty.Any, ...]:
+    "Every token the engine reads from src up to EOF, the header's typing and the errors it reports."
+    diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+    lexer:lex.Lexer = lex.Lexer(src, engine, diagnostics=diagnostics)
+    read:ty.List[ty.Tuple[ty.Any, ...]] = []
+    while True:
+        token:tok.Token = lexer.tokenize()
+        read.append((token.typ, repr(token.val), token.pos, token.size, token.line, token.printPos, token.keyword))
+        if token.typ == TT.EOF:
+            break
+    return lexer.programTyping, read, [(str(record), record.offset) for record in diagnostics.records]
+
+
+class EngineTest(unittest.TestCase):
+    def assertSameTokens(self, src:str) -> None:
+        self.assertEqual(tokens(src, "regex"), tokens(src, "char"), repr(src))
+    
+    def testSamples(self) -> None:
+        for src in SAMPLES:
+            with self.subTest(src=src):
+                self.assertSameTokens(src)
+    
+    def testCorpus(self) -> None:
+        for seed in range(4):
+            for typing in ("static", "dynamic"):
+                with self.subTest(seed=seed, typing=typing):
+                    self.assertSameTokens(corpus.Generator(seed, typing, comments=seed % 2 == 0).program(20000))
+    
+    def testRandom(self) -> None:
+        generator:random.Random = random.Random(1)
+        for _ in range(1500):
+            src:str = ''.join(generator.choice(ALPHABET) for _ in range(generator.randint(0, 60)))
+            with self.subTest(src=src):
+                self.assertSameTokens(src)
+
+
+def columns(stream:tok.TokenStream) -> ty.Tuple[ty.Any, ...]:
+    return (list(stream.typs), [stream.start(i) for i in range(len(stream))], [stream.end(i) for i in range(len(stream))],
+            stream.length, stream.origin, stream.programTyping, stream.src)
+
+
+class ParallelTest(unittest.TestCase):
+    def testFile(self) -> None:
+        src:str = corpus.Generator(5, "dynamic", comments=True).program(30000)
+        with tempfile.TemporaryDirectory() as directory:
+            path:str = os.path.join(directory, "program.vi")
+            with open(path, 'w', encoding="utf-8", newline='') as file:
+                file.write(src)
+            serial:tok.TokenStream = lex.Lexer.fromPath(path).tokenizeAll()
+            self.assertEqual(columns(lex.Lexer.fromPath(path).tokenizeAllParallel(2, 2000))[:6], columns(serial)[:6])
+            self.assertEqual(columns(lex.Lexer(src).tokenizeAllParallel(2, 2000))[:6], columns(serial)[:6])
+            # A worker maps the file and closes the map itself
+            for start, end in ((0, 1000), (src.index('\n', 5000) + 1, len(src))):
+                with open(path, "rb") as file:
+                    self.assertEqual(lex.lexChunk(None, path, start, end), lex.lexChunk(file.read()[start:end], None, 0, 0))
+
+
+class RelexTest(unittest.TestCase):
+    def testRandomEdits(self) -> None:
+        "Chains of edits to random sources, each checked against a full lex of the edited source."
+        generator:random.Random = random.Random(2)
+        alphabet:ty.List[str] = ALPHABET + ["'h\u00e9llo'", "#\u00e7\u20ac\n", "let int x = 1;\n"]
+        diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+        for _ in range(300):
+            src:str = ''.join(generator.choice(alphabet) for _ in range(generator.randint(0, 80)))
+            stream:tok.TokenStream = lex.Lexer(src, diagnostics=diagnostics).tokenizeAll()
+            for _ in range(5):
+                last:int = len(stream.src) - 1 # the stream's source ends in a sentinel
+                offset:int = generator.randint(0, last)
+                removed:int = generator.randint(0, min(5, last - offset))
+                inserted:str = ''.join(generator.choice(alphabet) for _ in range(generator.randint(0, 3)))
+                new, first, oldStop, newStop = lex.Lexer.relex(stream, offset, removed, inserted)
+                edited:str = stream.src[:offset] + inserted + stream.src[offset+removed:-1]
+                with self.subTest(src=stream.src, offset=offset, removed=removed, inserted=inserted):
+                    full:tok.TokenStream = lex.Lexer(edited, diagnostics=diagnostics).tokenizeAll()
+                    self.assertEqual(columns(new), columns(full))
+                    self.assertEqual([new.lineIndex.line(i) for i in range(len(edited) + 1)], [full.lineIndex.line(i) for i in range(len(edited) + 1)])
+                    # Only the tokens between first and the stops changed
+                    self.assertEqual(list(new.typs[:first]), list(stream.typs[:first]))
+                    self.assertEqual(list(new.typs[newStop:]), list(stream.typs[oldStop:]))
+                stream = new
+
+
+if __name__ == "__main__":
+    unittest.main()
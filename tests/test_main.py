@@ -0,0 +1,60 @@
+"""
+Tests of the command line runner: one file with errors, or one that takes too long, does not hold up the others.
+
+Run from the repository root: python -m unittest discover tests (or python -m pytest tests)
+"""
+import io
+import os
+import signal
+import sys
+import tempfile
+import time
+import typing as ty
+import unittest
+import unittest.mock
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main
+import parse
+
+FILES:ty.Dict[str, str] = {
+    "a.vi": "~dynamic\nprint 1;\nif (1) { print 2;\n", # block open at EOF
+    "b.vi": "~dynamic\nprint 3;\n",
+}
+
+
+class MainTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory:tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        for name, src in FILES.items():
+            with open(os.path.join(self.directory.name, name), 'w') as file:
+                file.write(src)
+    
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+    
+    def runMain(self, *argv:str) -> ty.Tuple[int, str]:
+        out:io.StringIO = io.StringIO()
+        with unittest.mock.patch("sys.stdout", out), unittest.mock.patch("sys.stderr", io.StringIO()):
+            status:int = main.main([*argv, self.directory.name])
+        return status, out.getvalue()
+    
+    def testUnclosedBlock(self) -> None:
+        for jobs in ("1", "2"):
+            with self.subTest(jobs=jobs):
+                status, output = self.runMain("-j", jobs)
+                self.assertEqual(status, 1)
+                self.assertIn("RFLOBRAC", output)
+                self.assertIn("==> " + os.path.join(self.directory.name, "b.vi") + " <==\n3\n", output)
+    
+    @unittest.skipUnless(hasattr(signal, "SIGALRM"), "timeouts need SIGALRM")
+    def testTimeout(self) -> None:
+        start:float = time.perf_counter()
+        with unittest.mock.patch.object(parse.Parser, "parse", lambda self: time.sleep(5)):
+            results:ty.List[main.Result] = list(main.checkAll(sorted(main.expand([self.directory.name])[0]), 1, timeout=0.2))
+        self.assertLess(time.perf_counter() - start, 4)
+        self.assertEqual([result.failure for result in results], ["Timeout: not checked within 0.2 s"] * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
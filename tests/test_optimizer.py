@@ -0,0 +1,50 @@
+"""
+Tests of the optimizer: constant powers are folded only while they are small, so huge ones are left to run time
+whether or not the code they are in ever runs.
+
+Run from the repository root: python -m unittest discover tests (or python -m pytest tests)
+"""
+import os
+import sys
+import typing as ty
+import unittest
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+import asTree as at
+import lex
+import optimizer
+import parse
+
+
+def printed(src:str) -> ty.List[at.ASTNode]:
+    "What the print statements of src print once it is optimized, in source order, loop bodies included."
+    found:ty.List[at.ASTNode] = []
+    stack:ty.List[at.StatementNode|None] = [optimizer.Optimizer().optimize(parse.Parser(lex.Lexer(src)).parseTree()).body]
+    while stack:
+        for node in at.statements(stack.pop()):
+            if isinstance(node, at.PrintNode):
+                found.append(node.val)
+            elif isinstance(node, at.WhileNode):
+                stack.append(node.thenBranch)
+    return sorted(found, key=lambda node: node.token.pos)
+
+
+class PowerTest(unittest.TestCase):
+    def testHugePowers(self) -> None:
+        "10 ^ 10 ^ 9 would take the optimizer minutes: its exponent is folded, not the power."
+        for start in ("1", "5"): # the loop runs once, or never
+            with self.subTest(start=start):
+                src:str = f"~dynamic\nlet int x = {start}; while (x < 2) {{ print 10 ^ 10 ^ 9; let int x = 3; }};\nprint 7 ^ 100000;"
+                for node in printed(src):
+                    self.assertIsInstance(node, at.BinOpNode)
+                    self.assertIsInstance(node.right, at.NumNode)
+                self.assertEqual([node.right.val for node in printed(src)], [10 ** 9, 100000])
+    
+    def testSmallPowers(self) -> None:
+        values:ty.List[ty.Any] = [node.val for node in printed("~dynamic\nprint 2 ^ 10;\nprint 2 ^ -1;\nprint 1.5 ^ 2;\nprint (0 - 1) ^ 100000000001;")]
+        self.assertEqual(values, [1024, 0.5, 2.25, -1])
+        self.assertIsInstance(printed("~dynamic\nprint 2.5 ^ 100000000000;")[0], at.BinOpNode)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Tests of the parser: parse() and parseTree() on blocks left open at the end of the source, parse()'s evaluation of
+names whose value is false and of failing operations, and reparse() against parsing the edited source from the start.
+
+Run from the repository root: python -m unittest discover tests (or python -m pytest tests)
+"""
+import os
+import random
+import sys
+import typing as ty
+import unittest
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+import diagnostics as dm
+import err
+import lex
+import parse
+import tok
+
+# Blocks still open at EOF, as while the closing brace is being typed
+UNCLOSED:ty.Tuple[str, ...] = (
+    "if (1) { ;",
+    "while (1) { ;",
+    "fun g() { ;",
+    "print 1; if (1) { print 2;",
+    "if (1) { print 1; } elif (2) { print 2;",
+    "if (1) { } else { print 3;",
+    "while (1) { if (1) { print 2; };",
+)
+# Pieces of random programs and edits, some of them broken on purpose
+FRAGMENTS:ty.Tuple[str, ...] = ("let int x = 1;", "print x;", "x", "y", ";", "{", "}", "1", "2", " ", "\n", "let", "int", "=", "fun f() {", "(", ")", "+", "#c\n", "'s'")
+PROGRAM:str = "~dynamic\nlet int x = 1;\nif (x == 1) { let int y = 2; };\nwhile (x) { print x; };\nfun f(int a) { print a; };\nprint x;\n"
+
+
+def statement(generator:random.Random) -> str:
+    name, other = generator.choice("xyz"), generator.choice("xyz")
+    value:str = generator.choice(("1", "2", "1.0", "0", other, f"{other} + 1", f"({other} * 2)"))
+    return generator.choice((
+        f"let int {name} = {value};", f"let float {name} = {value};", f"print {value};", "print 'hi';",
+        f"if ({other} == 1) {{ let int {name} = {value}; }};", f"if ({other} < 2) {{ print {other}; }} else {{ let int {name} = 2; }};",
+        f"fun {generator.choice('fg')}(int {name}) {{ print {other}; }};", f"fun f() {{ let int {name} = 1; }};", "while (x) { print x; };",
+        "junk;", ";", "{", "}", "let x", f"{name} = 1;",
+    ))
+
+
+def stream(src:str, diagnostics:dm.Diagnostics) -> tok.TokenStream:
+    return lex.Lexer(src, diagnostics=diagnostics).tokenizeAll()
+
+
+def records(parser:parse.Parser) -> ty.List[ty.Tuple[ty.Any, ...]]:
+    "What the parser recorded of every statement, with token indices made absolute."
+    length:int = len(parser.stream)
+    absolute:ty.Callable[[int], int] = lambda index: index if index >= 0 else index + length
+    return [(absolute(statement.start), absolute(statement.stop), sorted(statement.reads), repr(statement.writes), repr(statement.funcs))
+            for statement in parser.statements]
+
+
+def table(symbols:ty.Dict[ty.Any, ty.Any]) -> ty.List[str]:
+    return sorted(map(repr, symbols.items()))
+
+
+def missingBrace(diagnostics:dm.Diagnostics) -> bool:
+    return any("RFLOBRAC" in message for message in diagnostics.messages())
+
+
+class UnclosedBlockTest(unittest.TestCase):
+    def testParse(self) -> None:
+        for src in UNCLOSED:
+            with self.subTest(src=src):
+                diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+                parser:parse.Parser = parse.Parser(lex.Lexer(f"~dynamic\n{src}", diagnostics=diagnostics))
+                parser.parse()
+                self.assertTrue(missingBrace(diagnostics), diagnostics.messages())
+    
+    def testParseTree(self) -> None:
+        for src in UNCLOSED:
+            with self.subTest(src=src):
+                diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+                parse.Parser(lex.Lexer(f"~dynamic\n{src}", diagnostics=diagnostics)).parseTree()
+                self.assertTrue(missingBrace(diagnostics), diagnostics.messages())
+
+
+class EvaluationTest(unittest.TestCase):
+    def evaluate(self, src:str) -> ty.List[ty.Type[err.Error]]:
+        "The errors parse() reports evaluating src."
+        diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+        parse.Parser(lex.Lexer(f"~dynamic\n{src}", diagnostics=diagnostics)).parse()
+        return [record.errType for record in diagnostics.records]
+    
+    def testFalseValues(self) -> None:
+        for value in ("0", "0.0", "1 - 1", "1 == 2"):
+            with self.subTest(value=value):
+                self.assertEqual(self.evaluate(f"let int x = {value};\nprint x;\nprint x + 1;\nlet int y = x;"), [])
+    
+    def testFailingOperation(self) -> None:
+        "Only the first error of an expression is reported."
+        self.assertEqual(self.evaluate("print 1 / 0;"), [err.illegalOp])
+        self.assertEqual(self.evaluate("print 2 * (1 / 0) + 1;"), [err.illegalOp])
+        self.assertEqual(self.evaluate("print z;"), [err.unknownIdent])
+        self.assertEqual(self.evaluate("print ;"), [err.exprErr])
+
+
+class ReparseTest(unittest.TestCase):
+    def testUnclosedBlock(self) -> None:
+        "Each closing brace deleted in turn, then put back."
+        for offset in [i for i, char in enumerate(PROGRAM) if char == '}']:
+            with self.subTest(offset=offset):
+                diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+                old:tok.TokenStream = stream(PROGRAM, diagnostics)
+                parser:parse.Parser = parse.Parser(old, diagnostics=diagnostics)
+                parser.parse()
+                
+                new, first, oldStop, newStop = lex.Lexer.relex(old, offset, 1, '')
+                parser.reparse(new, first, oldStop, newStop)
+                self.assertTrue(missingBrace(diagnostics), diagnostics.messages())
+                self.assertParsedAs(parser, new)
+                
+                restored, first, oldStop, newStop = lex.Lexer.relex(new, offset, 0, '}')
+                parser.reparse(restored, first, oldStop, newStop)
+                self.assertParsedAs(parser, restored)
+    
+    def testRandomEdits(self) -> None:
+        "Chains of random edits, braces left open included, each reparsed and checked against a fresh parse."
+        generator:random.Random = random.Random(3)
+        for _ in range(60):
+            src:str = "~static\n" * generator.randint(0, 1) + '\n'.join(statement(generator) for _ in range(generator.randint(0, 12)))
+            diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+            old:tok.TokenStream = stream(src, diagnostics)
+            parser:parse.Parser = parse.Parser(old, diagnostics=diagnostics)
+            parser.parse()
+            for _ in range(6):
+                last:int = len(old.src) - 1
+                offset:int = generator.randint(0, last)
+                removed:int = generator.randint(0, min(generator.choice((0, 3, 15)), last - offset))
+                inserted:str = generator.choice(('', generator.choice(FRAGMENTS), statement(generator), '\n' + statement(generator)))
+                new, first, oldStop, newStop = lex.Lexer.relex(old, offset, removed, inserted)
+                with self.subTest(src=old.src, offset=offset, removed=removed, inserted=inserted):
+                    parser.reparse(new, first, oldStop, newStop)
+                    self.assertParsedAs(parser, new)
+                old = new
+    
+    def assertParsedAs(self, parser:parse.Parser, new:tok.TokenStream) -> None:
+        "parser's records and tables are those of parsing new from the start."
+        fresh:parse.Parser = parse.Parser(new, diagnostics=dm.Diagnostics(write=False))
+        fresh.parse()
+        self.assertEqual(records(parser), records(fresh))
+        self.assertEqual(table(parser.symTable), table(fresh.symTable))
+        self.assertEqual(table(parser.funcTable), table(fresh.funcTable))
+
+
+if __name__ == "__main__":
+    unittest.main()
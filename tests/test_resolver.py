@@ -0,0 +1,96 @@
+"""
+Tests of the resolver: the slots and depths names get, which reads are left unchecked, the reads it reports, and
+trees from a .vic cache resolved on first use as parseTree() resolves them.
+
+Run from the repository root: python -m unittest discover tests (or python -m pytest tests)
+"""
+import os
+import sys
+import typing as ty
+import unittest
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+import asTree as at
+import diagnostics as dm
+import err
+import flatTree as ft
+import lex
+import parse
+import resolver as rs
+
+
+def resolve(src:str) -> ty.Tuple[at.ProgramNode, ty.List[ty.Tuple[ty.Type[err.Error], int]]]:
+    "The tree parseTree() makes of src, and the errors it reports with their offsets."
+    diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+    program:at.ProgramNode = parse.Parser(lex.Lexer(src, diagnostics=diagnostics)).parseTree()
+    return program, [(record.errType, record.offset) for record in diagnostics.records]
+
+
+def idents(program:at.ProgramNode) -> ty.List[ty.Tuple[str, int, int, bool]]:
+    "Every name of program, lets included, in source order, with its depth, slot and whether its reads are checked."
+    found:ty.List[ty.Tuple[int, str, int, int, bool]] = []
+    stack:ty.List[at.ASTNode] = [program]
+    while stack:
+        node:at.ASTNode = stack.pop()
+        if isinstance(node, at.IdentNode):
+            found.append((node.token.pos, node.name, node.depth, node.slot, node.checked))
+        values:ty.List[ty.Any] = [getattr(node, name) for cls in type(node).__mro__ for name in getattr(cls, "__slots__", ())]
+        stack.extend(value for value in values if isinstance(value, at.ASTNode))
+    return [ident[1:] for ident in sorted(found)]
+
+
+def functions(program:at.ProgramNode) -> ty.Dict[str, ty.List[str]]:
+    return {node.name: node.names for node in at.statements(program.body) if isinstance(node, at.FunNode)}
+
+
+class ResolverTest(unittest.TestCase):
+    def testSlots(self) -> None:
+        "Parameters take a function's first slots; program names it does not let are read from the program's frame."
+        program, errors = resolve("~dynamic\nlet int g = 1;\nfun f(int a, int b) { let int l = a; print l + g + b; };\nlet int h = g;")
+        self.assertEqual(errors, [])
+        self.assertEqual(program.names, ['g', 'h'])
+        self.assertEqual(functions(program), {'f': ['a', 'b', 'l']})
+        self.assertEqual(idents(program), [
+            ('g', 0, 0, False), ('l', 0, 2, False), ('a', 0, 0, False), ('l', 0, 2, False), ('g', 1, 0, True),
+            ('b', 0, 1, False), ('h', 0, 1, False), ('g', 0, 0, False),
+        ])
+    
+    def testChecked(self) -> None:
+        "A read is unchecked only where every way to it lets the name first."
+        program, errors = resolve(
+            "~dynamic\nlet int a = 1;\nif (a) { let int c = 1; print c; };\nprint c;\n"
+            "if (a) { let int d = 1; } else { let int d = 2; };\nprint d;\n"
+        )
+        self.assertEqual(errors, [])
+        self.assertEqual([ident for ident in idents(program) if ident[0] != 'a'], [
+            ('c', 0, 1, False), ('c', 0, 1, False), ('c', 0, 1, True), ('d', 0, 2, False), ('d', 0, 2, False), ('d', 0, 2, False),
+        ])
+    
+    def testWhile(self) -> None:
+        "A name let in a while body can be read above its let there, from the second iteration on."
+        program, errors = resolve("~dynamic\nlet int i = 0;\nwhile (i < 3) { if (i > 0) { print t; }; let int t = i; let int i = i + 1; };\nprint t;")
+        self.assertEqual(errors, [])
+        self.assertEqual([ident for ident in idents(program) if ident[0] == 't'], [('t', 0, 1, True), ('t', 0, 1, False), ('t', 0, 1, True)])
+    
+    def testUnknown(self) -> None:
+        src:str = "~dynamic\nprint z;\nlet int z = 1;"
+        self.assertEqual(resolve(src)[1], [(err.unknownIdent, src.index('z'))])
+        
+        # Read in a function before the let that shadows the program's name
+        src = "~dynamic\nlet int g = 1;\nfun f(int a) { print g; let int g = a; };"
+        program, errors = resolve(src)
+        self.assertEqual(errors, [(err.unknownIdent, src.index("g;"))])
+        self.assertEqual(functions(program), {'f': ['a', 'g']})
+    
+    def testCachedTree(self) -> None:
+        "A tree rebuilt from its flat form has no slots until resolved() gives it those parseTree() did."
+        src:str = "~dynamic\nlet int g = 1;\nfun f(int a) { print a + g; };\nwhile (g < 3) { let int t = g; let int g = g + t; };\nprint t;"
+        program:at.ProgramNode = resolve(src)[0]
+        rebuilt:at.ProgramNode = ft.FlatTree.fromTree(program).toTree(lex.Lexer(src).tokenizeAll())
+        self.assertEqual(rebuilt.names, None)
+        self.assertIs(rs.resolved(rebuilt), rebuilt)
+        self.assertEqual((rebuilt.names, functions(rebuilt), idents(rebuilt)), (program.names, functions(program), idents(program)))
+
+
+if __name__ == "__main__":
+    unittest.main()
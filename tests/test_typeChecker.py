@@ -0,0 +1,113 @@
+"""
+Tests of the type checker: the errors it reports in ~static programs, powers among them, the operand types it
+annotates operations with, and random ~static programs running on the closure engine as a reference tree-walker
+runs them.
+
+Run from the repository root: python -m unittest discover tests (or python -m pytest tests)
+"""
+import io
+import os
+import sys
+import typing as ty
+import unittest
+
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+import asTree as at
+import closures
+import diagnostics as dm
+import err
+import lex
+import parse
+import test_engines
+import typeChecker as tc
+
+TT = tc.TT
+
+
+def check(src:str) -> ty.Tuple[at.ProgramNode, ty.List[ty.Tuple[ty.Type[err.Error], int]]]:
+    "The tree parseTree() makes of src, and the errors it reports with their offsets."
+    diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+    program:at.ProgramNode = parse.Parser(lex.Lexer(src, diagnostics=diagnostics)).parseTree()
+    return program, [(record.errType, record.offset) for record in diagnostics.records]
+
+
+def operations(program:at.ProgramNode) -> ty.List[ty.Tuple[ty.Any, ...]]:
+    "Every operation of program in source order, with the operand types it is annotated with."
+    found:ty.List[ty.Tuple[ty.Any, ...]] = []
+    stack:ty.List[at.ASTNode] = [program]
+    while stack:
+        node:at.ASTNode = stack.pop()
+        if isinstance(node, at.BinOpNode):
+            found.append((node.token.pos, node.op, node.leftTyp, node.rightTyp))
+        elif isinstance(node, at.UnaryOpNode):
+            found.append((node.token.pos, node.op, node.typ))
+        values:ty.List[ty.Any] = [getattr(node, name) for cls in type(node).__mro__ for name in getattr(cls, "__slots__", ())]
+        stack.extend(value for value in values if isinstance(value, at.ASTNode))
+    return [operation[1:] for operation in sorted(found)]
+
+
+class TypeCheckerTest(unittest.TestCase):
+    def testErrors(self) -> None:
+        src:str = "~static\nlet int x = 1.5;"
+        self.assertEqual(check(src)[1], [(err.assignTypMismatch, src.index('x'))])
+        src = "~static\nfun f(string s) { print s - 1; };"
+        self.assertEqual(check(src)[1], [(err.typeErr, src.index('-'))])
+    
+    def testWidening(self) -> None:
+        "A bool goes where an int does and an int where a float does; not the other way."
+        self.assertEqual(check("~static\nlet float y = 1;\nlet float z = y + 1 == 2;\nlet int b = 1 == 1;")[1], [])
+        src:str = "~static\nlet bool b = 1 == 1;\nlet bool c = 2;"
+        self.assertEqual(check(src)[1], [(err.assignTypMismatch, src.index("c ="))])
+    
+    def testPowers(self) -> None:
+        "An int to an int can be a float (2 ^ -1 is 0.5), so it only goes where a float does."
+        src:str = "~static\nlet int a = 2;\nlet int x = 2 ^ -1;\nlet int y = a ^ 2;\nlet float z = a ^ a;\nprint x;"
+        self.assertEqual(check(src)[1], [(err.assignTypMismatch, src.index("x =")), (err.assignTypMismatch, src.index("y ="))])
+        self.assertEqual(tc.result('^', TT.INT, TT.INT), TT.FLOAT)
+        self.assertEqual(tc.result('^', None, TT.INT), TT.FLOAT)
+    
+    def testAnnotations(self) -> None:
+        program, errors = check("~static\nlet int a = 1;\nlet int b = a + 2;\nlet float f = 1.5;\nprint f * a;\nprint -a;\nprint -f;\nprint a / 2;")
+        self.assertEqual(errors, [])
+        self.assertEqual(operations(program), [
+            ('+', TT.INT, TT.INT), ('*', TT.FLOAT, TT.INT), ('-', TT.INT), ('-', TT.FLOAT), ('/', TT.INT, TT.INT),
+        ])
+        self.assertEqual([tc.infallible(op[0], *op[1:]) for op in operations(program) if len(op) == 3], [True, False, False])
+        
+        # A name let with an int and a float is a float
+        program, errors = check("~static\nlet int a = 1;\nlet float a = 2.5;\nprint a + 1;")
+        self.assertEqual((errors, operations(program)), ([], [('+', TT.FLOAT, TT.INT)]))
+    
+    def testUnannotated(self) -> None:
+        "~dynamic programs are not checked, and programs with type errors are left without annotations."
+        for src in ("~dynamic\nlet int a = 1;\nlet int b = a + 2;\nlet int c = 2.5;", "~static\nlet int a = 1;\nlet int b = a + 2;\nlet int c = 2.5;"):
+            with self.subTest(src=src):
+                program, errors = check(src)
+                self.assertEqual(errors, [(err.assignTypMismatch, src.index("c ="))] if src.startswith("~static") else [])
+                self.assertEqual(operations(program), [('+', None, None)])
+    
+    def testRandomPrograms(self) -> None:
+        "The random programs of test_engines made ~static: those that check run on the closure engine as the reference."
+        programs:test_engines.Programs = test_engines.Programs(24)
+        annotated:int = 0
+        for _ in range(test_engines.PROGRAMS):
+            src:str = programs.program().replace("~dynamic", "~static", 1)
+            diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+            program:at.ProgramNode = parse.Parser(lex.Lexer(src, diagnostics=diagnostics)).parseTree()
+            if diagnostics.count:
+                continue
+            annotated += any(operation[1] != None for operation in operations(program))
+            expected:ty.Tuple[bool, str]|None = test_engines.Reference().run(program)
+            if expected == None:
+                continue
+            out:io.StringIO = io.StringIO()
+            ok:bool = closures.ClosureEngine(out, dm.Diagnostics(write=False)).run(program)
+            with self.subTest(src=src):
+                self.assertEqual(ok, expected[0])
+                self.assertEqual(out.getvalue(), expected[1] if ok else expected[1][:len(out.getvalue())])
+        self.assertGreater(annotated, test_engines.PROGRAMS // 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
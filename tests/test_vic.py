@@ -0,0 +1,148 @@
+"""
+Tests of the .vic parse cache: a program loaded from its cache has the tree, function table and typing of a fresh
+parse and runs the same, and a damaged, truncated or stale cache file is a miss, never a crash.
+
+Run from the repository root: python -m unittest discover tests (or python -m pytest tests)
+"""
+import array
+import hashlib
+import io
+import os
+import random
+import sys
+import tempfile
+import typing as ty
+import unittest
+import unittest.mock
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bench"))
+import compiler
+import corpus
+import diagnostics as dm
+import tok
+import vic
+import vm
+
+PROGRAM:str = (
+    "~dynamic\nlet int n = 0;\nfun f(int a, float b) { print a * b; };\n"
+    "while (n < 3) { if (n == 1) { print 'one'; } elif (n == 2) { print n ^ 2; } else { print -n; }; let int n = n + 1; };\n"
+    "let float x = 1.50;\nprint x / (n - 4);\nprint 1;\n"
+)
+
+
+def run(program:vic.CachedProgram) -> ty.Tuple[bool, str, ty.List[str]]:
+    "Output and errors of running a program on the VM."
+    out:io.StringIO = io.StringIO()
+    diagnostics:dm.Diagnostics = dm.Diagnostics(write=False)
+    ok:bool = vm.VM(out, diagnostics).run(compiler.Compiler().compile(program.tree))
+    return ok, out.getvalue(), diagnostics.messages()
+
+
+class VicTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory:tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.path:str = os.path.join(self.directory.name, "program.vi")
+    
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+    
+    def write(self, src:str) -> bytes:
+        "Write src as the program, and return its digest."
+        with open(self.path, 'w', encoding="utf-8", newline='') as file:
+            file.write(src)
+        return hashlib.sha256(src.encode("utf-8")).digest()
+    
+    def parsePath(self) -> vic.CachedProgram:
+        return vic.parsePath(self.path, diagnostics=dm.Diagnostics(write=False))
+
+
+class RoundTripTest(VicTestCase):
+    def testCorpus(self) -> None:
+        for seed in range(6):
+            for typing in ("static", "dynamic"):
+                with self.subTest(seed=seed, typing=typing):
+                    self.write(corpus.Generator(seed, typing).program(6000))
+                    miss:vic.CachedProgram = self.parsePath()
+                    hit:vic.CachedProgram = self.parsePath()
+                    self.assertEqual((miss.hit, miss.errors, hit.hit), (False, 0, True))
+                    self.assertEqual(repr(hit.tree), repr(miss.tree))
+                    self.assertEqual((hit.typing, hit.funcTable), (miss.typing, miss.funcTable))
+    
+    def testRun(self) -> None:
+        "Output, and errors with their positions, are the same from the cache."
+        self.write(PROGRAM)
+        miss:vic.CachedProgram = self.parsePath()
+        hit:vic.CachedProgram = self.parsePath()
+        self.assertTrue(hit.hit)
+        self.assertEqual(hit.funcTable, {"f": {"a": "INT", "b": "FLOAT"}})
+        self.assertEqual(run(hit), run(miss))
+        self.assertEqual(run(hit)[:2], (False, "0\none\n4\n-3\n"))
+    
+    def testStale(self) -> None:
+        "A changed source, or a cache of another version, is a miss and the cache is written again."
+        self.write(PROGRAM)
+        self.parsePath()
+        self.write(PROGRAM.replace("print 1;", "print 2;"))
+        self.assertFalse(self.parsePath().hit)
+        self.assertTrue(self.parsePath().hit)
+        with unittest.mock.patch.object(vic.comm, "VERSION", "0.0.0"):
+            self.assertFalse(self.parsePath().hit)
+    
+    def testErrors(self) -> None:
+        "A program with errors is not cached."
+        self.write("~dynamic\nlet int x = ;\nprint 1;\n")
+        self.assertEqual((self.parsePath().hit, self.parsePath().hit), (False, False))
+        self.assertFalse(os.path.exists(vic.cachePath(self.path)))
+
+
+class CorruptionTest(VicTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.digest:bytes = self.write(PROGRAM)
+        self.expected:vic.CachedProgram = self.parsePath()
+        with open(vic.cachePath(self.path), "rb") as file:
+            self.data:bytes = file.read()
+    
+    def assertMiss(self, data:bytes) -> None:
+        "A cache file of data is rejected by load() and parsePath() parses the program again."
+        with self.assertRaises(vic.CorruptCache):
+            vic.load(data, self.digest)
+        with open(vic.cachePath(self.path), "wb") as file:
+            file.write(data)
+        program:vic.CachedProgram = self.parsePath()
+        self.assertFalse(program.hit)
+        self.assertEqual(repr(program.tree), repr(self.expected.tree))
+    
+    def testFlips(self) -> None:
+        for offset in range(len(self.data)):
+            with self.subTest(offset=offset):
+                damaged:bytearray = bytearray(self.data)
+                damaged[offset] ^= 0x5a
+                self.assertMiss(bytes(damaged))
+    
+    def testTruncations(self) -> None:
+        for length in range(len(self.data)):
+            with self.subTest(length=length):
+                self.assertMiss(self.data[:length])
+    
+    def testColumns(self) -> None:
+        "Damage behind a valid crc is rejected, or is a tree that rebuilds and compiles."
+        generator:random.Random = random.Random(4)
+        for _ in range(1500):
+            tree, funcTable = vic.load(self.data, self.digest)
+            name, _ = generator.choice(vic.COLUMNS)
+            column:array.array = getattr(tree, name)
+            column[generator.randrange(len(column))] = generator.choice((-2, -1, 0, 1, 2, 3, len(tree) - 1, len(tree), 100))
+            data:bytes = vic.dump(tree, funcTable, self.digest)
+            with self.subTest(name=name, column=column.tolist()):
+                try:
+                    loaded, _ = vic.load(data, self.digest, tok.LineIndex(PROGRAM))
+                except vic.CorruptCache:
+                    continue
+                program:vic.CachedProgram = vic.CachedProgram(loaded.toTree(), funcTable, loaded.value(loaded.root), 0, True)
+                compiler.Compiler().compile(program.tree)
+
+
+if __name__ == "__main__":
+    unittest.main()